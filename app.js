@@ -1,11 +1,13 @@
 // app.js — Theme toggle + Result Card after run + Stage-based progress + Cancel in overlay
-// Compatible with your endpoints: /api/save, /api/run (SSE), /api/run-once, /api/list-outputs, /api/activate
+// Compatible with your endpoints: /api/save, /api/jobs (+ /events SSE, /cancel), /api/list-outputs, /api/activate
 
 let CAP = null;          // TTS capabilities from backend
 let LLM_CAP = null;      // LLM capabilities from backend
 let PREMIUM = false;     // read from /api/edition or after activation
 let BASE_LANGS = [];     // seed for ".txt" mode
 let _lastVideoFile = null; // will hold final MP4 filename from logs
+let _settingsId = "";      // id of the validated settings returned by /api/save
+let _jobId = "";           // current job on the server (/api/jobs)
 
 // ---------- safe helpers ----------
 const qs = (s)=>document.querySelector(s);
@@ -120,7 +122,8 @@ function updateLLMAdvanced(){
     return;
   }
   prov.disabled=false; mdl.disabled=false;
-  if (prov.value==="ollama") setOptions(mdl, (LLM_CAP.ollama && LLM_CAP.ollama.suggested) || ["llama3.1:8b"]);
+  const oll = LLM_CAP.ollama || {};
+  if (prov.value==="ollama") setOptions(mdl, ((oll.installed && oll.installed.length) ? oll.installed : oll.suggested) || ["llama3.1:8b"]);
   else setOptions(mdl, (LLM_CAP.openai && LLM_CAP.openai.premium) || ["gpt-4o","gpt-5"]);
 }
 
@@ -130,6 +133,7 @@ function contentSourceToggle(){
   const gen = isGen();
   const topic = qs("#llm_topic_basic"); const file = qs("#text_file");
   if (topic) topic.disabled = !gen; if (file) file.disabled = gen;
+  const regen = qs("#llm_regenerate"); if (regen) regen.disabled = !gen;
   const onOv = gb("#items_override", false); const mi = qs("#llm_items_basic");
   if (mi) mi.disabled = !onOv || !gen;
   rebuildLanguageSelects(); updateItemsDisplay();
@@ -157,6 +161,7 @@ function payloadFromUI(){
     items_override: gb("#items_override", false),
     llm_items_basic: gi("#llm_items_basic", 20),
     llm_topic: gv("#llm_topic_basic",""),
+    llm_regenerate: isLLM() && gb("#llm_regenerate", false),
 
     mode: gv("#mode","vocab").toLowerCase(),
     level: gv("#level","A1"),
@@ -182,6 +187,7 @@ function payloadFromUI(){
     bg_mode, bg_enabled: gb("#bg_enabled", true),
     video_size: gv("#video_size","1920x1080"),
     video_fps: gi("#video_fps", 30),
+    force_rebuild: gb("#force_rebuild", false),
 
     llm_provider, llm_model,
   };
@@ -299,6 +305,7 @@ function setBusy(on){
 }
 function stopStream(){
   if (_evt) { try{ _evt.close(); }catch(_){ } _evt=null; }
+  if (_jobId) { jpost(`/api/jobs/${encodeURIComponent(_jobId)}/cancel`, {}).catch(()=>{}); _jobId = ""; }
   setBusy(false);
   toast("Canceled.", "warn");
 }
@@ -306,6 +313,7 @@ function stopStream(){
 async function saveSettings(){
   const res = await jpost("/api/save", payloadFromUI());
   if (!res.ok) { toast(res.error || "Save failed.", "err"); return; }
+  _settingsId = res.settings_id || "";
   if (res.warnings && res.warnings.length) toast(res.warnings.join("\n"), "warn");
 }
 
@@ -332,75 +340,76 @@ function updateStageFromLine(line){
   if (/pixabay|unsplash|slideshow|render|ffmpeg|mux/.test(L)){ PROG.onVideo(); return; }
 }
 
+function appendLog(t){
+  const logEl = qs("#log");
+  if (logEl){ logEl.textContent += t + (t.endsWith("\n")?"":"\n"); logEl.scrollTop = logEl.scrollHeight; }
+}
+
+// SSE dropped for good → poll the job until it ends, then pull the full log once
+async function pollJob(jobId){
+  while (_jobId === jobId){
+    const res = await jget(`/api/jobs/${encodeURIComponent(jobId)}`).catch(()=>null);
+    const st = res && res.job ? res.job.status : "";
+    if (st && st !== "queued" && st !== "running"){
+      const full = await jget(`/api/jobs/${encodeURIComponent(jobId)}?log=1`).catch(()=>null);
+      if (full && full.log){ const logEl = qs("#log"); if (logEl) logEl.textContent = ""; appendLog(full.log); full.log.split(/\r?\n/).forEach(updateStageFromLine); }
+      _jobId = "";
+      if (st === "done"){ PROG.finish(); toast("Finished.", "ok"); }
+      else { setBusy(false); toast(`Run ${st}.`, st === "cancelled" ? "warn" : "err"); }
+      return;
+    }
+    await new Promise(r=>setTimeout(r, 3000));
+  }
+}
+
 async function runPipeline(){
   if (_evt){ try{ _evt.close(); }catch(_){ } _evt=null; }
   const log = qs("#log"); if (log) log.textContent = "";
   const det = qs("#logDetails"); if (det) det.open = false;         // keep log collapsed by default
 
-  await saveSettings();
+  const r = await fetch("/api/jobs", {method:"POST", headers:{"Content-Type":"application/json"}, body: JSON.stringify(payloadFromUI())});
+  const res = await r.json().catch(()=>({ok:false, error:"Bad JSON"}));
+  if (r.status === 429){ toast(`Server busy (${res.queued||"?"} queued). Try again shortly.`, "warn"); return; }
+  if (!res.ok || !res.job){ toast(res.error || "Submit failed.", "err"); return; }
+  if (res.warnings && res.warnings.length) toast(res.warnings.join("\n"), "warn");
+  _jobId = res.job.id;
   setBusy(true);
 
-  try {
-    _evt = new EventSource("/api/run");                               // SSE stream + [DONE] end
-    const stopBtn = qs("#btnStop"); if (stopBtn) stopBtn.disabled = false;
-
-    _evt.onopen = ()=> toast("Started.", "ok");
+  // EventSource reconnects on its own and resends Last-Event-ID, so the server resumes where we left off
+  let errors = 0;
+  _evt = new EventSource(`/api/jobs/${encodeURIComponent(_jobId)}/events`);
+  const stopBtn = qs("#btnStop"); if (stopBtn) stopBtn.disabled = false;
 
-    _evt.onmessage = (e)=>{
-      const line = e.data || "";
+  _evt.onopen = ()=>{ if (!errors) toast("Started.", "ok"); errors = 0; };
 
-      // --- NEW: capture final mp4 path from logs ---
-      // Example log: [OK] Final video written: C:\...\Output\my_video.mp4
-      const m = line.match(/Final video written:\s*(.+\.mp4)/i);
-      if (m) {
-        const full = m[1].trim().replace(/["']/g, "");
-        const base = full.split(/[\\/]/).pop(); // works on Windows & Unix paths
-        _lastVideoFile = base;                   // e.g., "my_video.mp4"
-      }
-      // --- END NEW ---
+  _evt.onmessage = (e)=>{
+    const line = e.data || "";
 
-      // باقی کد قبلی onmessage شما (لاگ، stage، [DONE] و ...) بدون تغییر
-      const logEl = document.querySelector("#log");
-      if (logEl){ logEl.textContent += line + "\n"; logEl.scrollTop = logEl.scrollHeight; }
-      updateStageFromLine(line);
-
-      if (line.startsWith("[DONE]")){
-        try{ _evt.close(); }catch(_){}
-        _evt=null; PROG.finish(); toast("Finished.", "ok");
-        const stopBtn = document.querySelector("#btnStop"); if (stopBtn) stopBtn.disabled = true;
-      }
-    };
+    // Example log: [OK] Final video written: C:\...\Output\my_video.mp4
+    const m = line.match(/Final video written:\s*(.+\.mp4)/i);
+    if (m) {
+      const full = m[1].trim().replace(/["']/g, "");
+      _lastVideoFile = full.split(/[\\/]/).pop(); // works on Windows & Unix paths
+    }
 
+    appendLog(line);
+    updateStageFromLine(line);
 
-    _evt.onerror = async ()=>{
-      if (qs("#log")) { qs("#log").textContent += "[WARN] SSE error; falling back to /api/run-once\n"; qs("#log").scrollTop = qs("#log").scrollHeight; }
-      try{
-        if (_evt){ _evt.close(); _evt=null; }
-        const r = await fetch("/api/run-once");
-        const t = await r.text();
-        if (qs("#log")) { qs("#log").textContent += t + (t.endsWith("\n")?"":"\n"); qs("#log").scrollTop = qs("#log").scrollHeight; }
-        t.split(/\r?\n/).forEach(updateStageFromLine);
-        PROG.finish(); toast("Finished (fallback).", "warn");
-      }catch(err){
-        setBusy(false);
-        if (qs("#log")) { qs("#log").textContent += "[ERROR] " + (err?.message || String(err)) + "\n"; qs("#log").scrollTop = qs("#log").scrollHeight; }
-        toast("Run failed.", "err");
-      }
+    if (line.startsWith("[DONE]")){
+      try{ _evt.close(); }catch(_){}
+      _evt=null; _jobId="";
+      if (/status=(failed|cancelled)/.test(line)){ setBusy(false); toast("Run did not finish.", "err"); }
+      else { PROG.finish(); toast("Finished.", "ok"); }
       const stopBtn = qs("#btnStop"); if (stopBtn) stopBtn.disabled = true;
-    };
-  } catch (err) {
-    try{
-      const r = await fetch("/api/run-once");
-      const t = await r.text();
-      if (qs("#log")) { qs("#log").textContent += t + (t.endsWith("\n")?"":"\n"); qs("#log").scrollTop = qs("#log").scrollHeight; }
-      t.split(/\r?\n/).forEach(updateStageFromLine);
-      PROG.finish(); toast("Finished (single).", "ok");
-    }catch(e){
-      setBusy(false);
-      if (qs("#log")) { qs("#log").textContent += "[ERROR] " + (e?.message || String(e)) + "\n"; qs("#log").scrollTop = qs("#log").scrollHeight; }
-      toast("Run failed.", "err");
     }
-  }
+  };
+
+  _evt.onerror = ()=>{
+    if (++errors < 5) return;     // let the browser retry (same job, no resubmit)
+    appendLog("[WARN] SSE lost; polling job status");
+    try{ if (_evt){ _evt.close(); _evt=null; } }catch(_){}
+    pollJob(_jobId);
+  };
 }
 
 async function clearCache(){ await jpost("/api/clear-cache",{}); toast("Cache cleared."); }
@@ -1,15 +1,17 @@
-# app.py — SSE stable + LLM gating + auto Piper(lb)
+# app.py — SSE stable + LLM gating + auto Piper(lb) + in-process job engine
 from __future__ import annotations
-import sys, json, shutil, subprocess, importlib
+import os, uuid, shutil, threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import List, Optional
 from flask import Flask, render_template, request, jsonify, Response, send_from_directory, abort, stream_with_context
 
 APP_ROOT = Path(__file__).resolve().parent
 PROJECT_ROOT = APP_ROOT
 TEXT_ROOT = PROJECT_ROOT / "Text"
 OUTPUT_DIR = PROJECT_ROOT / "Output"
-CACHE_DIRS = [PROJECT_ROOT / ".cache_tts", PROJECT_ROOT / ".cache_images", PROJECT_ROOT / ".cache_video"]
+CACHE_DIRS = [PROJECT_ROOT / ".cache_tts", PROJECT_ROOT / ".cache_images", PROJECT_ROOT / ".cache_video",
+              PROJECT_ROOT / ".cache_llm"]
 
 BASE_LANGS = ["en","fr","de","es","it","pt","hi","zh-cn","ru","lb"]
 LANG_DISPLAY = {
@@ -20,6 +22,12 @@ LEVELS = ["A1","A2","B1","B2"]
 VOCAB_SUBDIR = "Vocab"
 SCENARIO_SUBDIR = "Scenario"
 
+# main.main() runs in-process on this many worker threads (each job has its own JobSettings);
+# beyond JOB_MAX_QUEUE waiting jobs, submissions get HTTP 429
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "8"))
+MAX_SAVED_SETTINGS = 64
+
 app = Flask(__name__, template_folder=str(APP_ROOT), static_folder=str(APP_ROOT), static_url_path="/static")
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 app.config["PREMIUM_UNLOCKED"] = False  # default FREE on each start
@@ -32,6 +40,14 @@ def ensure_dirs():
     for d in CACHE_DIRS: d.mkdir(parents=True, exist_ok=True)
 ensure_dirs()
 
+# pipeline modules resolve Text/, Output/, voices/ and caches relative to the project root
+os.chdir(PROJECT_ROOT)
+from jobs import JobEngine, QueueFull, run_main_pipeline
+import llm_clients
+import batch
+from job_settings import JobSettings, default_settings, settings_from_payload
+ENGINE = JobEngine(max_workers=JOB_WORKERS, max_queue=JOB_MAX_QUEUE)
+
 def list_txt_files(mode: str, level: str) -> List[str]:
     base = TEXT_ROOT / (VOCAB_SUBDIR if (mode or "").lower()=="vocab" else SCENARIO_SUBDIR) / level
     return sorted([p.name for p in base.glob("*.txt")]) if base.exists() else []
@@ -39,13 +55,29 @@ def list_txt_files(mode: str, level: str) -> List[str]:
 def _is_premium_unlocked() -> bool: return bool(app.config.get("PREMIUM_UNLOCKED", False))
 def _set_premium_unlocked(flag: bool) -> None: app.config["PREMIUM_UNLOCKED"] = bool(flag)
 
-def _load_settings_module():
-    try:
-        if (PROJECT_ROOT / "settings_temp.py").exists():
-            return importlib.import_module("settings_temp")
-    except Exception:
-        pass
-    return importlib.import_module("settings")
+# validated settings from /api/save, keyed by the settings_id returned to the browser
+_SAVED_SETTINGS: "OrderedDict[str, JobSettings]" = OrderedDict()
+_SAVED_LOCK = threading.Lock()
+
+def _store_settings(js: JobSettings) -> str:
+    sid = uuid.uuid4().hex[:12]
+    with _SAVED_LOCK:
+        _SAVED_SETTINGS[sid] = js
+        while len(_SAVED_SETTINGS) > MAX_SAVED_SETTINGS:
+            _SAVED_SETTINGS.popitem(last=False)
+    return sid
+
+def _settings_for_run(settings_id: str = "") -> Optional[JobSettings]:
+    """Settings saved under settings_id; defaults when none is given; None for an unknown/evicted id.
+    Never another client's save: _SAVED_SETTINGS is shared by every browser on this server."""
+    settings_id = (settings_id or "").strip()
+    if not settings_id:
+        return default_settings()
+    with _SAVED_LOCK:
+        return _SAVED_SETTINGS.get(settings_id)
+
+def _unknown_settings_response(settings_id: str):
+    return jsonify({"ok": False, "error": f"Unknown settings_id {settings_id!r}; save the settings again (/api/save)"}), 404
 
 @app.get("/")
 def index():
@@ -67,7 +99,7 @@ GTTS_CODES = sorted({"af","ar","bn","ca","cs","da","de","el","en","es","fi","fr"
 ELEVEN_CODES = sorted({"ar","bn","bg","ca","cs","da","de","el","en","es","fa","fi","fr","he","hi","hu","id","it","ja","ko","ms","nl","no","pl","pt","ro","ru","sk","sv","th","tr","uk","vi","zh-cn","zh-tw"})
 def _piper_codes() -> List[str]:
     try:
-        s = _load_settings_module(); mp = getattr(s, "PIPER_MODEL_MAP", {}) or {}
+        mp = getattr(default_settings(), "PIPER_MODEL_MAP", {}) or {}
         codes = [str(k).lower() for k in mp.keys()]
         if "lb" not in codes: codes.append("lb")
         return sorted(set(codes))
@@ -86,10 +118,12 @@ def api_tts_capabilities():
 # --- LLM capabilities for UI (FREE: gpt-4o ; PREMIUM: gpt-4o + gpt-5 + ollama)
 @app.get("/api/llm-capabilities")
 def api_llm_capabilities():
+    host = getattr(default_settings(), "OLLAMA_BASE_URL", "http://localhost:11434")
     return jsonify({
         "providers": ["openai","ollama"],
         "openai": {"free": ["gpt-4o"], "premium": ["gpt-4o","gpt-5"]},
-        "ollama": {"suggested": ["llama3.1:8b","llama3.2:3b","qwen2:7b","phi3:3.8b"]}
+        "ollama": {"suggested": ["llama3.1:8b","llama3.2:3b","qwen2:7b","phi3:3.8b"],
+                   "installed": llm_clients.ollama_models(host)}
     })
 
 @app.get("/api/text-files")
@@ -97,174 +131,11 @@ def api_text_files():
     mode = request.args.get("mode","vocab"); level = request.args.get("level","A1")
     return jsonify({"files": list_txt_files(mode, level)})
 
-# ---------- settings_temp.py writer ----------
-def write_settings_temp(payload: Dict) -> Tuple[bool, List[str]]:
-    warnings: List[str] = []
-
-    edition_req = str(payload.get("edition","free")).lower()
-    unlocked = _is_premium_unlocked()
-    edition = "premium" if (edition_req=="premium" and unlocked) else "free"
-    if edition_req == "premium" and not unlocked:
-        warnings.append("Premium requested but not activated; falling back to Free.")
-
-    mode  = str(payload.get("mode","vocab")).lower()
-    level = str(payload.get("level","A1"))
-    text_fn = str(payload.get("text_file","sample.txt"))
-
-    enable_bilingual   = bool(payload.get("enable_bilingual", True))
-    primary_lang_idx   = int(payload.get("primary_lang_idx", 0))
-    secondary_lang_idx = int(payload.get("secondary_lang_idx", 1))
-
-    vocab_primary   = int(payload.get("vocab_primary", 1))
-    vocab_secondary = int(payload.get("vocab_secondary", 2))
-    vocab_pause_rep = int(payload.get("vocab_pause_rep", 2500))
-    vocab_pause_sent= int(payload.get("vocab_pause_sent", 2500))
-    scen_primary   = int(payload.get("scen_primary", 1))
-    scen_secondary = int(payload.get("scen_secondary", 2))
-    scen_pause_rep = int(payload.get("scen_pause_rep", 2500))
-    scen_pause_sent= int(payload.get("scen_pause_sent", 3500))
-
-    bg_mode    = str(payload.get("bg_mode","per_sentence"))
-    bg_enabled = bool(payload.get("bg_enabled", True))
-    video_size = str(payload.get("video_size","1920x1080"))
-    video_fps  = int(payload.get("video_fps", 30))
-
-    use_llm        = bool(payload.get("use_llm", False))
-    llm_topic      = str(payload.get("llm_topic","")).strip()
-    items_override = bool(payload.get("items_override", False))
-    llm_items_basic= int(payload.get("llm_items_basic", 20))
-    estimated_items= int(payload.get("estimated_items", 20))
-    llm_items      = llm_items_basic if items_override else estimated_items
-
-    # Language universe from UI
-    lang_codes: List[str] = [str(c).lower() for c in (payload.get("lang_codes") or BASE_LANGS)]
-    if primary_lang_idx >= len(lang_codes): primary_lang_idx = 0
-    if secondary_lang_idx >= len(lang_codes): secondary_lang_idx = min(1, len(lang_codes)-1)
-
-    # Advanced TTS per-role
-    tts_primary   = (payload.get("tts_primary") or "gtts").lower()
-    tts_secondary = (payload.get("tts_secondary") or "gtts").lower()
-
-    # Free gate: فقط gTTS
-    if edition == "free":
-        if tts_primary != "gtts" or tts_secondary != "gtts":
-            warnings.append("Free edition: Only gTTS is available; other TTS providers will be ignored.")
-        tts_primary = "gtts"; tts_secondary = "gtts"
-
-    lang_map_dict = {i: code for i, code in enumerate(lang_codes)}
-    primary_code   = lang_map_dict.get(primary_lang_idx, "en")
-    secondary_code = lang_map_dict.get(secondary_lang_idx, "fr")
-
-    # default route: premium -> elevenlabs ; free -> gtts
-    default_provider = "elevenlabs" if edition == "premium" else "gtts"
-    provider_map = {"default": default_provider, primary_code: tts_primary, secondary_code: tts_secondary}
-
-    # اگر lb استفاده شد و پریمیوم هستیم، به طور پیش‌فرض به Piper روت کن (اگر مدل موجود باشد)
-    try:
-        s = _load_settings_module()
-        pmap = getattr(s, "PIPER_MODEL_MAP", {}) or {"lb": "voices/lb_LU-marylux-medium.onnx"}
-    except Exception:
-        pmap = {"lb": "voices/lb_LU-marylux-medium.onnx"}
-    if edition == "premium":
-        for code in [primary_code, secondary_code]:
-            if code == "lb" and code not in provider_map:
-                if code in pmap:
-                    provider_map[code] = "piper"
-
-    # اگر کاربر Piper انتخاب کرد ولی مدل محلی نبود → revert
-    for code in [primary_code, secondary_code]:
-        if provider_map.get(code) == "piper" and code not in pmap:
-            provider_map[code] = default_provider
-            warnings.append(f"Piper has no model for '{code}'; using {default_provider}.")
-
-    # LLM model policy (FREE: gpt-4o ; PREMIUM: gpt-4o/gpt-5)
-    req_provider = (payload.get("llm_provider") or "openai").lower()
-    req_model    = (payload.get("llm_model") or "gpt-4o")
-    if edition == "free":
-        llm_provider = "openai"; llm_model = "gpt-4o"
-    else:
-        if req_provider == "ollama":
-            llm_provider = "ollama"; llm_model = (req_model or "llama3.1:8b")
-        else:
-            llm_provider = "openai"
-            llm_model = req_model if req_model in ("gpt-4o","gpt-5") else "gpt-4o"
-
-    subdir = VOCAB_SUBDIR if mode == "vocab" else SCENARIO_SUBDIR
-    content = f"""# Auto-generated by Flask webapp
-from pathlib import Path
-
-# Input/Output
-INPUT_DIR  = Path("Text") / "{subdir}" / "{level}"; INPUT_DIR.mkdir(parents=True, exist_ok=True)
-OUTPUT_DIR = Path("Output"); OUTPUT_DIR.mkdir(exist_ok=True)
-INPUT_FILENAME = "{text_fn}"
-
-# Edition / TTS
-EDITION      = "{edition}"
-TTS_PROVIDER = "gtts"  # global hint; language routing overrides this
-
-# Mode / Level
-MODE  = "{mode}"
-LEVEL = "{level}"
-
-# Languages
-LANG_MAP = {json.dumps({i:c for i,c in enumerate(lang_codes)}, ensure_ascii=False)}
-ENABLE_BILINGUAL   = {str(enable_bilingual)}
-PRIMARY_LANG_IDX   = {primary_lang_idx}
-SECONDARY_LANG_IDX = {secondary_lang_idx}
-PRIMARY_LANG_CODE   = LANG_MAP.get(PRIMARY_LANG_IDX, "en")
-SECONDARY_LANG_CODE = LANG_MAP.get(SECONDARY_LANG_IDX, "fr")
-
-# Language → Provider routing
-TTS_PROVIDER_MAP = {json.dumps(provider_map, ensure_ascii=False)}
-
-# Piper (local)
-PIPER_BIN    = 'piper'
-PIPER_MODEL  = 'voices/lb_LU-marylux-medium.onnx'
-PIPER_CONFIG = 'voices/lb_LU-marylux-medium.onnx.json'
-PIPER_MODEL_MAP = {{"lb": PIPER_MODEL}}
-PIPER_LENGTH  = 1.0
-PIPER_NOISE   = 0.5
-PIPER_NOISE_W = 0.5
-
-# Timings
-VOCAB_REPEAT = {{"primary": {vocab_primary}, "secondary": {vocab_secondary}, "pause_rep": {vocab_pause_rep}, "pause_sent": {vocab_pause_sent}}}
-SCENARIO_REPEAT = {{"primary": {scen_primary}, "secondary": {scen_secondary}, "pause_rep": {scen_pause_rep}, "pause_sent": {scen_pause_sent}}}
-
-# Background / video
-BG_MODE   = "{bg_mode}"
-BG_ENABLED= {str(bg_enabled)}
-VIDEO_SIZE= "{video_size}"
-VIDEO_FPS = {video_fps}
-
-# LLM
-USE_LLM           = {str(use_llm)}
-GENERATE_WITH_LLM = {str(use_llm)}
-LLM_TOPIC         = {json.dumps(llm_topic, ensure_ascii=False)}
-LLM_ITEMS         = {llm_items}
-LLM_PROVIDER      = "{llm_provider}"
-OPENAI_MODEL      = "{llm_model if llm_provider=='openai' else 'gpt-4o'}"
-OLLAMA_BASE_URL   = "http://localhost:11434"
-OLLAMA_MODEL      = "{llm_model if llm_provider=='ollama' else 'llama3.1:8b'}"
-LLM_MODEL         = OPENAI_MODEL if LLM_PROVIDER == "openai" else OLLAMA_MODEL
-
-# FFmpeg fallback
-FFMPEG_FALLBACK = r".\\ffmpeg\\bin\\ffmpeg.exe"
-
-# Caches
-CACHE_TTS_DIR   = Path(".cache_tts"); CACHE_TTS_DIR.mkdir(exist_ok=True)
-CACHE_IMG_DIR   = Path(".cache_images"); CACHE_IMG_DIR.mkdir(exist_ok=True)
-CACHE_VIDEO_DIR = Path(".cache_video"); CACHE_VIDEO_DIR.mkdir(exist_ok=True)
-
-APP_ID = "TTS-Video CFR multilingual"
-"""
-    (PROJECT_ROOT / "settings_temp.py").write_text(content, encoding="utf-8")
-    return (edition == "premium"), warnings
-
 @app.post("/api/save")
 def api_save():
     data = request.json or {}
-    _, warnings = write_settings_temp(data)
-    return jsonify({"ok": True, "warnings": warnings})
+    js, warnings = settings_from_payload(data, _is_premium_unlocked())
+    return jsonify({"ok": True, "warnings": warnings, "settings_id": _store_settings(js)})
 
 @app.post("/api/clear-cache")
 def api_clear_cache():
@@ -289,53 +160,172 @@ def api_list_outputs():
             items.append({"name": p.name, "is_dir": p.is_dir()})
     return jsonify({"items": items})
 
-# -------- SSE run (stable) --------
-@app.get("/api/run")
-def api_run():
+# -------- Jobs: submit / status / cancel / list --------
+SSE_HEADERS = {
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache, no-transform",
+    "X-Accel-Buffering": "no",
+    "Connection": "keep-alive",
+}
+
+def _submit_run(js: JobSettings):
+    label = f"{getattr(js, 'MODE', '')}/{getattr(js, 'LEVEL', '')}/" + (
+        f"llm:{getattr(js, 'LLM_TOPIC', '')}" if getattr(js, "GENERATE_WITH_LLM", False) else str(getattr(js, "INPUT_FILENAME", "")))
+    return ENGINE.submit(run_main_pipeline, js, label=label)
+
+def _queue_full_response(e: QueueFull):
+    resp = jsonify({"ok": False, "error": f"Queue full: {e}", **ENGINE.stats()})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = "10"
+    return resp
+
+@app.post("/api/jobs")
+def api_jobs_submit():
+    data = request.json or {}
+    warnings: List[str] = []
+    if data.get("settings_id") and len(data) == 1:
+        js = _settings_for_run(str(data["settings_id"]))
+        if js is None:
+            return _unknown_settings_response(str(data["settings_id"]))
+    else:
+        js, warnings = settings_from_payload(data, _is_premium_unlocked())
+    try:
+        job = _submit_run(js)
+    except QueueFull as e:
+        return _queue_full_response(e)
+    return jsonify({"ok": True, "job": job.to_dict(), "warnings": warnings}), 202
+
+@app.get("/api/jobs")
+def api_jobs_list():
+    return jsonify({"jobs": [j.to_dict() for j in ENGINE.list()], **ENGINE.stats()})
+
+# -------- Metrics (job queue + shared HTTP pools) --------
+@app.get("/api/metrics")
+def api_metrics():
+    out = {"jobs": ENGINE.stats()}
+    try:
+        import video_utils
+        out["http_pools"] = video_utils.http_pool_stats()
+    except Exception as e:
+        out["http_pools"] = {"error": str(e)}
+    out["llm"] = llm_clients.stats()
+    return jsonify(out)
+
+@app.get("/api/jobs/<job_id>")
+def api_jobs_status(job_id: str):
+    job = ENGINE.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Unknown job"}), 404
+    out = {"ok": True, "job": job.to_dict()}
+    if request.args.get("log"):
+        out["log"] = job.log_text()
+    return jsonify(out)
+
+@app.post("/api/jobs/<job_id>/cancel")
+def api_jobs_cancel(job_id: str):
+    job = ENGINE.cancel(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Unknown job"}), 404
+    return jsonify({"ok": True, "job": job.to_dict()})
+
+def _job_event_stream(job, start: int = 0) -> Response:
     @stream_with_context
     def _gen():
         try:
             # به مرورگر بگو اگر قطع شد، 2 ثانیه بعد دوباره وصل شود
             yield "retry: 2000\n\n"
-
-            # نکات کلیدی:
-            # -u  => خروجی بدون بافر برای child Python
-            # text=True/universal_newlines=True => خواندن خط‌به‌خط متنی (نه باینری)
-            proc = subprocess.Popen(
-                [sys.executable, "-u", "main.py"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                cwd=str(PROJECT_ROOT),
-                bufsize=1,                   # line-buffering فقط در حالت متنی
-                universal_newlines=True,     # یا text=True در نسخه‌های جدید
-                encoding="utf-8",
-                errors="replace",
-            )
-
-            # خواندن امن خط‌به‌خط
-            for line in proc.stdout:
-                yield f"data: {line.rstrip()}\n\n"
-
-            rc = proc.wait()
-            yield f"data: [DONE] exit={rc}\n\n"
+            if start == 0:
+                yield f"data: [JOB] id={job.id}\n\n"
+            for i, line in job.follow(start):
+                if line is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                # id = next line index → EventSource resumes via Last-Event-ID after a reconnect
+                yield f"id: {i + 1}\ndata: {line.rstrip()}\n\n"
+            yield f"data: [DONE] exit={job.exit_code} status={job.status}\n\n"
         except Exception as e:
             yield f"data: [ERROR] {e}\n\n"
+    return Response(_gen(), headers=SSE_HEADERS)
 
-    headers = {
-        "Content-Type": "text/event-stream",
-        "Cache-Control": "no-cache, no-transform",
-        "X-Accel-Buffering": "no",
-        "Connection": "keep-alive",
-    }
-    return Response(_gen(), headers=headers)
+@app.get("/api/jobs/<job_id>/events")
+def api_jobs_events(job_id: str):
+    job = ENGINE.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Unknown job"}), 404
+    try:
+        start = int(request.headers.get("Last-Event-ID") or request.args.get("from", 0))
+    except ValueError:
+        start = 0
+    return _job_event_stream(job, start)
+
+# -------- Batch: Text/ glob × language pairs, one engine job --------
+@app.post("/api/batch")
+def api_batch():
+    data = request.json or {}
+    pattern = str(data.get("pattern") or "*/*/*.txt").strip()
+    if Path(pattern).is_absolute() or ".." in Path(pattern).parts:
+        return jsonify({"ok": False, "error": f"Invalid pattern {pattern!r}; use e.g. Scenario/A1/*.txt"}), 400
+    pairs = data.get("pairs") or ["en-fr"]
+    pairs = [pairs] if isinstance(pairs, str) else [str(p) for p in pairs]
+    # UI choices (TTS, background, repeats …) from a saved settings_id apply to every lesson
+    base = _settings_for_run(str(data.get("settings_id") or ""))
+    if base is None:
+        return _unknown_settings_response(str(data["settings_id"]))
+    try:
+        batch.parse_pairs(pairs, batch._lang_codes(base))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    # batch lessons run beside the engine's own workers: never more than BATCH_WORKERS / JOB_WORKERS at once
+    cap = max(1, min(int(getattr(base, "BATCH_WORKERS", batch.BATCH_WORKERS)), JOB_WORKERS))
+    workers = cap
+    if data.get("workers") not in (None, ""):
+        try:
+            workers = int(data["workers"])
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": f"Invalid workers={data['workers']!r}; expected an integer"}), 400
+        if workers < 1:
+            return jsonify({"ok": False, "error": f"workers must be ≥ 1 (got {workers})"}), 400
+        workers = min(workers, cap)
+    try:
+        job = ENGINE.submit(batch.run_batch, pattern, pairs, base, label=f"batch:{pattern}",
+                            workers=workers, force=bool(data.get("force", False)),
+                            dry_run=bool(data.get("dry_run", False)), root=TEXT_ROOT)
+    except QueueFull as e:
+        return _queue_full_response(e)
+    return jsonify({"ok": True, "job": job.to_dict(), "workers": workers}), 202
+
+@app.get("/api/batch/manifest")
+def api_batch_manifest():
+    path = Path(getattr(default_settings(), "BATCH_MANIFEST", OUTPUT_DIR / "batch_manifest.json"))
+    if not path.exists():
+        return jsonify({"items": {}})
+    return send_from_directory(str(path.parent.resolve()), path.name, mimetype="application/json")
+
+# -------- SSE run (legacy: attach to a job submitted via POST /api/jobs) --------
+@app.get("/api/run")
+def api_run():
+    # attach only: EventSource reconnects (retry: 2000) re-issue this GET, so submitting here would
+    # start a duplicate render on every dropped connection; resume comes from Last-Event-ID instead
+    job_id = request.args.get("job_id", "").strip()
+    if not job_id:
+        return jsonify({"ok": False, "error": "job_id is required; submit the run with POST /api/jobs first"}), 400
+    return api_jobs_events(job_id)
 
 # -------- Fallback (one-shot) --------
 @app.get("/api/run-once")
 def api_run_once():
+    sid = request.args.get("settings_id", "")
+    js = _settings_for_run(sid)
+    if js is None:
+        return Response(f"[ERROR] Unknown settings_id {sid!r}; save the settings again (/api/save)\n",
+                        status=404, mimetype="text/plain; charset=utf-8")
+    try:
+        job = _submit_run(js)
+    except QueueFull as e:
+        return Response(f"[ERROR] Queue full: {e}\n", status=429, mimetype="text/plain; charset=utf-8")
     try:
-        proc = subprocess.run([sys.executable, "main.py"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=str(PROJECT_ROOT), check=False)
-        text = proc.stdout.decode("utf-8","ignore")
-        return Response(text, mimetype="text/plain; charset=utf-8")
+        job.wait()
+        return Response(job.log_text() + f"[DONE] exit={job.exit_code} status={job.status}\n", mimetype="text/plain; charset=utf-8")
     except Exception as e:
         return Response(f"[ERROR] {e}\n", status=500, mimetype="text/plain; charset=utf-8")
 
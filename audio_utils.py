@@ -3,19 +3,19 @@
 # Unified audio utilities for gTTS, ElevenLabs, Piper
 # - Robust logs + safe fallbacks (never silent-crash)
 # - Piper binary auto-detect (piper.exe / piper)
-# - Uses TTS_PROVIDER_MAP from settings_temp.py if present
+# - Per-run keys (TTS_PROVIDER_MAP, voices, Piper) come from the JobSettings
+#   passed by the caller; settings.py supplies the defaults
 # -------------------------------------------------------------
 
 from __future__ import annotations
-import io, os, json, hashlib, subprocess, tempfile, shutil
+import io, os, json, time, queue, atexit, hashlib, subprocess, tempfile, shutil, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from collections import deque
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
-# Prefer GUI settings_temp; fallback to settings.py
-try:
-    import settings_temp as _s
-except Exception:
-    import settings as _s
+# Defaults; per-run values arrive as an explicit `settings` argument
+import settings as _s
 
 # Optional deps
 try:
@@ -30,6 +30,16 @@ try:
     from pydub import AudioSegment
 except Exception:
     AudioSegment = None  # main.py checks this and exits if missing
+try:
+    import numpy as np
+except Exception:
+    np = None  # timeline mixer falls back to pydub concatenation
+
+# cooperative cancel for web jobs (no-op from the CLI)
+try:
+    from jobs import checkpoint
+except Exception:
+    def checkpoint() -> None: pass
 
 # -----------------------------
 # Constants / defaults
@@ -45,20 +55,9 @@ if isinstance(CACHE_TTS_DIR, str):
     CACHE_TTS_DIR = Path(CACHE_TTS_DIR)
 CACHE_TTS_DIR.mkdir(parents=True, exist_ok=True)
 
-ELEVENLABS_MODEL_ID = getattr(_s, "ELEVENLABS_MODEL_ID", "eleven_multilingual_v2")
-ELEVENLABS_VOICE_MAP: Dict[str, str] = getattr(_s, "ELEVENLABS_VOICE_MAP", {}) or {}
-ELEVENLABS_VOICE_ID  = getattr(_s, "ELEVENLABS_VOICE_ID", "EXAVITQu4vr4xnSDxMaL")  # fallback
-
-TTS_PROVIDER_MAP: Dict[str, str] = getattr(_s, "TTS_PROVIDER_MAP", {}) or {}
-
-# Piper config
-PIPER_BIN    = getattr(_s, "PIPER_BIN", "piper")  # or absolute path / piper.exe on Windows
-PIPER_MODEL  = getattr(_s, "PIPER_MODEL", "voices/lb_LU-marylux-medium.onnx")
-PIPER_CONFIG = getattr(_s, "PIPER_CONFIG", "voices/lb_LU-marylux-medium.onnx.json")
-PIPER_MODEL_MAP: Dict[str, str] = getattr(_s, "PIPER_MODEL_MAP", {}) or {"lb": PIPER_MODEL}
-PIPER_LENGTH = float(getattr(_s, "PIPER_LENGTH", 1.0))
-PIPER_NOISE  = float(getattr(_s, "PIPER_NOISE", 0.5))
-PIPER_NOISE_W= float(getattr(_s, "PIPER_NOISE_W", 0.5))
+def _cfg(settings, key: str, default: Any = None) -> Any:
+    """Per-run setting with settings.py fallback."""
+    return getattr(settings if settings is not None else _s, key, default)
 
 _ELEVEN_WARNED_ONCE = False
 
@@ -74,13 +73,40 @@ def _normalize(seg: AudioSegment) -> AudioSegment:
         seg = seg.set_sample_width(SAMPLE_WIDTH)
     return seg
 
+# -----------------------------
+# PCM helpers (NumPy timeline)
+# -----------------------------
+_NP_DTYPES = {2: "int16", 4: "int32"}
+
+def _np_ok() -> bool:
+    return np is not None and SAMPLE_WIDTH in _NP_DTYPES
+
+def _ms_to_frames(ms: int) -> int:
+    return int(ms) * SAMPLE_RATE // 1000
+
+def _seg_to_array(seg: AudioSegment) -> "np.ndarray":
+    """Normalized segment → (frames, CHANNELS) view of its PCM bytes (no copy)."""
+    seg = _normalize(seg)
+    return np.frombuffer(seg.raw_data, dtype=_NP_DTYPES[SAMPLE_WIDTH]).reshape(-1, CHANNELS)
+
+def _array_to_seg(arr: "np.ndarray") -> AudioSegment:
+    return AudioSegment(data=np.ascontiguousarray(arr, dtype=_NP_DTYPES[SAMPLE_WIDTH]).tobytes(),
+                        sample_width=SAMPLE_WIDTH, frame_rate=SAMPLE_RATE, channels=CHANNELS)
+
+def _clip_to_pcm(x: "np.ndarray") -> "np.ndarray":
+    info = np.iinfo(_NP_DTYPES[SAMPLE_WIDTH])
+    return np.clip(x, info.min, info.max).astype(_NP_DTYPES[SAMPLE_WIDTH])
+
+def _apply_gain(arr: "np.ndarray", gain_db: float) -> "np.ndarray":
+    return _clip_to_pcm(np.rint(arr.astype(np.float32) * np.float32(10.0 ** (float(gain_db) / 20.0))))
+
 # -----------------------------
 # Keys / cache helpers
 # -----------------------------
-def _get_eleven_api_key() -> str:
+def _get_eleven_api_key(settings=None) -> str:
     key = os.getenv("ELEVENLABS_API_KEY", "").strip()
     if not key:
-        key = (getattr(_s, "ELEVENLABS_API_KEY", "") or "").strip()
+        key = (_cfg(settings, "ELEVENLABS_API_KEY", "") or "").strip()
     if not key:
         for d in (Path.cwd(), Path(__file__).resolve().parent):
             f = d / "elevenlabs.key"
@@ -113,10 +139,80 @@ def _load_audio_from_file(p: Path) -> Optional[AudioSegment]:
 
 def _save_bytes(p: Path, data: bytes) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
-    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp = p.with_suffix(p.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
     tmp.write_bytes(data)
     tmp.replace(p)
 
+# Decoded tier: audio already at SAMPLE_RATE/CHANNELS/SAMPLE_WIDTH as raw PCM,
+# so a hit is a plain file read instead of an ffmpeg decode + resample
+PCM_CACHE_DIR = CACHE_TTS_DIR / "pcm"
+PCM_CACHE_MB = int(getattr(_s, "TTS_PCM_CACHE_MB", 1024))
+_PCM_MIN_AGE_S = 600        # never evict clips touched this recently (a running job may still read them)
+_PCM_EVICT_EVERY = 64 * 1024 * 1024   # bytes written between eviction sweeps
+_pcm_written = 0
+_pcm_lock = threading.Lock()
+
+def _pcm_cache_path(key: str) -> Path:
+    return PCM_CACHE_DIR / f"{key}.{SAMPLE_RATE}_{CHANNELS}_{SAMPLE_WIDTH}.pcm"
+
+def _load_pcm(key: str) -> Optional[AudioSegment]:
+    p = _pcm_cache_path(key)
+    try:
+        data = p.read_bytes()
+        if not data or len(data) % (CHANNELS * SAMPLE_WIDTH):
+            return None
+        os.utime(p)   # LRU touch
+    except OSError:   # missing file
+        return None
+    return AudioSegment(data=data, sample_width=SAMPLE_WIDTH, frame_rate=SAMPLE_RATE, channels=CHANNELS)
+
+def _evict_pcm(max_mb: int = PCM_CACHE_MB) -> None:
+    """LRU by mtime (hits are touched) until the PCM tier fits in max_mb; the compressed files stay."""
+    try:
+        entries = [(p.stat().st_mtime, p.stat().st_size, p) for p in PCM_CACHE_DIR.glob("*.pcm")]
+    except OSError:
+        return
+    total = sum(e[1] for e in entries)
+    limit = max(0, int(max_mb)) * 1024 * 1024
+    cutoff = time.time() - _PCM_MIN_AGE_S
+    for mtime, size, p in sorted(entries):
+        if total <= limit:
+            break
+        if mtime > cutoff:
+            continue
+        p.unlink(missing_ok=True)
+        total -= size
+
+def _store_pcm(key: str, seg: AudioSegment) -> AudioSegment:
+    global _pcm_written
+    seg = _normalize(seg)
+    data = seg.raw_data
+    try:
+        _save_bytes(_pcm_cache_path(key), data)
+    except Exception as e:
+        print(f"[WARN] PCM cache write failed: {e}")
+        return seg
+    # sweep every _PCM_EVICT_EVERY bytes written (a glob + stat per store would cost more than the hit saves)
+    with _pcm_lock:
+        _pcm_written += len(data)
+        sweep = _pcm_written >= min(_PCM_EVICT_EVERY, PCM_CACHE_MB * 1024 * 1024 // 4 or 1)
+        if sweep:
+            _pcm_written = 0
+    if sweep:
+        _evict_pcm()
+    return seg
+
+def _load_cached(key: str, compressed: Path) -> Optional[AudioSegment]:
+    """PCM tier first, then the compressed file (decoded once and promoted to PCM)."""
+    seg = _load_pcm(key)
+    if seg is not None:
+        return seg
+    if compressed.exists():
+        seg = _load_audio_from_file(compressed)
+        if seg is not None:
+            return _store_pcm(key, seg)
+    return None
+
 # -----------------------------
 # gTTS
 # -----------------------------
@@ -131,10 +227,9 @@ def _tts_gtts(text: str, lang_code: str) -> AudioSegment:
     g_code = _GTTs_LANG_MAP.get(str(lang_code).lower(), "en")
     key = _cache_key("gtts", g_code, text)
     cache_mp3 = _cache_path(key, ".mp3")
-    if cache_mp3.exists():
-        seg = _load_audio_from_file(cache_mp3)
-        if seg is not None:
-            return seg
+    seg = _load_cached(key, cache_mp3)
+    if seg is not None:
+        return seg
     try:
         tts = gTTS(text=text, lang=g_code)
         buf = io.BytesIO(); tts.write_to_fp(buf)
@@ -142,7 +237,7 @@ def _tts_gtts(text: str, lang_code: str) -> AudioSegment:
         _save_bytes(cache_mp3, data)
         seg = AudioSegment.from_file(io.BytesIO(data), format="mp3")
         print(f"[TTS] gTTS ok lang={g_code} len={len(seg)}ms")
-        return _normalize(seg)
+        return _store_pcm(key, seg)
     except Exception as e:
         print(f"[ERROR] gTTS failed ({g_code}): {e}")
         return _normalize(AudioSegment.silent(duration=800))
@@ -150,30 +245,31 @@ def _tts_gtts(text: str, lang_code: str) -> AudioSegment:
 # -----------------------------
 # ElevenLabs
 # -----------------------------
-def _pick_voice_for_lang(lang_code: str) -> Optional[str]:
-    if not ELEVENLABS_VOICE_MAP:
-        return ELEVENLABS_VOICE_ID
+def _pick_voice_for_lang(lang_code: str, settings=None) -> Optional[str]:
+    voice_map: Dict[str, str] = _cfg(settings, "ELEVENLABS_VOICE_MAP", {}) or {}
+    fallback_voice = _cfg(settings, "ELEVENLABS_VOICE_ID", "EXAVITQu4vr4xnSDxMaL")
+    if not voice_map:
+        return fallback_voice
     lang = str(lang_code).lower()
-    if lang in ELEVENLABS_VOICE_MAP:
-        return ELEVENLABS_VOICE_MAP[lang]
+    if lang in voice_map:
+        return voice_map[lang]
     base = lang.split("-")[0]
-    for k,v in ELEVENLABS_VOICE_MAP.items():
+    for k,v in voice_map.items():
         if k.split("-")[0] == base:
             return v
-    return ELEVENLABS_VOICE_ID
+    return fallback_voice
 
-def _tts_elevenlabs(text: str, lang_code: str, api_key: str) -> AudioSegment:
+def _tts_elevenlabs(text: str, lang_code: str, api_key: str, settings=None) -> AudioSegment:
     if AudioSegment is None or requests is None:
         return _normalize(AudioSegment.silent(duration=800))
-    voice_id = _pick_voice_for_lang(lang_code)
-    model_id = ELEVENLABS_MODEL_ID or "eleven_multilingual_v2"
+    voice_id = _pick_voice_for_lang(lang_code, settings)
+    model_id = _cfg(settings, "ELEVENLABS_MODEL_ID", "eleven_multilingual_v2") or "eleven_multilingual_v2"
     extra = f"voice={voice_id}|model={model_id}"
     key = _cache_key("elevenlabs", str(lang_code).lower(), text, extra=extra)
     cache_mp3 = _cache_path(key, ".mp3")
-    if cache_mp3.exists():
-        seg = _load_audio_from_file(cache_mp3)
-        if seg is not None:
-            return seg
+    seg = _load_cached(key, cache_mp3)
+    if seg is not None:
+        return seg
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
     headers = {"xi-api-key": api_key, "accept": "audio/mpeg", "content-type": "application/json"}
     payload = {"text": text, "model_id": model_id, "voice_settings": {"stability": 0.45, "similarity_boost": 0.7}}
@@ -186,7 +282,7 @@ def _tts_elevenlabs(text: str, lang_code: str, api_key: str) -> AudioSegment:
         _save_bytes(cache_mp3, mp3_bytes)
         seg = AudioSegment.from_file(io.BytesIO(mp3_bytes), format="mp3")
         print(f"[TTS] ElevenLabs ok lang={lang_code} model={model_id} voice={voice_id} len={len(seg)}ms")
-        return _normalize(seg)
+        return _store_pcm(key, seg)
     except Exception as e:
         print(f"[ERROR] ElevenLabs failed: {e} → fallback gTTS")
         return _tts_gtts(text, lang_code)
@@ -194,12 +290,13 @@ def _tts_elevenlabs(text: str, lang_code: str, api_key: str) -> AudioSegment:
 # -----------------------------
 # Piper (local)
 # -----------------------------
-def _resolve_piper_bin() -> Optional[str]:
+def _resolve_piper_bin(settings=None) -> Optional[str]:
+    piper_bin = _cfg(settings, "PIPER_BIN", "piper")  # or absolute path / piper.exe on Windows
     # absolute
-    if PIPER_BIN and Path(PIPER_BIN).exists():
-        return str(PIPER_BIN)
+    if piper_bin and Path(piper_bin).exists():
+        return str(piper_bin)
     # PATH
-    for cand in [PIPER_BIN, "piper", "piper.exe"]:
+    for cand in [piper_bin, "piper", "piper.exe"]:
         if not cand:
             continue
         found = shutil.which(cand)
@@ -207,9 +304,12 @@ def _resolve_piper_bin() -> Optional[str]:
             return found
     return None
 
-def _resolve_piper_model_for_lang(lang_code: str) -> (str, str):
+def _resolve_piper_model_for_lang(lang_code: str, settings=None) -> (str, str):
     lang = str(lang_code or "en").lower()
-    model = PIPER_MODEL_MAP.get(lang) or PIPER_MODEL or ""
+    default_model = _cfg(settings, "PIPER_MODEL", "voices/lb_LU-marylux-medium.onnx")
+    piper_config = _cfg(settings, "PIPER_CONFIG", "voices/lb_LU-marylux-medium.onnx.json")
+    model_map = _cfg(settings, "PIPER_MODEL_MAP", {}) or {"lb": default_model}
+    model = model_map.get(lang) or default_model or ""
     conf = ""
     if model:
         mp = Path(model)
@@ -219,95 +319,278 @@ def _resolve_piper_model_for_lang(lang_code: str) -> (str, str):
                 if ons:
                     mp = ons[0]
         model = str(mp)
-        cand = PIPER_CONFIG or (str(mp) + ".json")
+        cand = piper_config or (str(mp) + ".json")
         if Path(cand).exists():
             conf = cand
     else:
-        conf = PIPER_CONFIG or ""
+        conf = piper_config or ""
     return model, conf
 
-def _tts_piper(text: str, lang_code: str) -> AudioSegment:
+class _PiperWorker:
+    """One long-lived `piper --json-input` process: a JSON line per sentence on stdin, output path back on stdout."""
+
+    def __init__(self, cmd: List[str]):
+        self.cmd = cmd
+        self.proc: Optional[subprocess.Popen] = None
+        self._out: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._err: deque = deque(maxlen=20)
+
+    def _start(self) -> None:
+        self._out = queue.Queue()
+        self.proc = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     text=True, encoding="utf-8", bufsize=1)
+        threading.Thread(target=self._pump, args=(self.proc.stdout, self._out), daemon=True).start()
+        threading.Thread(target=self._pump, args=(self.proc.stderr, None), daemon=True).start()
+        print(f"[TTS] Piper worker started (pid={self.proc.pid})")
+
+    def _pump(self, stream, sink) -> None:
+        for line in stream:
+            if sink is not None:
+                sink.put(line.strip())
+            else:
+                self._err.append(line.rstrip())
+        if sink is not None:
+            sink.put(None)  # EOF → process died
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def synth(self, text: str, out_wav: Path, timeout: float) -> bool:
+        if not self.alive():
+            if self.proc is not None:
+                print(f"[WARN] Piper worker exited (code={self.proc.returncode}); restarting | {' / '.join(list(self._err)[-2:])}")
+            self._start()
+        try:
+            self.proc.stdin.write(json.dumps({"text": text, "output_file": str(out_wav)}, ensure_ascii=False) + "\n")
+            self.proc.stdin.flush()
+            line = self._out.get(timeout=timeout)
+        except (OSError, queue.Empty) as e:
+            print(f"[WARN] Piper worker unresponsive ({type(e).__name__}); killing")
+            self.close()
+            return False
+        if line is None:
+            return False
+        return out_wav.exists() and out_wav.stat().st_size > 0
+
+    def close(self) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            try:
+                self.proc.kill()
+            except Exception:
+                pass
+        self.proc = None
+
+_PIPER_POOLS: Dict[Tuple[str, ...], "queue.Queue[_PiperWorker]"] = {}
+_PIPER_POOLS_LOCK = threading.Lock()
+
+def _piper_pool(cmd: List[str], size: int) -> "queue.Queue[_PiperWorker]":
+    key = tuple(cmd)
+    with _PIPER_POOLS_LOCK:
+        pool = _PIPER_POOLS.get(key)
+        if pool is None:
+            pool = queue.Queue()
+            for _ in range(max(1, size)):
+                pool.put(_PiperWorker(cmd))   # processes start lazily on first sentence
+            _PIPER_POOLS[key] = pool
+        return pool
+
+@atexit.register
+def _close_piper_workers() -> None:
+    with _PIPER_POOLS_LOCK:
+        for pool in _PIPER_POOLS.values():
+            for w in list(pool.queue):
+                w.close()
+
+def _piper_args(model_path: str, config_path: str, length: float, noise: float, noise_w: float) -> List[str]:
+    args = ["--model", str(model_path)]
+    if config_path and Path(config_path).exists():
+        args += ["--config", str(config_path)]
+    if length: args += ["--length_scale", str(float(length))]
+    if noise is not None: args += ["--noise_scale", str(float(noise))]
+    if noise_w is not None: args += ["--noise-w-scale", str(float(noise_w))]
+    return args
+
+def _tts_piper(text: str, lang_code: str, settings=None) -> AudioSegment:
     if AudioSegment is None:
         return _normalize(AudioSegment.silent(duration=800))
-    bin_path = _resolve_piper_bin()
+    bin_path = _resolve_piper_bin(settings)
     if not bin_path:
         print("[ERROR] Piper binary not found in PATH; set settings.PIPER_BIN to full path.")
         return _normalize(AudioSegment.silent(duration=800))
-    model_path, config_path = _resolve_piper_model_for_lang(lang_code)
+    model_path, config_path = _resolve_piper_model_for_lang(lang_code, settings)
     if not model_path or not Path(model_path).exists():
         print(f"[ERROR] Piper model not found for '{lang_code}'.")
         return _normalize(AudioSegment.silent(duration=800))
-    extra = f"model={model_path}|len={PIPER_LENGTH}|nz={PIPER_NOISE}|nw={PIPER_NOISE_W}"
+    length  = float(_cfg(settings, "PIPER_LENGTH", 1.0))
+    noise   = float(_cfg(settings, "PIPER_NOISE", 0.5))
+    noise_w = float(_cfg(settings, "PIPER_NOISE_W", 0.5))
+    extra = f"model={model_path}|len={length}|nz={noise}|nw={noise_w}"
     key = _cache_key("piper", str(lang_code).lower(), text, extra=extra)
     cache_wav = _cache_path(key, ".wav")
-    if cache_wav.exists():
-        seg = _load_audio_from_file(cache_wav)
-        if seg is not None:
-            return seg
+    seg = _load_cached(key, cache_wav)
+    if seg is not None:
+        return seg
+    args = _piper_args(model_path, config_path, length, noise, noise_w)
     with tempfile.TemporaryDirectory() as td:
         td = Path(td)
         in_txt = td / "in.txt"; out_wav = td / "out.wav"
-        in_txt.write_text(text, encoding="utf-8")
-        cmd = [str(bin_path), "--model", str(model_path), "--output_file", str(out_wav), "--input_file", str(in_txt)]
-        if config_path and Path(config_path).exists():
-            cmd += ["--config", str(config_path)]
-        if PIPER_LENGTH: cmd += ["--length_scale", str(float(PIPER_LENGTH))]
-        if PIPER_NOISE is not None: cmd += ["--noise_scale", str(float(PIPER_NOISE))]
-        if PIPER_NOISE_W is not None: cmd += ["--noise-w-scale", str(float(PIPER_NOISE_W))]
-        try:
-            print(f"[TTS] Piper run: {' '.join(cmd[:6])} ...")
-            r = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if out_wav.exists():
-                _save_bytes(cache_wav, out_wav.read_bytes())
-                seg = AudioSegment.from_file(cache_wav)
-                print(f"[TTS] Piper ok lang={lang_code} len={len(seg)}ms")
-                return _normalize(seg)
-            else:
-                print("[ERROR] Piper finished but no output wav produced.")
-        except Exception as e:
-            err = ""
+        ok = False
+        if bool(_cfg(settings, "PIPER_PERSISTENT", True)):
+            pool = _piper_pool([str(bin_path)] + args + ["--json-input"], int(_cfg(settings, "PIPER_WORKERS", 1)))
+            worker = pool.get()
             try:
-                err = (r.stderr or b"").decode("utf-8", "ignore")[:220]
-            except Exception:
-                pass
-            print(f"[ERROR] Piper failed: {e} | {err}")
+                ok = worker.synth(text, out_wav, float(_cfg(settings, "PIPER_TIMEOUT", 60)))
+            finally:
+                pool.put(worker)
+            if not ok:
+                print("[WARN] Piper worker failed; running one-shot piper")
+        if not ok:
+            in_txt.write_text(text, encoding="utf-8")
+            cmd = [str(bin_path)] + args + ["--output_file", str(out_wav), "--input_file", str(in_txt)]
+            try:
+                print(f"[TTS] Piper run: {' '.join(cmd[:3])} ...")
+                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except Exception as e:
+                err = (getattr(e, "stderr", b"") or b"").decode("utf-8", "ignore")[:220]
+                print(f"[ERROR] Piper failed: {e} | {err}")
+        if out_wav.exists():
+            _save_bytes(cache_wav, out_wav.read_bytes())
+            seg = AudioSegment.from_file(cache_wav)
+            print(f"[TTS] Piper ok lang={lang_code} len={len(seg)}ms")
+            return _store_pcm(key, seg)
+        print("[ERROR] Piper finished but no output wav produced.")
     return _normalize(AudioSegment.silent(duration=800))
 
 # -----------------------------
 # Provider resolver
 # -----------------------------
-def _resolve_provider_for_lang(lang_code: str, provider_hint: str = "gtts") -> str:
+def _resolve_provider_for_lang(lang_code: str, provider_hint: str = "gtts", settings=None) -> str:
     try:
         lang = (lang_code or "").lower().strip()
     except Exception:
         lang = "en"
-    prov_map = TTS_PROVIDER_MAP or {}
+    prov_map = _cfg(settings, "TTS_PROVIDER_MAP", {}) or {}
     chosen = prov_map.get(lang) or prov_map.get("default") or prov_map.get("_default")
     if not chosen:
-        chosen = provider_hint or getattr(_s, "TTS_PROVIDER", "gtts")
+        chosen = provider_hint or _cfg(settings, "TTS_PROVIDER", "gtts")
     return str(chosen).lower().strip()
 
 # -----------------------------
 # Public: unified TTS wrapper
 # -----------------------------
-def safe_tts_to_segment(text: str, lang_code: str, provider: str = "gtts") -> AudioSegment:
+def safe_tts_to_segment(text: str, lang_code: str, provider: str = "gtts", settings=None) -> AudioSegment:
     if AudioSegment is None:
         raise RuntimeError("pydub not available; install requirements.")
-    chosen = _resolve_provider_for_lang(lang_code, provider_hint=provider)
+    chosen = _resolve_provider_for_lang(lang_code, provider_hint=provider, settings=settings)
     print(f"[TTS] selected provider={chosen} lang={lang_code}")
     if chosen == "piper":
-        return _tts_piper(text, lang_code)
+        return _tts_piper(text, lang_code, settings)
     if chosen == "elevenlabs":
-        api_key = _get_eleven_api_key()
+        api_key = _get_eleven_api_key(settings)
         if not api_key:
             global _ELEVEN_WARNED_ONCE
             if not _ELEVEN_WARNED_ONCE:
                 print("[ERROR] ELEVENLABS_API_KEY missing (fallback to gTTS).")
                 _ELEVEN_WARNED_ONCE = True
             return _tts_gtts(text, lang_code)
-        return _tts_elevenlabs(text, lang_code, api_key=api_key)
+        return _tts_elevenlabs(text, lang_code, api_key=api_key, settings=settings)
     return _tts_gtts(text, lang_code)
 
+# -----------------------------
+# Concurrent synthesis (draft stage)
+# -----------------------------
+_PROVIDER_SEMAPHORES: Dict[str, threading.BoundedSemaphore] = {}
+_PROVIDER_SEM_LOCK = threading.Lock()
+
+def _provider_semaphore(provider: str, settings=None) -> threading.BoundedSemaphore:
+    """Process-wide limit of in-flight requests per provider (TTS_CONCURRENCY)."""
+    with _PROVIDER_SEM_LOCK:
+        sem = _PROVIDER_SEMAPHORES.get(provider)
+        if sem is None:
+            limits = _cfg(settings, "TTS_CONCURRENCY", {}) or {}
+            sem = threading.BoundedSemaphore(max(1, int(limits.get(provider, 2))))
+            _PROVIDER_SEMAPHORES[provider] = sem
+        return sem
+
+def _synth_one(lang: str, text: str, provider: str, settings=None) -> AudioSegment:
+    chosen = _resolve_provider_for_lang(lang, provider_hint=provider, settings=settings)
+    with _provider_semaphore(chosen, settings):
+        checkpoint()
+        return safe_tts_to_segment(text, lang, provider=provider, settings=settings)
+
+class TTSPrefetcher:
+    """
+    Starts synthesis as (lang, text) items become known (e.g. lines streamed from the LLM);
+    synthesize_many(..., prefetch=p) collects those futures instead of synthesizing again.
+    """
+
+    def __init__(self, provider: str = "gtts", settings=None, max_workers: Optional[int] = None):
+        self.provider = provider
+        self.settings = settings
+        workers = max(1, int(max_workers or _cfg(settings, "TTS_MAX_WORKERS", 6)))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-pre")
+        self._futs: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, lang: str, text: str) -> None:
+        key = (str(lang), str(text))
+        with self._lock:
+            if key in self._futs or not key[1].strip():
+                return
+            self._futs[key] = self._pool.submit(contextvars.copy_context().run, _synth_one,
+                                                key[0], key[1], self.provider, self.settings)
+
+    def take(self) -> Dict[Tuple[str, str], Future]:
+        with self._lock:
+            return dict(self._futs)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+def synthesize_many(items: Iterable[Tuple[str, str]], provider: str = "gtts", settings=None,
+                    max_workers: Optional[int] = None,
+                    prefetch: Optional[TTSPrefetcher] = None) -> Dict[Tuple[str, str], AudioSegment]:
+    """
+    Synthesize unique (lang, text) items concurrently; returns {(lang, text): segment}.
+    Each item is fetched once (items already started by `prefetch` are awaited, not refetched);
+    failures come back as 800ms of silence (like the serial path).
+    """
+    if AudioSegment is None:
+        raise RuntimeError("pydub not available; install requirements.")
+    unique = list(dict.fromkeys((str(lang), str(text)) for lang, text in items))
+    started = prefetch.take() if prefetch is not None else {}
+    if not unique:
+        if prefetch is not None:
+            prefetch.close()
+        return {}
+
+    futs: Dict[Future, Tuple[str, str]] = {started[k]: k for k in unique if k in started}
+    todo = [k for k in unique if k not in started]
+    workers = max(1, int(max_workers or _cfg(settings, "TTS_MAX_WORKERS", 6)))
+    out: Dict[Tuple[str, str], AudioSegment] = {}
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(todo)), thread_name_prefix="tts") if todo else None
+    try:
+        # copy_context per task: worker threads keep the job's log routing / cancel flag
+        for lang, text in todo:
+            futs[pool.submit(contextvars.copy_context().run, _synth_one, lang, text, provider, settings)] = (lang, text)
+        for fut in as_completed(futs):
+            key = futs[fut]
+            try:
+                out[key] = fut.result()
+            except Exception as e:
+                print(f"[ERROR] TTS failed ({key[0]}): {e}")
+                out[key] = _normalize(AudioSegment.silent(duration=800))
+            checkpoint()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if prefetch is not None:
+            prefetch.close()
+    reused = len(unique) - len(todo)
+    print(f"[TTS] synthesized {len(unique)} unique item(s) with {min(workers, max(1, len(todo)))} worker(s)"
+          + (f"; {reused} started early" if reused else ""))
+    return out
+
 # -----------------------------
 # Background music
 # -----------------------------
@@ -318,39 +601,103 @@ def load_bg_music(path: str, total_ms: int, gain_db: float = -18.0) -> Optional[
     if not p.exists():
         return None
     try:
-        bg = AudioSegment.from_file(p)
-        if gain_db:
-            bg = bg + float(gain_db)
-        bg = _normalize(bg)
+        bg = _normalize(AudioSegment.from_file(p))
         if len(bg) <= 0:
             return None
+        if _np_ok():
+            # gain once on the source, then tile to the program length in one pass
+            arr = _seg_to_array(bg)
+            if gain_db:
+                arr = _apply_gain(arr, gain_db)
+            return _array_to_seg(np.resize(arr, (_ms_to_frames(total_ms), CHANNELS)))
+        if gain_db:
+            bg = bg + float(gain_db)
         reps = max(1, int(total_ms // len(bg)) + 1)
-        out = AudioSegment.silent(duration=0)
-        for _ in range(reps):
-            out += bg
+        out = bg * reps
         if len(out) > total_ms:
             out = out[:total_ms]
         return out
     except Exception:
         return None
 
+def overlay_bg(voice: AudioSegment, bg: Optional[AudioSegment]) -> AudioSegment:
+    """Mix bg under voice (result keeps the voice length); saturating int add."""
+    if bg is None:
+        return voice
+    if not _np_ok():
+        return voice.overlay(bg)
+    a = _seg_to_array(voice)
+    b = _seg_to_array(bg)[:len(a)]
+    mixed = a.astype(np.int64)
+    mixed[:len(b)] += b
+    return _array_to_seg(_clip_to_pcm(mixed))
+
 # -----------------------------
 # Builder: cues -> final audio
 # -----------------------------
-def build_audio_snapped_to_cues(cues: List[Dict[str, Any]], pause_rep_ms: int = PAUSE_REP) -> AudioSegment:
+def build_audio_snapped_to_cues(cues: List[Dict[str, Any]], pause_rep_ms: int = PAUSE_REP, settings=None,
+                                segments: Optional[Dict[Tuple[str, str], AudioSegment]] = None) -> AudioSegment:
+    """
+    Assemble the final track; each cue is repeated, then padded/trimmed to its [start, end] slot.
+    `segments` = already-decoded TTS keyed (lang, text) (e.g. from synthesize_many); misses are synthesized.
+    With NumPy the track is one preallocated buffer written at sample offsets (linear in program length).
+    """
     if AudioSegment is None:
         raise RuntimeError("pydub not available; install requirements.")
+    if not _np_ok():
+        return _build_audio_concat(cues, pause_rep_ms, settings, segments)
+    gap_n = _ms_to_frames(max(0, int(pause_rep_ms)))
+    placed = []   # (offset, frames, pcm, repeat)
+    cursor = 0
+    total = len(cues)
+    for idx, cue in enumerate(cues, start=1):
+        checkpoint()
+        start_ms = int(cue.get("start", 0))
+        end_ms   = int(cue.get("end", start_ms))
+        target_ms = max(0, end_ms - start_ms)
+        text   = str(cue.get("text", "") or "")
+        lang   = str(cue.get("lang", "en") or "en")
+        repeat = max(1, int(cue.get("repeat", 1)))
+        seg_one = (segments or {}).get((lang, text))
+        if seg_one is None:
+            provider = _cfg(settings, "TTS_PROVIDER", "gtts")
+            seg_one = safe_tts_to_segment(text, lang, provider=provider, settings=settings)
+        pcm = _seg_to_array(seg_one)
+        frames = _ms_to_frames(target_ms) if target_ms > 0 else repeat * len(pcm) + (repeat - 1) * gap_n
+        offset = max(_ms_to_frames(start_ms), cursor)   # never overlap the previous cue
+        placed.append((offset, frames, pcm, repeat))
+        cursor = offset + frames
+        print(f"[AUDIO] cue {idx}/{total} [{start_ms}→{end_ms}] target={target_ms}ms built={frames * 1000 // SAMPLE_RATE}ms")
+
+    out = np.zeros((cursor, CHANNELS), dtype=_NP_DTYPES[SAMPLE_WIDTH])
+    for offset, frames, pcm, repeat in placed:
+        at, stop = offset, offset + frames
+        for r in range(repeat):
+            if r > 0: at += gap_n
+            n = min(len(pcm), stop - at)
+            if n <= 0:
+                break
+            out[at:at + n] = pcm[:n]
+            at += len(pcm)
+    return _array_to_seg(out)
+
+def _build_audio_concat(cues: List[Dict[str, Any]], pause_rep_ms: int = PAUSE_REP, settings=None,
+                        segments: Optional[Dict[Tuple[str, str], AudioSegment]] = None) -> AudioSegment:
+    """pydub-only fallback (no NumPy): grows the track with +=."""
     out = AudioSegment.silent(duration=0)
     total = len(cues)
     for idx, cue in enumerate(cues, start=1):
+        checkpoint()
         start_ms = int(cue.get("start", 0))
         end_ms   = int(cue.get("end", start_ms))
         target_ms = max(0, end_ms - start_ms)
         text   = str(cue.get("text", "") or "")
         lang   = str(cue.get("lang", "en") or "en")
         repeat = max(1, int(cue.get("repeat", 1)))
-        provider = getattr(_s, "TTS_PROVIDER", "gtts")
-        seg_one = safe_tts_to_segment(text, lang, provider=provider)
+        seg_one = (segments or {}).get((lang, text))
+        if seg_one is None:
+            provider = _cfg(settings, "TTS_PROVIDER", "gtts")
+            seg_one = safe_tts_to_segment(text, lang, provider=provider, settings=settings)
         gap = _normalize(AudioSegment.silent(duration=max(0, int(pause_rep_ms))))
         built = AudioSegment.silent(duration=0)
         for r in range(repeat):
@@ -0,0 +1,290 @@
+# batch.py
+# -------------------------------------------------------------
+# Batch lesson builder over the Text/ tree
+# - Glob over Text/<Scenario|Vocab>/<level>/*.txt × language pairs
+#   (column codes from LANG_MAP, "en-fr" or "en-*" for every column)
+# - One main.main() job per file on a private JobEngine in this process,
+#   rendering all of its pairs (TARGET_PAIRS: each column synthesized
+#   once) → TTS / image / segment caches are shared across lessons
+# - Manifest (BATCH_MANIFEST): per output stem the input hash, the
+#   JobSettings fingerprint, status and files; unchanged outputs whose
+#   files still exist are skipped
+# - CLI:  python batch.py "Scenario/A1/*.txt" --pairs en-fr en-de
+#   Web:  POST /api/batch (runs as one job of the app's engine)
+# -------------------------------------------------------------
+
+from __future__ import annotations
+import os, sys, json, time, hashlib, argparse, threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import settings as _s
+from job_settings import JobSettings, load_cli_settings
+from jobs import JobEngine, checkpoint, run_main_pipeline
+
+TEXT_ROOT = Path(getattr(_s, "BATCH_TEXT_ROOT", Path("Text")))
+BATCH_WORKERS = int(getattr(_s, "BATCH_WORKERS", 2))
+BATCH_MANIFEST = Path(getattr(_s, "BATCH_MANIFEST", Path("Output") / "batch_manifest.json"))
+
+# outputs a finished lesson must still have on disk to count as up to date (mp3 export is optional)
+REQUIRED_EXTS = (".wav", ".srt", ".ass", ".mp4")
+OUTPUT_EXTS = (".wav", ".mp3", ".srt", ".ass", ".mp4")
+
+# keys that never change what a lesson renders
+_FINGERPRINT_EXCLUDE = ("BATCH_WORKERS", "BATCH_MANIFEST", "LLM_REGENERATE", "FORCE_REBUILD")
+
+class BatchItem(NamedTuple):
+    input: Path          # Text/<Mode>/<Level>/<file>.txt
+    mode: str            # "scenario" | "vocab"
+    level: str
+    pair: Tuple[int, int]
+    key: str             # output stem relative to OUTPUT_DIR, also the manifest key
+    settings: JobSettings
+
+# -----------------------------
+# Planning
+# -----------------------------
+def _lang_codes(settings: JobSettings) -> Dict[int, str]:
+    return {int(i): str(c).lower() for i, c in dict(getattr(settings, "LANG_MAP", {0: "en", 1: "fr"})).items()}
+
+def parse_pairs(specs: Iterable[str], lang_map: Dict[int, str]) -> List[Tuple[int, int]]:
+    """["en-fr", "0-2", "en-*"] → column-index pairs, deduped in order ("en-*" = en with every other column)."""
+    by_code = {c: i for i, c in lang_map.items()}
+
+    def _col(tok: str) -> int:
+        tok = tok.strip().lower()
+        if tok.isdigit() and int(tok) in lang_map:
+            return int(tok)
+        if tok in by_code:
+            return by_code[tok]
+        raise ValueError(f"Unknown language column {tok!r} (LANG_MAP has {', '.join(lang_map.values())})")
+
+    out: List[Tuple[int, int]] = []
+    for spec in specs:
+        for part in str(spec).replace(",", " ").split():
+            a, sep, b = part.partition("-")
+            if not sep:
+                raise ValueError(f"Invalid pair {part!r}; expected <primary>-<secondary>, e.g. en-fr or en-*")
+            p = _col(a)
+            cols = [c for c in sorted(lang_map) if c != p] if b.strip() == "*" else [_col(b)]
+            for s in cols:
+                if s != p and (p, s) not in out:
+                    out.append((p, s))
+    return out
+
+def _columns(path: Path) -> int:
+    """Column count of the first non-empty line (lesson files are uniform)."""
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.strip():
+                return len(line.split("|"))
+    return 0
+
+def plan(pattern: str, pairs: Sequence[Tuple[int, int]], base: JobSettings,
+         root: Path = TEXT_ROOT) -> Tuple[List[BatchItem], List[str]]:
+    """Items for every file matching root/pattern × pair; returns (items, notes about skipped combinations)."""
+    root = Path(root)
+    lang_map = _lang_codes(base)
+    out_dir = Path(getattr(base, "OUTPUT_DIR", "Output"))
+    items: List[BatchItem] = []
+    notes: List[str] = []
+    for path in sorted(root.glob(pattern)):
+        if not path.is_file() or path.suffix.lower() != ".txt":
+            continue
+        rel = path.relative_to(root)
+        if len(rel.parts) != 3 or rel.parts[0].lower() not in ("scenario", "vocab"):
+            notes.append(f"{rel.as_posix()}: not under <Scenario|Vocab>/<level>/")
+            continue
+        subdir, level, _ = rel.parts
+        mode = subdir.lower()
+        ncols = _columns(path)
+        for p, s in pairs:
+            if max(p, s) >= ncols:
+                notes.append(f"{rel.as_posix()}: no column {max(p, s)} ({lang_map.get(max(p, s), '?')}); "
+                             f"file has {ncols}")
+                continue
+            key = f"{subdir}/{level}/{path.stem}_{lang_map[p]}-{lang_map[s]}"
+            js = base.replace(
+                INPUT_DIR=path.parent, INPUT_FILENAME=path.name, MODE=mode, LEVEL=level,
+                PRIMARY_LANG_IDX=p, SECONDARY_LANG_IDX=s,
+                PRIMARY_LANG_CODE=lang_map[p], SECONDARY_LANG_CODE=lang_map[s],
+                GENERATE_WITH_LLM=False, USE_LLM=False,
+                OUTPUT_DIR=out_dir / subdir / level, OUTPUT_STEM=Path(key).name,
+            )
+            items.append(BatchItem(path, mode, level, (p, s), key, js))
+    return items, notes
+
+# -----------------------------
+# Manifest
+# -----------------------------
+class Manifest:
+    """JSON file {"items": {key: entry}}, rewritten atomically after every finished item."""
+
+    def __init__(self, path: Path = BATCH_MANIFEST):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.items: Dict[str, Dict[str, Any]] = dict(data.get("items") or {})
+        except Exception:
+            self.items = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.items.get(key)
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.items[key] = entry
+            data = {"updated": time.time(), "items": dict(sorted(self.items.items()))}
+        self._write(data)
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[WARN] Batch manifest write failed: {e}")
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def _out_base(item: BatchItem) -> Path:
+    return Path(getattr(item.settings, "OUTPUT_DIR")) / str(getattr(item.settings, "OUTPUT_STEM"))
+
+def _outputs(item: BatchItem) -> List[str]:
+    base = _out_base(item)
+    return [Path(str(base) + ext).as_posix() for ext in OUTPUT_EXTS if Path(str(base) + ext).exists()]
+
+def _up_to_date(entry: Optional[Dict[str, Any]], input_hash: str, settings_hash: str, item: BatchItem) -> bool:
+    if not entry or entry.get("status") != "done":
+        return False
+    if entry.get("input_hash") != input_hash or entry.get("settings_hash") != settings_hash:
+        return False
+    base = _out_base(item)
+    return all(Path(str(base) + ext).exists() for ext in REQUIRED_EXTS)
+
+# -----------------------------
+# Run
+# -----------------------------
+def run_batch(pattern: str, pairs: Sequence[str], base: Optional[JobSettings] = None,
+              workers: Optional[int] = None, force: bool = False, dry_run: bool = False,
+              root: Path = TEXT_ROOT, manifest_path: Optional[Path] = None) -> Dict[str, int]:
+    """Render every (file, pair); returns counts {"planned", "skipped", "done", "failed", "cancelled"}."""
+    base = base or load_cli_settings()
+    items, notes = plan(pattern, parse_pairs(pairs, _lang_codes(base)), base, root=root)
+    for n in notes:
+        print(f"[INFO] Batch: skip {n}")
+    codes = _lang_codes(base)
+    manifest = Manifest(Path(manifest_path or getattr(base, "BATCH_MANIFEST", BATCH_MANIFEST)))
+    counts = {"planned": len(items), "skipped": 0, "done": 0, "failed": 0, "cancelled": 0}
+
+    todo: List[Tuple[BatchItem, str, str]] = []
+    for item in items:
+        input_hash = _file_hash(item.input)
+        settings_hash = item.settings.fingerprint(exclude=_FINGERPRINT_EXCLUDE)
+        if not force and _up_to_date(manifest.get(item.key), input_hash, settings_hash, item):
+            counts["skipped"] += 1
+            continue
+        todo.append((item, input_hash, settings_hash))
+    print(f"[INFO] Batch: {len(items)} output(s) for {pattern!r}; {counts['skipped']} unchanged, {len(todo)} to build.")
+    if dry_run:
+        for item, _, _ in todo:
+            print(f"[INFO]   would build {item.key}")
+        return counts
+    if not todo:
+        return counts
+
+    # one multi-target job per lesson: the file is split once and each (column, line) synthesized once
+    groups: Dict[Path, List[Tuple[BatchItem, str, str]]] = {}
+    for entry in todo:
+        groups.setdefault(entry[0].input, []).append(entry)
+
+    n_workers = max(1, int(workers or getattr(base, "BATCH_WORKERS", BATCH_WORKERS)))
+    engine = JobEngine(max_workers=n_workers, max_queue=len(groups))
+    jobs = []
+    for path, entries in groups.items():
+        first = entries[0][0]
+        js = first.settings.replace(TARGET_PAIRS=[e[0].pair for e in entries], OUTPUT_STEM=path.stem)
+        if force:
+            js = js.replace(FORCE_REBUILD=True)   # also bypass main's per-stage build manifest
+        jobs.append((engine.submit(run_main_pipeline, js, label=f"{path.parent.parent.name}/{path.parent.name}/{path.stem}"),
+                     path, entries))
+    print(f"[INFO] Batch: {len(jobs)} lesson job(s) for {len(todo)} output(s) on {n_workers} worker(s).")
+
+    t0 = time.time()
+    done = 0
+    try:
+        for job, path, entries in jobs:
+            while not job.wait(timeout=1.0):
+                checkpoint()
+            log_path = Path(getattr(entries[0][0].settings, "OUTPUT_DIR")) / f"{path.stem}.log"
+            try:
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                log_path.write_text(job.log_text(), encoding="utf-8")
+            except OSError:
+                pass
+            for item, input_hash, settings_hash in entries:
+                done += 1
+                status = job.status
+                if status == "done" and not all(Path(str(_out_base(item)) + ext).exists() for ext in REQUIRED_EXTS):
+                    status = "failed"
+                counts[status if status in counts else "failed"] += 1
+                manifest.put(item.key, {
+                    "input": item.input.as_posix(),
+                    "mode": item.mode,
+                    "level": item.level,
+                    "pair": [codes[item.pair[0]], codes[item.pair[1]]],
+                    "input_hash": input_hash,
+                    "settings_hash": settings_hash,
+                    "status": status,
+                    "exit_code": job.exit_code,
+                    "seconds": round((job.finished_at or time.time()) - (job.started_at or job.created_at), 2),
+                    "finished_at": job.finished_at,
+                    "outputs": _outputs(item),
+                    "log": log_path.as_posix(),
+                })
+                print(f"[{'OK' if status == 'done' else 'WARN'}] Batch {done}/{len(todo)}: {item.key} → {status}")
+    except BaseException:
+        # cancelled (web job) or Ctrl+C: stop everything still queued/running
+        for job, _, _ in jobs:
+            engine.cancel(job.id)
+        raise
+    finally:
+        engine.shutdown()
+
+    print(f"[INFO] Batch finished in {time.time() - t0:.1f}s: {counts['done']} done, {counts['failed']} failed, "
+          f"{counts['skipped']} unchanged.")
+    return counts
+
+# -----------------------------
+# CLI
+# -----------------------------
+def _cli(argv: Optional[Iterable[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Render lessons from the Text/ tree for several language pairs.")
+    ap.add_argument("pattern", nargs="?", default="*/*/*.txt",
+                    help="glob under --root, e.g. 'Scenario/A1/*.txt' (default: every lesson)")
+    ap.add_argument("--pairs", nargs="+", default=["en-fr"],
+                    help="primary-secondary columns by code or index: en-fr 0-2 en-* (default: en-fr)")
+    ap.add_argument("--workers", type=int, default=None, help=f"concurrent lessons (default: {BATCH_WORKERS})")
+    ap.add_argument("--root", type=Path, default=TEXT_ROOT)
+    ap.add_argument("--manifest", type=Path, default=None)
+    ap.add_argument("--force", action="store_true", help="rebuild even if input and settings are unchanged")
+    ap.add_argument("--dry-run", action="store_true", help="only list what would be built")
+    args = ap.parse_args(list(argv) if argv is not None else None)
+
+    try:
+        counts = run_batch(args.pattern, args.pairs, workers=args.workers, force=args.force,
+                           dry_run=args.dry_run, root=args.root, manifest_path=args.manifest)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 2
+    except KeyboardInterrupt:
+        print("\n[INFO] Batch aborted by user.")
+        return 130
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(_cli())
@@ -0,0 +1,265 @@
+# job_settings.py
+# -------------------------------------------------------------
+# Immutable per-job settings
+# - Defaults come from settings.py (all UPPER_CASE keys)
+# - Web payloads (/api/save, /api/jobs) are validated into a JobSettings
+# - Passed explicitly through main / audio_utils, so concurrent jobs
+#   never share a settings_temp.py file or a re-imported module
+# -------------------------------------------------------------
+
+from __future__ import annotations
+import re, json, hashlib
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import settings as _defaults
+
+LEVELS = ("A1", "A2", "B1", "B2")
+MODES = ("vocab", "scenario")
+BG_MODES = ("per_sentence", "single", "none")
+TTS_PROVIDERS = ("gtts", "elevenlabs", "piper")
+
+def _freeze(v: Any) -> Any:
+    if isinstance(v, Mapping):
+        return MappingProxyType({k: _freeze(x) for k, x in v.items()})
+    if isinstance(v, (list, tuple, set, frozenset)):
+        return tuple(_freeze(x) for x in v)
+    return v
+
+def _thaw(v: Any) -> Any:
+    if isinstance(v, Mapping):
+        return {k: _thaw(x) for k, x in v.items()}
+    if isinstance(v, tuple):
+        return [_thaw(x) for x in v]
+    return v
+
+# -----------------------------
+# Settings object
+# -----------------------------
+class JobSettings:
+    """Read-only settings namespace; same attribute names as settings.py, so getattr(s, KEY, default) works."""
+    __slots__ = ("_values",)
+
+    def __init__(self, values: Mapping[str, Any]):
+        object.__setattr__(self, "_values", MappingProxyType({k: _freeze(v) for k, v in values.items()}))
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("JobSettings is immutable; use .replace(...)")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("JobSettings is immutable")
+
+    def __repr__(self) -> str:
+        return f"JobSettings({len(self._values)} keys, mode={self._values.get('MODE')!r}, input={self._values.get('INPUT_FILENAME')!r})"
+
+    def replace(self, **changes: Any) -> "JobSettings":
+        vals = dict(self._values)
+        vals.update(changes)
+        return JobSettings(vals)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: _thaw(v) for k, v in self._values.items()}
+
+    def fingerprint(self, exclude: Iterable[str] = ()) -> str:
+        """sha256 over all values except `exclude`; equal settings → equal fingerprint across runs."""
+        skip = set(exclude)
+        vals = {k: v for k, v in self.as_dict().items() if k not in skip}
+        raw = json.dumps(vals, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_module(cls, mod) -> "JobSettings":
+        vals = {}
+        for k in dir(mod):
+            if k.isupper() and not k.startswith("_"):
+                vals[k] = getattr(mod, k)
+        return cls(vals)
+
+def default_settings() -> JobSettings:
+    return JobSettings.from_module(_defaults)
+
+def load_cli_settings() -> JobSettings:
+    """CLI (python main.py): a hand-written settings_temp.py still wins over settings.py."""
+    try:
+        import settings_temp as mod
+        print("[INFO] Using settings_temp.py")
+    except Exception:
+        mod = _defaults
+        print("[INFO] Using settings.py (fallback)")
+    return JobSettings.from_module(mod)
+
+# -----------------------------
+# Payload validation (web UI)
+# -----------------------------
+def _int(payload: Dict, key: str, default: int, lo: int, hi: int, warnings: List[str]) -> int:
+    raw = payload.get(key, default)
+    try:
+        v = int(raw)
+    except (TypeError, ValueError):
+        warnings.append(f"Invalid {key}={raw!r}; using {default}.")
+        return default
+    if v < lo or v > hi:
+        c = min(hi, max(lo, v))
+        warnings.append(f"{key}={v} out of range [{lo}, {hi}]; using {c}.")
+        return c
+    return v
+
+def _choice(payload: Dict, key: str, default: str, allowed, warnings: List[str], lower: bool = True) -> str:
+    v = str(payload.get(key, default) or default).strip()
+    if lower:
+        v = v.lower()
+    if v not in allowed:
+        warnings.append(f"Unknown {key}={v!r}; using {default}.")
+        return default
+    return v
+
+def settings_from_payload(payload: Dict, premium_unlocked: bool,
+                          base: Optional[JobSettings] = None) -> Tuple[JobSettings, List[str]]:
+    """Validate a UI payload into a JobSettings layered on settings.py defaults. Returns (settings, warnings)."""
+    payload = payload or {}
+    base = base or default_settings()
+    warnings: List[str] = []
+
+    edition_req = str(payload.get("edition","free")).lower()
+    edition = "premium" if (edition_req=="premium" and premium_unlocked) else "free"
+    if edition_req == "premium" and not premium_unlocked:
+        warnings.append("Premium requested but not activated; falling back to Free.")
+
+    mode  = _choice(payload, "mode", "vocab", MODES, warnings)
+    level = _choice(payload, "level", "A1", LEVELS, warnings, lower=False)
+    text_fn = str(payload.get("text_file","sample.txt") or "sample.txt")
+    if Path(text_fn).name != text_fn or not text_fn.lower().endswith(".txt"):
+        warnings.append(f"Invalid text_file={text_fn!r}; using sample.txt.")
+        text_fn = "sample.txt"
+
+    enable_bilingual   = bool(payload.get("enable_bilingual", True))
+    primary_lang_idx   = _int(payload, "primary_lang_idx", 0, 0, 63, warnings)
+    secondary_lang_idx = _int(payload, "secondary_lang_idx", 1, 0, 63, warnings)
+
+    vocab_repeat = {
+        "primary":    _int(payload, "vocab_primary", 1, 1, 10, warnings),
+        "secondary":  _int(payload, "vocab_secondary", 2, 0, 10, warnings),
+        "pause_rep":  _int(payload, "vocab_pause_rep", 2500, 0, 60000, warnings),
+        "pause_sent": _int(payload, "vocab_pause_sent", 2500, 0, 60000, warnings),
+    }
+    scenario_repeat = {
+        "primary":    _int(payload, "scen_primary", 1, 1, 10, warnings),
+        "secondary":  _int(payload, "scen_secondary", 2, 0, 10, warnings),
+        "pause_rep":  _int(payload, "scen_pause_rep", 2500, 0, 60000, warnings),
+        "pause_sent": _int(payload, "scen_pause_sent", 3500, 0, 60000, warnings),
+    }
+
+    bg_mode    = _choice(payload, "bg_mode", "per_sentence", BG_MODES, warnings)
+    bg_enabled = bool(payload.get("bg_enabled", True))
+    video_size = str(payload.get("video_size","1920x1080")).strip().lower()
+    if not re.fullmatch(r"\d{2,5}x\d{2,5}", video_size):
+        warnings.append(f"Invalid video_size={video_size!r}; using 1920x1080.")
+        video_size = "1920x1080"
+    video_fps  = _int(payload, "video_fps", 30, 1, 120, warnings)
+    force_rebuild = bool(payload.get("force_rebuild", False))
+
+    use_llm        = bool(payload.get("use_llm", False))
+    llm_regenerate = bool(payload.get("llm_regenerate", False))
+    llm_topic      = str(payload.get("llm_topic","")).strip()
+    items_override = bool(payload.get("items_override", False))
+    llm_items_basic= _int(payload, "llm_items_basic", 20, 1, 500, warnings)
+    estimated_items= _int(payload, "estimated_items", 20, 1, 500, warnings)
+    llm_items      = llm_items_basic if items_override else estimated_items
+
+    # Language universe from UI
+    base_langs = [str(c) for c in dict(base.LANG_MAP).values()]
+    lang_codes: List[str] = [str(c).lower() for c in (payload.get("lang_codes") or base_langs)]
+    if primary_lang_idx >= len(lang_codes): primary_lang_idx = 0
+    if secondary_lang_idx >= len(lang_codes): secondary_lang_idx = min(1, len(lang_codes)-1)
+
+    # Advanced TTS per-role
+    tts_primary   = (payload.get("tts_primary") or "gtts").lower()
+    tts_secondary = (payload.get("tts_secondary") or "gtts").lower()
+    for role, prov in (("tts_primary", tts_primary), ("tts_secondary", tts_secondary)):
+        if prov not in TTS_PROVIDERS:
+            warnings.append(f"Unknown {role}={prov!r}; using gtts.")
+    tts_primary   = tts_primary if tts_primary in TTS_PROVIDERS else "gtts"
+    tts_secondary = tts_secondary if tts_secondary in TTS_PROVIDERS else "gtts"
+
+    # Free gate: فقط gTTS
+    if edition == "free":
+        if tts_primary != "gtts" or tts_secondary != "gtts":
+            warnings.append("Free edition: Only gTTS is available; other TTS providers will be ignored.")
+        tts_primary = "gtts"; tts_secondary = "gtts"
+
+    lang_map_dict = {i: code for i, code in enumerate(lang_codes)}
+    primary_code   = lang_map_dict.get(primary_lang_idx, "en")
+    secondary_code = lang_map_dict.get(secondary_lang_idx, "fr")
+
+    # default route: premium -> elevenlabs ; free -> gtts
+    default_provider = "elevenlabs" if edition == "premium" else "gtts"
+    provider_map = {"default": default_provider, primary_code: tts_primary, secondary_code: tts_secondary}
+
+    # اگر lb استفاده شد و پریمیوم هستیم، به طور پیش‌فرض به Piper روت کن (اگر مدل موجود باشد)
+    pmap = dict(getattr(base, "PIPER_MODEL_MAP", {}) or {"lb": "voices/lb_LU-marylux-medium.onnx"})
+    if edition == "premium":
+        for code in [primary_code, secondary_code]:
+            if code == "lb" and code not in provider_map:
+                if code in pmap:
+                    provider_map[code] = "piper"
+
+    # اگر کاربر Piper انتخاب کرد ولی مدل محلی نبود → revert
+    for code in [primary_code, secondary_code]:
+        if provider_map.get(code) == "piper" and code not in pmap:
+            provider_map[code] = default_provider
+            warnings.append(f"Piper has no model for '{code}'; using {default_provider}.")
+
+    # LLM model policy (FREE: gpt-4o ; PREMIUM: gpt-4o/gpt-5)
+    req_provider = (payload.get("llm_provider") or "openai").lower()
+    req_model    = (payload.get("llm_model") or "gpt-4o")
+    if edition == "free":
+        llm_provider = "openai"; llm_model = "gpt-4o"
+    else:
+        if req_provider == "ollama":
+            llm_provider = "ollama"; llm_model = (req_model or "llama3.1:8b")
+        else:
+            llm_provider = "openai"
+            llm_model = req_model if req_model in ("gpt-4o","gpt-5") else "gpt-4o"
+    openai_model = llm_model if llm_provider == "openai" else "gpt-4o"
+    ollama_model = llm_model if llm_provider == "ollama" else "llama3.1:8b"
+
+    subdir = "Vocab" if mode == "vocab" else "Scenario"
+    js = base.replace(
+        INPUT_DIR=Path("Text") / subdir / level,
+        INPUT_FILENAME=text_fn,
+        EDITION=edition,
+        TTS_PROVIDER="gtts",  # global hint; language routing overrides this
+        MODE=mode,
+        LEVEL=level,
+        LANG_MAP=lang_map_dict,
+        ENABLE_BILINGUAL=enable_bilingual,
+        PRIMARY_LANG_IDX=primary_lang_idx,
+        SECONDARY_LANG_IDX=secondary_lang_idx,
+        PRIMARY_LANG_CODE=primary_code,
+        SECONDARY_LANG_CODE=secondary_code,
+        TTS_PROVIDER_MAP=provider_map,
+        VOCAB_REPEAT=vocab_repeat,
+        SCENARIO_REPEAT=scenario_repeat,
+        BG_MODE=bg_mode,
+        BG_ENABLED=bg_enabled,
+        VIDEO_SIZE=video_size,
+        VIDEO_FPS=video_fps,
+        FORCE_REBUILD=force_rebuild,
+        USE_LLM=use_llm,
+        GENERATE_WITH_LLM=use_llm,
+        LLM_TOPIC=llm_topic,
+        LLM_REGENERATE=llm_regenerate,
+        LLM_ITEMS=llm_items,
+        LLM_PROVIDER=llm_provider,
+        OPENAI_MODEL=openai_model,
+        OLLAMA_MODEL=ollama_model,
+        LLM_MODEL=openai_model if llm_provider == "openai" else ollama_model,
+    )
+    return js, warnings
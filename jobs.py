@@ -0,0 +1,241 @@
+# jobs.py
+# -------------------------------------------------------------
+# In-process job engine for the Flask app
+# - Runs the main.main() pipeline on a long-lived worker pool
+#   (no new Python interpreter per run → pydub/openai/requests,
+#    video_utils LEXICON and TTS/image caches stay warm)
+# - Captures print() output per job so SSE can stream it
+# - Bounded admission (max queued jobs) + cooperative cancel
+# -------------------------------------------------------------
+
+from __future__ import annotations
+import sys, io, time, uuid, threading, traceback, contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+class QueueFull(RuntimeError):
+    """Raised by JobEngine.submit() when the waiting queue is at capacity."""
+
+class JobCancelled(BaseException):
+    """Raised inside a job at the next checkpoint() after cancel(); BaseException so `except Exception` won't swallow it."""
+
+# job whose log receives print() output from the current thread/context
+_CURRENT_JOB: contextvars.ContextVar[Optional["Job"]] = contextvars.ContextVar("current_job", default=None)
+
+# -----------------------------
+# stdout routing
+# -----------------------------
+class _LogRouter(io.TextIOBase):
+    """sys.stdout replacement: writes from a job context go to that job's log, the rest to the real stream."""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+
+    @property
+    def encoding(self):
+        return getattr(self._fallback, "encoding", "utf-8")
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        job = _CURRENT_JOB.get()
+        if job is None:
+            return self._fallback.write(s)
+        job._write(s)
+        return len(s)
+
+    def flush(self) -> None:
+        try:
+            self._fallback.flush()
+        except Exception:
+            pass
+
+_ROUTER_LOCK = threading.Lock()
+
+def install_log_router() -> None:
+    with _ROUTER_LOCK:
+        if not isinstance(sys.stdout, _LogRouter):
+            sys.stdout = _LogRouter(sys.stdout)
+        if not isinstance(sys.stderr, _LogRouter):
+            sys.stderr = _LogRouter(sys.stderr)
+
+def checkpoint() -> None:
+    """Cancellation point for pipeline code; no-op outside a job."""
+    job = _CURRENT_JOB.get()
+    if job is not None and job._cancel.is_set():
+        raise JobCancelled(job.id)
+
+# -----------------------------
+# Job
+# -----------------------------
+class Job:
+    def __init__(self, job_id: str, label: str = ""):
+        self.id = job_id
+        self.label = label
+        self.status = "queued"           # queued → running → done | failed | cancelled
+        self.exit_code: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lines: List[str] = []
+        self._partial = ""
+        self._cond = threading.Condition()
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def _write(self, s: str) -> None:
+        with self._cond:
+            buf = self._partial + s
+            parts = buf.split("\n")
+            self._partial = parts.pop()
+            if parts:
+                self._lines.extend(p.rstrip("\r") for p in parts)
+                self._cond.notify_all()
+
+    def _finish(self, status: str, exit_code: int) -> None:
+        with self._cond:
+            if self._partial:
+                self._lines.append(self._partial)
+                self._partial = ""
+            self.status = status
+            self.exit_code = exit_code
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def follow(self, start: int = 0, heartbeat: float = 15.0) -> Iterator[Tuple[int, Optional[str]]]:
+        """Yield (index, line) from `start` until the job ends; (index, None) is a keep-alive when idle."""
+        i = max(0, int(start))
+        while True:
+            with self._cond:
+                if i >= len(self._lines) and not self.finished:
+                    self._cond.wait(timeout=heartbeat)
+                new = self._lines[i:]
+                done = self.finished
+            if new:
+                for line in new:
+                    yield i, line
+                    i += 1
+            elif not done:
+                yield i, None
+            if done and i >= len(self._lines):
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout=timeout)
+
+    def log_text(self) -> str:
+        with self._cond:
+            return "\n".join(self._lines) + ("\n" if self._lines else "")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "status": self.status,
+            "cancel_requested": self._cancel.is_set(),
+            "exit_code": self.exit_code,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "log_lines": len(self._lines),
+        }
+
+# -----------------------------
+# Engine
+# -----------------------------
+class JobEngine:
+    def __init__(self, max_workers: int = 1, max_queue: int = 8, history: int = 200):
+        install_log_router()
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.history = max(1, int(history))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, target: Callable[..., Any], *args, label: str = "", **kwargs) -> Job:
+        """Queue target(*args, **kwargs); raises QueueFull when max_queue jobs are already waiting."""
+        job = Job(uuid.uuid4().hex[:12], label=label)
+        with self._lock:
+            waiting = sum(1 for j in self._jobs.values() if j.status == "queued")
+            if waiting >= self.max_queue:
+                raise QueueFull(f"{waiting} job(s) waiting (max {self.max_queue})")
+            self._jobs[job.id] = job
+            self._prune_locked()
+        self._pool.submit(self._run, job, target, args, kwargs)
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job._cancel.set()
+        with self._lock:
+            if job.status == "queued":
+                job._finish("cancelled", -1)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": sum(1 for j in jobs if j.status == "queued"),
+            "running": sum(1 for j in jobs if j.status == "running"),
+        }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; queued jobs never start (cancel() running ones first)."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _prune_locked(self) -> None:
+        done = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.created_at)
+        for j in done[:max(0, len(self._jobs) - self.history)]:
+            self._jobs.pop(j.id, None)
+
+    def _run(self, job: Job, target: Callable[..., Any], args, kwargs) -> None:
+        with self._lock:
+            if job.status != "queued":   # cancelled while waiting
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        token = _CURRENT_JOB.set(job)
+        status, code = "done", 0
+        try:
+            checkpoint()
+            target(*args, **kwargs)
+        except JobCancelled:
+            print("[INFO] Job cancelled.")
+            status, code = "cancelled", -1
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            status = "done" if code == 0 else "failed"
+        except BaseException as e:
+            print(f"[FATAL] {e}")
+            traceback.print_exc(file=sys.stdout)
+            status, code = "failed", 1
+        finally:
+            _CURRENT_JOB.reset(token)
+            job._finish(status, code)
+
+# -----------------------------
+# Pipeline entry (runs inside a worker)
+# -----------------------------
+def run_main_pipeline(settings=None) -> None:
+    """Run main.main() in this process with an explicit (immutable) JobSettings."""
+    import main as _main
+    _main.main(settings)
@@ -0,0 +1,130 @@
+# llm_clients.py
+# -------------------------------------------------------------
+# Process-wide LLM client registry
+# - One OpenAI client per API key: its httpx pool keeps TLS
+#   connections warm across calls, the Responses → Chat fallback
+#   and the gpt-5 retry
+# - One pooled keep-alive requests.Session per Ollama host
+# - Shared by main.py (in-process jobs) and app.py; stats() feeds
+#   /api/metrics
+# -------------------------------------------------------------
+
+from __future__ import annotations
+import hashlib, threading
+from typing import Any, Dict, List
+
+import settings as _s
+
+# Optional deps
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except Exception:
+    requests = None
+try:
+    import openai as _openai
+    from openai import OpenAI
+except Exception:
+    _openai = None
+    OpenAI = None
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+LLM_POOL_SIZE = int(getattr(_s, "LLM_POOL_SIZE", 8))
+
+_LOCK = threading.Lock()
+_OPENAI_CLIENTS: Dict[str, Any] = {}        # sha256(api key)[:16] → OpenAI client
+_OLLAMA_SESSIONS: Dict[str, Any] = {}       # host → requests.Session
+_COUNTS = {"openai_clients": 0, "openai_lookups": 0, "openai_requests": 0, "ollama_lookups": 0}
+
+# -----------------------------
+# OpenAI
+# -----------------------------
+def _count_openai_request(_request) -> None:
+    with _LOCK:
+        _COUNTS["openai_requests"] += 1
+
+def _openai_http_client():
+    if httpx is None:
+        return None
+    # DefaultHttpxClient keeps the SDK's own timeout/redirect defaults (openai>=1.17)
+    factory = getattr(_openai, "DefaultHttpxClient", None) or httpx.Client
+    limits = httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE, keepalive_expiry=120)
+    return factory(limits=limits, event_hooks={"request": [_count_openai_request]})
+
+def openai_client(api_key: str):
+    """Shared OpenAI client for this key (created on first use)."""
+    if OpenAI is None:
+        raise RuntimeError("openai package not installed. Run: pip install --upgrade openai")
+    tag = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    with _LOCK:
+        _COUNTS["openai_lookups"] += 1
+        client = _OPENAI_CLIENTS.get(tag)
+        if client is None:
+            http_client = _openai_http_client()
+            client = OpenAI(api_key=api_key, http_client=http_client) if http_client is not None else OpenAI(api_key=api_key)
+            _OPENAI_CLIENTS[tag] = client
+            _COUNTS["openai_clients"] += 1
+        return client
+
+# -----------------------------
+# Ollama
+# -----------------------------
+def ollama_session(host: str):
+    """Shared keep-alive session for one Ollama host (no automatic retries: a retried generation costs a full completion)."""
+    if requests is None:
+        raise RuntimeError("'requests' not available; cannot call Ollama.")
+    key = host.rstrip("/")
+    with _LOCK:
+        _COUNTS["ollama_lookups"] += 1
+        sess = _OLLAMA_SESSIONS.get(key)
+        if sess is None:
+            sess = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=LLM_POOL_SIZE)
+            sess.mount("http://", adapter)
+            sess.mount("https://", adapter)
+            _OLLAMA_SESSIONS[key] = sess
+        return sess
+
+def ollama_models(host: str, timeout: float = 1.5) -> List[str]:
+    """Models installed on an Ollama host ([] when it is not reachable)."""
+    try:
+        r = ollama_session(host).get(host.rstrip("/") + "/api/tags", timeout=timeout)
+        r.raise_for_status()
+        return sorted(str(m.get("name")) for m in (r.json().get("models") or []) if m.get("name"))
+    except Exception:
+        return []
+
+# -----------------------------
+# Metrics
+# -----------------------------
+def _session_pools(sess) -> Dict[str, Dict]:
+    hosts = {}
+    for adapter in set(sess.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            reqs, conns = int(pool.num_requests), int(pool.num_connections)
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": reqs, "connections": conns, "reused": max(0, reqs - conns),
+                "hit_rate": round(max(0, reqs - conns) / reqs, 3) if reqs else 0.0,
+            }
+    return hosts
+
+def stats() -> Dict[str, Any]:
+    """Client reuse: OpenAI clients vs lookups/requests; per Ollama host, requests vs connections opened."""
+    with _LOCK:
+        counts = dict(_COUNTS)
+        sessions = list(_OLLAMA_SESSIONS.values())
+    ollama: Dict[str, Dict] = {}
+    for sess in sessions:
+        ollama.update(_session_pools(sess))
+    return {
+        "openai": {"clients": counts["openai_clients"], "lookups": counts["openai_lookups"],
+                   "requests": counts["openai_requests"]},
+        "ollama": {"sessions": len(sessions), "lookups": counts["ollama_lookups"], "hosts": ollama},
+    }
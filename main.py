@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 # -------------------------------------------------------------
 # TTS + Subtitles + Video Generator (LLM-aware)
-# - Prefers settings_temp.py (GUI), fallback to settings.py
+# - Per-run JobSettings (web jobs); CLI prefers settings_temp.py, fallback settings.py
 # - LLM: OpenAI (Responses + Chat fallback for non-gpt-5) / Ollama
 # - Input: LLM generated or Text file
 # - Hashtag extraction for image search (PRIMARY sentence tail)
 # - Builds SRT/ASS + audio + (optional) video background
+# - Incremental: <output>.build.json skips stages whose inputs are unchanged
+# - Multi-target (TARGET_PAIRS): one lesson → every language pair, each clip synthesized once
 # -------------------------------------------------------------
 
 from __future__ import annotations
@@ -14,8 +16,16 @@ import os
 import sys
 import re
 import json
+import time
+import shutil
+import hashlib
+import subprocess
+import contextvars
+import importlib.metadata
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Optional
 
 # --- safer console UTF-8
 if hasattr(sys.stdout, "reconfigure"):
@@ -26,14 +36,9 @@ if hasattr(sys.stdout, "reconfigure"):
         pass
 
 # -------------------------------------------------------------
-# Load settings (GUI temp preferred)
+# Settings: one immutable JobSettings per run (see job_settings.py)
 # -------------------------------------------------------------
-try:
-    import settings_temp as settings
-    print("[INFO] Using settings_temp.py (from GUI)")
-except Exception:
-    import settings
-    print("[INFO] Using settings.py (fallback)")
+from job_settings import JobSettings, load_cli_settings
 
 # -------------------------------------------------------------
 # Optional deps
@@ -54,16 +59,22 @@ except Exception:
 try:
     from audio_utils import (
         safe_tts_to_segment,
+        synthesize_many,
+        TTSPrefetcher,
         _normalize,
         load_bg_music,
+        overlay_bg,
         build_audio_snapped_to_cues,  # new name in your utils
         PAUSE_REP as _AU_PAUSE_REP,
         PAUSE_SENT as _AU_PAUSE_SENT,
     )
 except Exception:
     safe_tts_to_segment = None
+    synthesize_many = None
+    TTSPrefetcher = None
     _normalize = None
     load_bg_music = None
+    overlay_bg = None
     build_audio_snapped_to_cues = None
     _AU_PAUSE_REP = 800
     _AU_PAUSE_SENT = 400
@@ -88,17 +99,31 @@ except Exception:
 try:
     from video_utils import (
         render_video_single_or_none,
-        sentence_to_query_extras,   # may be None in some builds
         get_images_for_cues,        # per-sentence images
+        CueImagePrefetcher,         # image lookups started while the LLM streams
         build_slideshow_video_cfr,  # slideshow builder
-        mux_subs_and_audio_on_video # final mux
+        mux_subs_and_audio_on_video, # final mux
+        render_slideshow_single_pass, # slideshow + subs + audio in one encode
     )
 except Exception:
     render_video_single_or_none = None
-    sentence_to_query_extras = None
     get_images_for_cues = None
+    CueImagePrefetcher = None
     build_slideshow_video_cfr = None
     mux_subs_and_audio_on_video = None
+    render_slideshow_single_pass = None
+
+# shared OpenAI clients / Ollama sessions (warm connections across runs)
+try:
+    import llm_clients
+except Exception:
+    llm_clients = None
+
+# cooperative cancel for web jobs (no-op from the CLI)
+try:
+    from jobs import checkpoint
+except Exception:
+    def checkpoint() -> None: pass
 
 # -------------------------------------------------------------
 # FFmpeg detection
@@ -142,7 +167,7 @@ def _extract_hashtags_and_clean(s: str) -> Tuple[str, List[str]]:
     cleaned = re.sub(r'\s{2,}', ' ', cleaned).strip()
     return cleaned, tags
 
-def _lang_code(idx: int, default: str = "en") -> str:
+def _lang_code(settings: JobSettings, idx: int, default: str = "en") -> str:
     lang_map = getattr(settings, "LANG_MAP", ["en", "fr", "de"])
     try:
         if isinstance(lang_map, dict):
@@ -151,6 +176,19 @@ def _lang_code(idx: int, default: str = "en") -> str:
     except Exception:
         return default
 
+def _target_pairs(settings: JobSettings) -> List[Tuple[int, int]]:
+    """TARGET_PAIRS as unique (primary, secondary) column pairs; [] = the single PRIMARY/SECONDARY_LANG_IDX pair."""
+    out: List[Tuple[int, int]] = []
+    for pair in getattr(settings, "TARGET_PAIRS", ()) or ():
+        try:
+            p, s = (int(x) for x in pair)
+        except Exception:
+            print(f"[WARN] Ignoring invalid TARGET_PAIRS entry: {pair!r}")
+            continue
+        if p != s and (p, s) not in out:
+            out.append((p, s))
+    return out
+
 # -------------------------------------------------------------
 # OpenAI – Responses primary, Chat fallback for non-gpt-5
 # -------------------------------------------------------------
@@ -159,7 +197,9 @@ try:
 except Exception:
     OpenAI = None
 
-def _resolve_openai_key() -> str:
+_OPENAI_MAX_OUT_TOKENS = 5000
+
+def _resolve_openai_key(settings: Optional[JobSettings] = None) -> str:
     """
     Try in order:
       - ENV OPENAI_API_KEY
@@ -252,21 +292,27 @@ def _extract_text_from_responses(resp) -> str:
 
     return ""
 
-def _openai_generate(model: str, prompt: str, max_out_tokens: int = 5000, request_timeout: int = 500) -> str:
+def _openai_generate(model: str, prompt: str, max_out_tokens: int = 5000, request_timeout: int = 500,
+                     api_key: str = "", on_delta: Optional[Callable[[str], None]] = None,
+                     on_restart: Optional[Callable[[], None]] = None) -> str:
     """
     - GPT-5 family: Responses API with input=str ONLY (proven to return text).
       If empty, retry once with larger max_output_tokens and compact verbosity;
       else write a debug dump file.
     - Others: Responses first → fallback Chat (max_completion_tokens).
+    - on_delta: stream the completion and pass each text delta as it arrives
+      (the full text is still returned).
+    - on_restart: called before every retry/fallback (and after a failed last attempt),
+      so a consumer of on_delta can drop the partial text of the attempt that broke off.
     """
     if OpenAI is None:
         raise RuntimeError("openai package not installed. Run: pip install --upgrade openai")
 
-    api_key = _resolve_openai_key()
+    api_key = api_key or _resolve_openai_key()
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is missing (ENV/settings/openai.key).")
 
-    client = OpenAI(api_key=api_key)
+    client = llm_clients.openai_client(api_key) if llm_clients is not None else OpenAI(api_key=api_key)
     is_gpt5 = model.strip().startswith("gpt-5")
 
     def _resp_call(max_tokens: int, compact: bool = False) -> str:
@@ -282,8 +328,11 @@ def _openai_generate(model: str, prompt: str, max_out_tokens: int = 5000, reques
         if compact:
             kwargs["text"] = {"format": {"type": "text"}, "verbosity": "compact"}
 
-        resp = client.responses.create(**kwargs)
-        txt = _extract_text_from_responses(resp)
+        if on_delta is None:
+            resp = client.responses.create(**kwargs)
+            txt = _extract_text_from_responses(resp)
+        else:
+            resp, txt = _resp_stream(kwargs)
         if txt:
             return txt.strip()
 
@@ -296,6 +345,36 @@ def _openai_generate(model: str, prompt: str, max_out_tokens: int = 5000, reques
             pass
         return ""
 
+    def _resp_stream(kwargs: Dict[str, Any]):
+        parts: List[str] = []
+        final = None
+        events = client.responses.create(stream=True, **kwargs)
+        try:
+            for ev in events:
+                checkpoint()
+                etype = getattr(ev, "type", "")
+                if etype == "response.output_text.delta":
+                    d = getattr(ev, "delta", "") or ""
+                    if d:
+                        parts.append(d)
+                        on_delta(d)
+                elif etype == "response.completed":
+                    final = getattr(ev, "response", None)
+        finally:
+            # hand the connection back to the shared pool even when cancelled mid-stream
+            getattr(events, "close", lambda: None)()
+        txt = "".join(parts).strip()
+        if not txt and final is not None:
+            # no deltas (e.g. summary-only output) → same extraction as the blocking call
+            txt = _extract_text_from_responses(final)
+            if txt:
+                on_delta(txt + "\n")
+        return final, txt
+
+    def _restart() -> None:
+        if on_delta is not None and on_restart is not None:
+            on_restart()
+
     # ensure enough tokens for gpt-5 to reach text (avoid reasoning-only)
     if is_gpt5 and max_out_tokens < 1024:
         max_out_tokens = 1024
@@ -307,20 +386,24 @@ def _openai_generate(model: str, prompt: str, max_out_tokens: int = 5000, reques
             return out
         if is_gpt5:
             # یک بار دیگر با بودجه‌ی بالاتر و compact
+            _restart()
             out2 = _resp_call(max(1536, max_out_tokens), compact=True)
             if out2:
                 return out2
             return ""
     except Exception as e:
         if is_gpt5:
+            _restart()
             print(f"[WARN] OpenAI Responses error on {model}: {e}")
             return ""
         # else fall through to Chat fallback
 
     # --- Fallback: Chat Completions (ONLY for non-gpt-5) ---
     if not is_gpt5:
+        # whatever the Responses stream already sent is a broken-off attempt
+        _restart()
         try:
-            cc = client.chat.completions.create(
+            chat_kwargs = dict(
                 model=model.strip(),
                 messages=[
                     {"role": "system", "content": "Return plain text only; exactly the requested lines."},
@@ -329,11 +412,27 @@ def _openai_generate(model: str, prompt: str, max_out_tokens: int = 5000, reques
                 max_completion_tokens=max_out_tokens,
                 timeout=request_timeout,
             )
+            if on_delta is not None:
+                parts: List[str] = []
+                chunks = client.chat.completions.create(stream=True, **chat_kwargs)
+                try:
+                    for chunk in chunks:
+                        checkpoint()
+                        choices = getattr(chunk, "choices", None)
+                        d = getattr(getattr(choices[0], "delta", None), "content", None) if choices else None
+                        if d:
+                            parts.append(d)
+                            on_delta(d)
+                finally:
+                    getattr(chunks, "close", lambda: None)()
+                return "".join(parts).strip()
+            cc = client.chat.completions.create(**chat_kwargs)
             if cc and getattr(cc, "choices", None):
                 m = cc.choices[0].message
                 if m and getattr(m, "content", None):
                     return m.content.strip()
         except Exception as e:
+            _restart()
             print(f"[WARN] OpenAI Chat fallback error on {model}: {e}")
 
     return ""
@@ -341,9 +440,13 @@ def _openai_generate(model: str, prompt: str, max_out_tokens: int = 5000, reques
 # -------------------------------------------------------------
 # Ollama
 # -------------------------------------------------------------
-def _ollama_generate(host: str, model: str, prompt: str,
-                     timeout: int = 500) -> Tuple[str, str, Optional[Dict[str, Any]]]:
-    """Call local Ollama /api/generate. Returns (extracted_text, raw_body, parsed_json)."""
+_OLLAMA_OPTIONS = {"temperature": 0.0, "max_output_tokens": 1024}
+def _ollama_generate(host: str, model: str, prompt: str, timeout: int = 500,
+                     on_delta: Optional[Callable[[str], None]] = None) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    """
+    Call local Ollama /api/generate. Returns (extracted_text, raw_body, parsed_json).
+    on_delta: stream (NDJSON) and pass each text piece as it arrives; timeout is then per read.
+    """
     if requests is None:
         print("[WARN] 'requests' not available; cannot call Ollama.")
         return "", "", None
@@ -352,11 +455,14 @@ def _ollama_generate(host: str, model: str, prompt: str,
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
-        "options": {"temperature": 0.0, "max_output_tokens": 1024}
+        "stream": on_delta is not None,
+        "options": dict(_OLLAMA_OPTIONS),
     }
+    http = llm_clients.ollama_session(host) if llm_clients is not None else requests
+    if on_delta is not None:
+        return _ollama_stream(http, url, payload, timeout, on_delta)
     try:
-        r = requests.post(url, json=payload, timeout=timeout)
+        r = http.post(url, json=payload, timeout=timeout)
     except Exception as e:
         print(f"[ERROR] Ollama HTTP error: {e}")
         return "", "", None
@@ -375,6 +481,46 @@ def _ollama_generate(host: str, model: str, prompt: str,
 
     return extracted, raw_txt, parsed
 
+def _ollama_stream(http, url: str, payload: Dict[str, Any], timeout: int,
+                   on_delta: Callable[[str], None]) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    try:
+        r = http.post(url, json=payload, timeout=timeout, stream=True)
+    except Exception as e:
+        print(f"[ERROR] Ollama HTTP error: {e}")
+        return "", "", None
+
+    parts: List[str] = []
+    body: List[str] = []
+    parsed: Optional[Dict[str, Any]] = None
+    try:
+        for raw in r.iter_lines():
+            checkpoint()
+            if not raw:
+                continue
+            raw = raw.decode("utf-8", errors="replace")
+            body.append(raw)
+            try:
+                obj = json.loads(raw)
+            except Exception:
+                continue
+            if not isinstance(obj, dict):
+                continue
+            parsed = obj
+            if obj.get("error"):
+                print(f"[ERROR] Ollama: {obj['error']}")
+                break
+            d = obj.get("response")
+            if isinstance(d, str) and d:
+                parts.append(d)
+                on_delta(d)
+            if obj.get("done"):
+                break
+    except Exception as e:
+        print(f"[ERROR] Ollama stream error: {e}")
+    finally:
+        r.close()
+    return "".join(parts).strip(), "\n".join(body), parsed
+
 # -------------------------------------------------------------
 # Prompt builder – punctuation + mandatory hashtags
 # -------------------------------------------------------------
@@ -470,10 +616,153 @@ Return only {n_items} lines, nothing else.
 """.strip()
 
 
+# -------------------------------------------------------------
+# LLM response cache (.cache_llm/<sha>.json → parsed pipe lines)
+# -------------------------------------------------------------
+def _llm_cache_key(provider: str, model: str, prompt: str, options: Dict[str, Any]) -> str:
+    # prompt already encodes topic / level / mode / language pair / item count
+    raw = json.dumps([provider, model, prompt, options], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _llm_cache_path(settings: JobSettings, key: str) -> Path:
+    return Path(getattr(settings, "CACHE_LLM_DIR", Path(".cache_llm"))) / f"{key}.json"
+
+def _llm_cache_get(settings: JobSettings, key: str) -> Optional[List[str]]:
+    path = _llm_cache_path(settings, key)
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    ttl = int(getattr(settings, "LLM_CACHE_TTL", 0) or 0)
+    if ttl > 0 and time.time() - float(entry.get("created", 0)) > ttl:
+        return None
+    lines = entry.get("lines")
+    if not isinstance(lines, list) or not all(isinstance(x, str) for x in lines):
+        return None
+    return lines
+
+def _llm_cache_put(settings: JobSettings, key: str, lines: List[str], meta: Dict[str, Any]) -> None:
+    path = _llm_cache_path(settings, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(dict(meta, lines=lines, created=time.time()), ensure_ascii=False, indent=1),
+                       encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[WARN] LLM cache write failed: {e}")
+
+# -------------------------------------------------------------
+# Streamed output → completed "<A> | <B>" lines, as they arrive
+# -------------------------------------------------------------
+_PIPE_LINE = re.compile(r'^\s*(.+?)\s*\|\s*(.+?)\s*$')
+
+class _PipeLineStream:
+    """
+    Incremental line splitter for a streamed completion: every finished line that parses as
+    "<A> | <B>" goes to on_line once (at most `limit` lines). Only an early signal for
+    prefetching; the returned lines still come from the full text.
+    """
+
+    def __init__(self, limit: int, on_line: Optional[Callable[[str], None]] = None):
+        self.limit = limit
+        self.on_line = on_line
+        self.emitted = 0
+        self._buf = ""
+        self._seen = set()
+
+    def feed(self, chunk: str) -> None:
+        self._buf += chunk
+        while "\n" in self._buf:
+            line, self._buf = self._buf.split("\n", 1)
+            self._line(line)
+
+    def close(self) -> None:
+        """End of a stream: the unterminated tail is a complete last line."""
+        if self._buf:
+            self._line(self._buf)
+        self._buf = ""
+
+    def restart(self) -> None:
+        """A stream broke off (provider fallback): drop its unterminated tail."""
+        self._buf = ""
+
+    def _line(self, raw: str) -> None:
+        m = _PIPE_LINE.match(raw.rstrip("\r"))
+        if not m or self.on_line is None or self.emitted >= self.limit:
+            return
+        a = re.sub(r'\s+', ' ', m.group(1)).strip()
+        b = re.sub(r'\s+', ' ', m.group(2)).strip()
+        ln = f"{a} | {b}"
+        if not (a and b) or ln in self._seen:
+            return
+        self._seen.add(ln)
+        self.emitted += 1
+        try:
+            self.on_line(ln)
+        except Exception as e:
+            print(f"[WARN] Early processing of streamed line failed: {e}")
+
+# -------------------------------------------------------------
+# Chunked generation: disjoint sub-prompts run concurrently
+# -------------------------------------------------------------
+# one aspect per chunk keeps parallel answers from overlapping (cycled when there are more chunks)
+_LLM_FACETS = {
+    "scenario": [
+        "arriving, greeting and first questions",
+        "asking for things and making requests",
+        "problems, complaints and changes of plan",
+        "prices, paying, times and numbers",
+        "describing people, places and things",
+        "opinions, feelings and small talk",
+        "thanking, saying goodbye and follow-up",
+    ],
+    "vocab": [
+        "objects and tools",
+        "places and parts of places",
+        "people and roles",
+        "food, drink and consumables",
+        "clothing, materials and colours",
+        "events and activities (as nouns)",
+        "time, weather and surroundings",
+        "documents, money and signs",
+    ],
+}
+_LLM_AVOID_MAX = 80     # already-generated items listed in a top-up prompt
+
+def _llm_scoped_prompt(prompt: str, n_items: int, focus: str = "", avoid: Optional[List[str]] = None) -> str:
+    """Base prompt + a scope section (sub-theme and/or items to avoid) before its closing line."""
+    tail = f"Return only {n_items} lines, nothing else."
+    head = prompt[:-len(tail)].rstrip() if prompt.endswith(tail) else prompt
+    scope = ["SCOPE FOR THIS BATCH:"]
+    if focus:
+        scope.append(f"- Focus on this aspect of the topic (still strictly about the topic): {focus}.")
+    if avoid:
+        scope.append("- These items already exist; do NOT repeat them or close variants:")
+        scope.extend(f"  {a}" for a in avoid[:_LLM_AVOID_MAX])
+    return f"{head}\n\n" + "\n".join(scope) + f"\n\n{tail}"
+
+def _chunk_sizes(n: int, chunk: int) -> List[int]:
+    """n split into ceil(n/chunk) near-equal parts, e.g. (60, 25) → [20, 20, 20]."""
+    k = max(1, -(-n // chunk))
+    return [n // k + (1 if i < n % k else 0) for i in range(k)]
+
+def _pipe_line_key(line: str) -> str:
+    """Dedupe key across chunks: the primary side without hashtags, case and trailing punctuation."""
+    primary = line.split("|", 1)[0]
+    primary = re.sub(r'#\S+', ' ', primary)
+    return re.sub(r'\s+', ' ', primary).strip().rstrip('.!?…').strip().lower()
+
 # -------------------------------------------------------------
 # LLM dispatcher → returns N lines "<Primary> | <Secondary>"
 # -------------------------------------------------------------
-def _generate_pipe_lines_with_llm() -> Tuple[List[str], str, str, str]:
+def _generate_pipe_lines_with_llm(settings: JobSettings,
+                                  on_line: Optional[Callable[[str], None]] = None) -> Tuple[List[str], str, str, str]:
+    """
+    on_line (streaming only): called with each "<A> | <B>" line as soon as the model finishes it.
+    LLM_CHUNK_SIZE > 0 and LLM_ITEMS above it: one sub-prompt per chunk (own sub-theme), run
+    concurrently, merged/deduped, then only the missing count is requested again.
+    """
     topic = getattr(settings, "LLM_TOPIC", "") or Path(getattr(settings, "INPUT_FILENAME", "topic")).stem
     level = getattr(settings, "LEVEL", "A1")
     mode  = getattr(settings, "MODE", "scenario")
@@ -494,31 +783,135 @@ def _generate_pipe_lines_with_llm() -> Tuple[List[str], str, str, str]:
     primary_code = code_at(p_idx, "en")
     secondary_code = code_at(s_idx, "fr")
 
-    prompt = _llm_build_prompt(topic, level, mode, primary_code, secondary_code, n)
+    provider_selected = str(getattr(settings, "LLM_PROVIDER", "ollama")).lower().strip()
+    openai_model = getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
+    host  = getattr(settings, "OLLAMA_BASE_URL", getattr(settings, "OLLAMA_HOST", "http://localhost:11434"))
+    model = getattr(settings, "OLLAMA_MODEL", getattr(settings, "LLM_MODEL", "llama3.1:8b"))
+
+    def _model(prov: str) -> str:
+        return openai_model if prov == "openai" else model
+
+    def _cache_key(prov: str, prompt: str) -> str:
+        options = {"max_out_tokens": _OPENAI_MAX_OUT_TOKENS} if prov == "openai" else _OLLAMA_OPTIONS
+        return _llm_cache_key(prov, _model(prov), prompt, options)
+
+    cache_on = bool(getattr(settings, "LLM_CACHE", True))
+    regenerate = bool(getattr(settings, "LLM_REGENERATE", False))
+    streaming = bool(getattr(settings, "LLM_STREAM", True))
+
+    def _request(prompt: str, k: int, part: str = "") -> List[str]:
+        """One prompt → up to k parsed lines (cache, provider call with Ollama fallback, cache store)."""
+        provider = provider_selected
+        # same provider/model/prompt → reuse the parsed lines (LLM_REGENERATE forces a fresh answer)
+        if cache_on and not regenerate:
+            cached = _llm_cache_get(settings, _cache_key(provider, prompt))
+            if cached and len(cached) >= k:
+                print(f"[INFO] LLM cache hit (provider={provider}, model={_model(provider)}) topic='{topic}' "
+                      f"items={k}{part}; skipping generation.")
+                return cached[:k]
+
+        raw_text: str = ""
+        stream = _PipeLineStream(k, on_line) if streaming else None
+        on_delta = stream.feed if stream is not None else None
+
+        if provider == "openai":
+            print(f"[INFO] Requesting LLM (provider=openai, model={openai_model}) topic='{topic}' items={k}{part}"
+                  + (" (streaming)" if stream is not None else ""))
+            try:
+                raw_text = _openai_generate(openai_model, prompt, max_out_tokens=_OPENAI_MAX_OUT_TOKENS, request_timeout=500,
+                                            api_key=_resolve_openai_key(settings), on_delta=on_delta,
+                                            on_restart=stream.restart if stream is not None else None).strip()
+            except Exception as e:
+                print(f"[WARN] OpenAI call failed ({e}); falling back to Ollama...")
+                provider = "ollama"
+                if stream is not None:
+                    stream.restart()
+
+        if provider != "openai":
+            provider = "ollama"
+            print(f"[INFO] Requesting LLM (provider=ollama, model={model}) topic='{topic}' items={k}{part}"
+                  + (" (streaming)" if stream is not None else ""))
+            extracted, raw_body, _ = _ollama_generate(host, model, prompt, timeout=500, on_delta=on_delta)
+            raw_text = (extracted if extracted else (raw_body or "")).strip()
+
+        if stream is not None:
+            stream.close()
+            if stream.emitted:
+                print(f"[INFO] {stream.emitted} line(s){part} handed on while the LLM was still generating.")
+
+        if not raw_text:
+            print(f"[WARN] LLM returned no usable text{part}.")
+            return []
+
+        got = _parse_pipe_lines(raw_text, k)
+        if cache_on and len(got) >= k:
+            _llm_cache_put(settings, _cache_key(provider, prompt), got,
+                           {"provider": provider, "model": _model(provider), "topic": topic, "items": k})
+        return got
 
-    provider = str(getattr(settings, "LLM_PROVIDER", "ollama")).lower().strip()
-    raw_text: str = ""
+    prompt = _llm_build_prompt(topic, level, mode, primary_code, secondary_code, n)
+    chunk = int(getattr(settings, "LLM_CHUNK_SIZE", 0) or 0)
+    if chunk <= 0 or n <= chunk:
+        return _request(prompt, n), topic, primary_code, secondary_code
+
+    # --- chunked: K sub-prompts in parallel ---
+    sizes = _chunk_sizes(n, chunk)
+    facets = _LLM_FACETS.get(str(mode).strip().lower(), _LLM_FACETS["scenario"])
+    prompts = []
+    for i, k in enumerate(sizes):
+        focus = facets[i % len(facets)] + ("" if i < len(facets) else " (different examples from earlier parts)")
+        base = _llm_build_prompt(topic, level, mode, primary_code, secondary_code, k)
+        prompts.append(_llm_scoped_prompt(base, k, focus=focus))
+    workers = max(1, min(len(sizes), int(getattr(settings, "LLM_POOL_SIZE", 8))))
+    print(f"[INFO] LLM: {n} item(s) in {len(sizes)} parallel part(s) of ≤{max(sizes)} ({workers} at a time).")
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as pool:
+        # copy_context per task: worker threads keep the job's log routing / cancel flag
+        futs = [pool.submit(contextvars.copy_context().run, _request, p, k, f" [part {i + 1}/{len(sizes)}]")
+                for i, (p, k) in enumerate(zip(prompts, sizes))]
+        parts = []
+        for fut in futs:
+            try:
+                parts.append(fut.result())
+            except Exception as e:
+                print(f"[WARN] LLM part failed: {e}")
+                parts.append([])
 
-    if provider == "openai":
-        openai_model = getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
-        print(f"[INFO] Requesting LLM (provider=openai, model={openai_model}) topic='{topic}' items={n}")
-        try:
-            raw_text = _openai_generate(openai_model, prompt, max_out_tokens=5000, request_timeout=500).strip()
-        except Exception as e:
-            print(f"[WARN] OpenAI call failed ({e}); falling back to Ollama...")
-            provider = "ollama"
+    merged: List[str] = []
+    seen = set()
 
-    if provider != "openai":
-        host  = getattr(settings, "OLLAMA_BASE_URL", getattr(settings, "OLLAMA_HOST", "http://localhost:11434"))
-        model = getattr(settings, "OLLAMA_MODEL", getattr(settings, "LLM_MODEL", "llama3.1:8b"))
-        print(f"[INFO] Requesting LLM (provider=ollama, model={model}) topic='{topic}' items={n}")
-        extracted, raw_body, _ = _ollama_generate(host, model, prompt, timeout=500)
-        raw_text = (extracted if extracted else (raw_body or "")).strip()
+    def _merge(lines: List[str]) -> None:
+        for ln in lines:
+            key = _pipe_line_key(ln)
+            if key and key not in seen and len(merged) < n:
+                seen.add(key)
+                merged.append(ln)
+
+    for lines in parts:
+        _merge(lines)
+    print(f"[INFO] LLM parts returned {sum(len(x) for x in parts)} line(s), {len(merged)} unique "
+          f"in {time.time() - t0:.1f}s.")
+
+    # top up only what is missing (duplicates across parts, short or malformed answers)
+    for _ in range(2):
+        missing = n - len(merged)
+        if missing <= 0:
+            break
+        checkpoint()
+        avoid = [re.sub(r'\s+', ' ', re.sub(r'#\S+', ' ', ln.split("|", 1)[0])).strip() for ln in merged]
+        base = _llm_build_prompt(topic, level, mode, primary_code, secondary_code, missing)
+        before = len(merged)
+        _merge(_request(_llm_scoped_prompt(base, missing, avoid=avoid), missing, f" [top-up {missing}]"))
+        if len(merged) == before:
+            break
 
-    if not raw_text:
-        print("[WARN] LLM returned no usable text.")
-        return [], topic, primary_code, secondary_code
+    if len(merged) < n:
+        print(f"[WARN] LLM produced {len(merged)}/{n} unique line(s).")
+    return merged, topic, primary_code, secondary_code
 
+def _parse_pipe_lines(raw_text: str, n: int) -> List[str]:
+    """Up to n unique "<A> | <B>" lines from a completion (strict parse, then adjacent-line pairing)."""
     # Strict parse: "<A> | <B>" per line
     lines: List[str] = []
     for m in re.finditer(r'^\s*(.+?)\s*\|\s*(.+?)\s*$', raw_text, flags=re.MULTILINE):
@@ -536,7 +929,7 @@ def _generate_pipe_lines_with_llm() -> Tuple[List[str], str, str, str]:
             final.append(ln)
             if len(final) >= n:
                 break
-        return final, topic, primary_code, secondary_code
+        return final
 
     # Fallbacks: pair adjacent lines if needed
     raw_lines = [ln.strip() for ln in re.split(r'\r?\n', raw_text) if ln.strip()]
@@ -571,12 +964,113 @@ def _generate_pipe_lines_with_llm() -> Tuple[List[str], str, str, str]:
         if len(final) >= n:
             break
 
-    return final, topic, primary_code, secondary_code
+    return final
+
+# -------------------------------------------------------------
+# Build manifest (<out>.build.json): per-stage input fingerprints
+# -------------------------------------------------------------
+BUILD_MANIFEST_VERSION = 1
+
+# settings each stage depends on (anything else, e.g. FONT_SIZE for audio, cannot invalidate it)
+_STAGE_KEYS = {
+    "cues":   ("EDITION", "TTS_PROVIDER", "TTS_PROVIDER_MAP", "ELEVENLABS_MODEL_ID", "ELEVENLABS_VOICE_ID",
+               "ELEVENLABS_VOICE_MAP", "PIPER_MODEL", "PIPER_MODEL_MAP", "PIPER_CONFIG", "PIPER_LENGTH",
+               "PIPER_NOISE", "PIPER_NOISE_W", "SAMPLE_RATE", "CHANNELS", "SAMPLE_WIDTH"),
+    "audio":  ("BG_ENABLED", "BG_MUSIC", "BG_GAIN_DB", "ALIGN_TO_ASS_CENTISECOND_GRID", "READ_TIMING_FROM_EXTERNAL_SRT",
+               "EXTERNAL_SRT_PATH", "STRETCH_TOLERANCE_MS", "MAX_STRETCH_RATIO"),
+    "ass":    ("VIDEO_SIZE", "FONT_NAME", "FONT_SIZE"),
+    "images": ("IMAGES_PER_SENTENCE", "AUTO_IMAGE_LANG", "PIXABAY_SAFESEARCH"),
+    "video":  ("BG_MODE", "BG_IMAGE", "VIDEO_SIZE", "VIDEO_FPS", "VIDEO_RENDERER"),
+}
+
+def _file_sig(path: Any) -> Optional[List[Any]]:
+    """[path, size, mtime_ns] of an input file (None if missing) → edits invalidate dependent stages."""
+    try:
+        p = Path(path)
+        st = p.stat()
+        return [p.as_posix(), st.st_size, st.st_mtime_ns]
+    except Exception:
+        return None
+
+@lru_cache(maxsize=1)
+def _tool_versions() -> Dict[str, str]:
+    """Versions of the TTS/audio packages and of ffmpeg (resolved once per process)."""
+    out: Dict[str, str] = {}
+    for dist in ("gTTS", "pydub", "piper-tts", "elevenlabs"):
+        try:
+            out[dist] = importlib.metadata.version(dist)
+        except Exception:
+            pass
+    try:
+        ff = getattr(AudioSegment, "converter", None) or "ffmpeg"
+        r = subprocess.run([ff, "-version"], capture_output=True, text=True, timeout=10)
+        out["ffmpeg"] = (r.stdout or "").splitlines()[0] if r.stdout else ""
+    except Exception:
+        out["ffmpeg"] = ""
+    return out
+
+def _stage_fingerprint(stage: str, settings: JobSettings, *parts: Any) -> str:
+    vals = {k: getattr(settings, k, None) for k in _STAGE_KEYS.get(stage, ())}
+    raw = json.dumps([stage, vals, parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class _BuildManifest:
+    """
+    Stage records of one output stem: {"stages": {name: {"fp", "outputs", ...}}}.
+    A stage is fresh when its fingerprint matches and its outputs still exist; disabled
+    (INCREMENTAL_BUILD=False) or forced (FORCE_REBUILD) builds still record.
+    """
+
+    def __init__(self, out_base: Path, enabled: bool = True, force: bool = False):
+        self.path = Path(str(out_base) + ".build.json")
+        self.enabled = enabled
+        self.force = force
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == BUILD_MANIFEST_VERSION:
+                self.stages = dict(data.get("stages") or {})
+        except Exception:
+            pass
+
+    def fresh(self, stage: str, fp: str, outputs: Sequence[str] = ()) -> bool:
+        rec = self.stages.get(stage)
+        if not self.enabled or self.force or not rec or rec.get("fp") != fp:
+            return False
+        return all(os.path.exists(o) for o in outputs)
+
+    def get(self, stage: str, key: str, default: Any = None) -> Any:
+        return (self.stages.get(stage) or {}).get(key, default)
+
+    def record(self, stage: str, fp: str, outputs: Sequence[str] = (), **extra: Any) -> None:
+        self.stages[stage] = dict(extra, fp=fp, outputs=list(outputs), built_at=time.time())
+        self._save()
+
+    def invalidate(self, stage: str) -> None:
+        """Drop a stage's record on disk too, before its outputs are rewritten: a run that dies
+        mid-stage must not leave the old record vouching for a truncated WAV/MP4 (even with
+        INCREMENTAL_BUILD off, a later incremental run reads this file)."""
+        if self.stages.pop(stage, None) is not None:
+            self._save(always=True)
+
+    def _save(self, always: bool = False) -> None:
+        if not (self.enabled or always):
+            return
+        try:
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"version": BUILD_MANIFEST_VERSION, "stages": self.stages},
+                                      ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[WARN] Build manifest write failed: {e}")
 
 # -------------------------------------------------------------
 # Main pipeline
 # -------------------------------------------------------------
-def main() -> None:
+def main(settings: Optional[JobSettings] = None) -> None:
+    if settings is None:
+        settings = load_cli_settings()
+
     # sanity
     if AudioSegment is None:
         print("[ERROR] pydub is not available. Install requirements and try again.")
@@ -606,14 +1100,82 @@ def main() -> None:
 
     provider_selected = getattr(settings, "TTS_PROVIDER", "gtts")
 
+    # language columns
+    p_idx = int(getattr(settings, "PRIMARY_LANG_IDX", 0))
+    s_idx = int(getattr(settings, "SECONDARY_LANG_IDX", 1))
+    primary_code = _lang_code(settings, p_idx, "en")
+    secondary_code = _lang_code(settings, s_idx, "fr")
+    bilingual = bool(getattr(settings, "ENABLE_BILINGUAL", True))
+
+    def _safe_part(parts: List[str], idx: int) -> str:
+        try:
+            return parts[idx]
+        except Exception:
+            return ""
+
+    # primary column text → (clean text, tags); shared by every pair that uses the same primary column
+    _primary_memo: Dict[Tuple[str, str], Tuple[str, List[str]]] = {}
+
+    def _clean_primary(primary_raw: str, p_code: str) -> Tuple[str, List[str]]:
+        key = (primary_raw, p_code)
+        hit = _primary_memo.get(key)
+        if hit is not None:
+            return hit[0], list(hit[1])
+        primary_raw = strip_bullet_prefix(primary_raw)
+
+        # only the line's own hashtags: untagged lines leave image choice to the ranked NLP queries
+        primary_clean, tags = _extract_hashtags_and_clean(primary_raw)
+        primary_clean = primary_clean or primary_raw.strip()
+
+        _primary_memo[key] = (primary_clean, list(tags))
+        return primary_clean, tags
+
+    def _parse_parts(parts: List[str], p: int, s: int, p_code: str) -> Optional[Tuple[str, str, List[str]]]:
+        """Split columns of one line → (primary, secondary, tags) for the pair (p, s); None if malformed."""
+        if len(parts) > max(p, s):
+            primary_raw   = _safe_part(parts, p)
+            secondary_raw = _safe_part(parts, s)
+        elif len(parts) >= 2:
+            primary_raw, secondary_raw = parts[0], parts[1]
+        else:
+            return None
+        primary_clean, tags = _clean_primary(primary_raw, p_code)
+        return primary_clean, secondary_raw, tags
+
+    def _parse_line(line: str) -> Optional[Tuple[str, str, List[str]]]:
+        """One input line → (primary, secondary, tags); None if malformed."""
+        return _parse_parts([p.strip() for p in line.split("|")], p_idx, s_idx, primary_code)
+
     # Input source
     use_llm = bool(getattr(settings, "GENERATE_WITH_LLM", False))
     raw_lines: List[str] = []
     scenario_stem: Optional[str] = None
 
+    # streamed LLM lines start their TTS + image lookups while the rest is still generating
+    tts_prefetch = None
+    img_prefetch = None
+    if use_llm and bool(getattr(settings, "LLM_STREAM", True)):
+        if TTSPrefetcher is not None:
+            tts_prefetch = TTSPrefetcher(provider=provider_selected, settings=settings)
+        if CueImagePrefetcher is not None and str(getattr(settings, "BG_MODE", "single")).lower().strip() == "per_sentence":
+            img_prefetch = CueImagePrefetcher()
+
+    def _prefetch_line(line: str) -> None:
+        parsed = _parse_line(line)
+        if parsed is None:
+            return
+        primary, secondary, tags = parsed
+        if tts_prefetch is not None:
+            tts_prefetch.submit(primary_code, primary)
+            if bilingual and secondary:
+                tts_prefetch.submit(secondary_code, secondary)
+        if img_prefetch is not None:
+            img_prefetch.submit({"text": primary, "lang": primary_code, "tags": tags or []})
+
     if use_llm:
         try:
-            raw_lines, topic_used, llm_primary_code, llm_secondary_code = _generate_pipe_lines_with_llm()
+            raw_lines, topic_used, llm_primary_code, llm_secondary_code = _generate_pipe_lines_with_llm(
+                settings, on_line=_prefetch_line if (tts_prefetch or img_prefetch) else None)
             scenario_stem = _slug(topic_used or "generated")
             if not raw_lines:
                 print("[WARN] LLM returned no valid lines; falling back to file input.")
@@ -633,224 +1195,322 @@ def main() -> None:
         raw_lines = [line.strip() for line in input_txt.read_text(encoding="utf-8", errors="ignore").splitlines() if line.strip()]
         scenario_stem = _slug(input_txt.stem)
 
-    # parse lines into triples (primary, secondary, tags)
-    logical_lines: List[Tuple[str, str, List[str]]] = []
-    p_idx = int(getattr(settings, "PRIMARY_LANG_IDX", 0))
-    s_idx = int(getattr(settings, "SECONDARY_LANG_IDX", 1))
-    max_idx = max(p_idx, s_idx)
-
-    def _safe_part(parts: List[str], idx: int) -> str:
-        try:
-            return parts[idx]
-        except Exception:
-            return ""
-
-    for line in raw_lines:
-        parts = [p.strip() for p in line.split("|")]
-        if len(parts) > max_idx:
-            primary_raw   = _safe_part(parts, p_idx)
-            secondary_raw = _safe_part(parts, s_idx)
-        elif len(parts) >= 2:
-            primary_raw, secondary_raw = parts[0], parts[1]
-        else:
-            print(f"[WARN] Skipping malformed line: {line}")
-            continue
-
-        primary_raw = strip_bullet_prefix(primary_raw)
-
-        primary_clean, tags = _extract_hashtags_and_clean(primary_raw)
-        primary_clean = primary_clean or primary_raw.strip()
-
-        # local auto-tags fallback if LLM didn't provide
-        if not tags:
+    # (lang, text) → segment, shared by every target of this run
+    tts_shared: Dict[Tuple[str, str], Any] = {}
+    tts_counts = {"requested": 0, "synthesized": 0}
+
+    def _render_target(settings: JobSettings, logical_lines: List[Tuple[str, str, List[str]]],
+                       primary_code: str, secondary_code: str, out_stem: str,
+                       tts_prefetch=None, img_prefetch=None) -> None:
+        """Cues → SRT, audio, ASS and video for one language pair (stages skipped per the build manifest)."""
+        # Output paths
+        out_base = (Path(getattr(settings, "OUTPUT_DIR", "Output")) / out_stem).resolve()
+        out_base.parent.mkdir(parents=True, exist_ok=True)
+        OUT_MP3 = str(out_base) + ".mp3"
+        OUT_WAV = str(out_base) + ".wav"
+        OUT_SRT = str(out_base) + ".srt"
+        OUT_ASS = str(out_base) + ".ass"
+        OUT_MP4 = str(out_base) + ".mp4"
+
+        # incremental rebuild: a stage whose inputs hash as last time (and whose files exist) is skipped
+        build = _BuildManifest(out_base, enabled=bool(getattr(settings, "INCREMENTAL_BUILD", True)),
+                               force=bool(getattr(settings, "FORCE_REBUILD", False)))
+        versions = _tool_versions()
+        cues_fp = _stage_fingerprint("cues", settings, logical_lines, primary_code, secondary_code, bilingual,
+                                     [PRIMARY_REPEAT_CNT, SECONDARY_REPEAT_CNT, PAUSE_REP_MS, PAUSE_SENT_MS],
+                                     provider_selected, versions)
+        audio_fp = _stage_fingerprint("audio", settings, cues_fp, _file_sig(getattr(settings, "BG_MUSIC", "bg_music.mp3")),
+                                      _file_sig(getattr(settings, "EXTERNAL_SRT_PATH", "")))
+        # timings and audio both unchanged → no TTS at all
+        reuse_audio = build.fresh("cues", cues_fp) and build.fresh("audio", audio_fp, [OUT_WAV, OUT_MP3])
+
+        # TTS timing + draft cues
+        silence_rep  = _normalize(AudioSegment.silent(duration=PAUSE_REP_MS))
+        silence_sent = _normalize(AudioSegment.silent(duration=PAUSE_SENT_MS))
+
+        cues_draft: List[Dict[str, Any]] = []
+        t = 0  # ms timeline
+
+        # fetch every unique line up front (network-bound → bounded pool, per-provider limits)
+        tts_pool = tts_shared
+        if reuse_audio:
+            cues_draft = [dict(c) for c in build.get("cues", "cues", [])]
+            if tts_prefetch is not None:
+                tts_prefetch.close()
+            print(f"[SKIP] TTS + audio unchanged since last build ({len(cues_draft)} cues).")
+        elif synthesize_many is not None:
+            items = []
+            for primary, secondary, _tags in logical_lines:
+                items.append((primary_code, primary))
+                if bilingual and secondary:
+                    items.append((secondary_code, secondary))
+            # only clips no earlier target of this run has synthesized
+            missing = [it for it in dict.fromkeys(items) if it not in tts_pool]
+            if missing or tts_prefetch is not None:
+                tts_pool.update(synthesize_many(missing, provider=provider_selected, settings=settings, prefetch=tts_prefetch))
+            tts_counts["synthesized"] += len(missing)
+            tts_counts["requested"] += len(set(items))
+        elif tts_prefetch is not None:
+            tts_prefetch.close()
+
+        def _tts(text: str, lang_code: str):
+            seg = tts_pool.get((lang_code, text))
+            if seg is not None:
+                return seg
+            if safe_tts_to_segment is None:
+                return _normalize(AudioSegment.silent(duration=800))
             try:
-                if sentence_to_query_extras is not None:
-                    extra = sentence_to_query_extras(
-                        primary_clean,
-                        topic=(scenario_stem or "").replace('_', ' '),
-                        level=LEVEL,
-                    )
-                    cand = []
-                    for w in (extra or []):
-                        w = str(w).strip().lower()
-                        w = "".join(ch for ch in w if ch.isalnum() or ch in ("-",))
-                        if 2 < len(w) < 24:
-                            cand.append(w)
-                        if len(cand) >= 6:
-                            break
-                    if cand:
-                        tags = cand
-            except Exception:
-                pass
-
-        logical_lines.append((primary_clean, secondary_raw, tags))
-
-    if not logical_lines:
-        print("[WARN] No valid lines to process.")
-        sys.exit(0)
-
-    # TTS timing + draft cues
-    silence_rep  = _normalize(AudioSegment.silent(duration=PAUSE_REP_MS))
-    silence_sent = _normalize(AudioSegment.silent(duration=PAUSE_SENT_MS))
-
-    cues_draft: List[Dict[str, Any]] = []
-    t = 0  # ms timeline
-
-    def _tts(text: str, lang_code: str):
-        if safe_tts_to_segment is None:
-            return _normalize(AudioSegment.silent(duration=800))
-        try:
-            return safe_tts_to_segment(text, lang_code, provider=provider_selected)
-        except TypeError:
-            return safe_tts_to_segment(text, lang_code)
-
-    primary_code = _lang_code(p_idx, "en")
-    secondary_code = _lang_code(s_idx, "fr")
-
-    for primary, secondary, tags in logical_lines:
-        seg_one = _tts(primary, primary_code) or _normalize(AudioSegment.silent(duration=800))
-        dur_one = len(seg_one)
-        total_ms_primary = PRIMARY_REPEAT_CNT * dur_one + max(0, PRIMARY_REPEAT_CNT - 1) * len(silence_rep)
-
-        cues_draft.append({
-            "start": t,
-            "end":   t + total_ms_primary,
-            "text":  primary,
-            "lang":  primary_code,
-            "repeat": PRIMARY_REPEAT_CNT,
-            "is_primary": True,
-            "tags": tags or [],
-        })
-        t += total_ms_primary
-
-        # gap before translation
-        t += max(len(silence_sent), 1700)
-
-        if getattr(settings, "ENABLE_BILINGUAL", True) and secondary:
-            seg_two = _tts(secondary, secondary_code) or _normalize(AudioSegment.silent(duration=800))
-            dur_two = len(seg_two)
-            total_ms_secondary = SECONDARY_REPEAT_CNT * dur_two + max(0, SECONDARY_REPEAT_CNT - 1) * len(silence_rep)
+                seg = safe_tts_to_segment(text, lang_code, provider=provider_selected, settings=settings)
+            except TypeError:
+                seg = safe_tts_to_segment(text, lang_code)
+            if seg is not None:
+                tts_pool[(lang_code, text)] = seg
+            return seg
+
+        for primary, secondary, tags in (logical_lines if not reuse_audio else []):
+            checkpoint()
+            seg_one = _tts(primary, primary_code) or _normalize(AudioSegment.silent(duration=800))
+            dur_one = len(seg_one)
+            total_ms_primary = PRIMARY_REPEAT_CNT * dur_one + max(0, PRIMARY_REPEAT_CNT - 1) * len(silence_rep)
 
             cues_draft.append({
                 "start": t,
-                "end":   t + total_ms_secondary,
-                "text":  secondary,
-                "lang":  secondary_code,
-                "repeat": SECONDARY_REPEAT_CNT,
-                "is_primary": False,
-                "tags": [],
+                "end":   t + total_ms_primary,
+                "text":  primary,
+                "lang":  primary_code,
+                "repeat": PRIMARY_REPEAT_CNT,
+                "is_primary": True,
+                "tags": tags or [],
             })
-            t += total_ms_secondary
-
-        # gap after each pair
-        t += len(silence_sent)
-
-    # Output paths
-    out_base = (Path(getattr(settings, "OUTPUT_DIR", "Output")) / (scenario_stem or "output")).resolve()
-    OUT_MP3 = str(out_base) + ".mp3"
-    OUT_WAV = str(out_base) + ".wav"
-    OUT_SRT = str(out_base) + ".srt"
-    OUT_ASS = str(out_base) + ".ass"
-    OUT_MP4 = str(out_base) + ".mp4"
-
-    # SRT draft
-    write_srt_from_cues(cues_draft, OUT_SRT)
-    print(f"[OK] SRT draft written: {OUT_SRT}")
-
-    # choose timing source
-    if getattr(settings, "READ_TIMING_FROM_EXTERNAL_SRT", False) and os.path.exists(getattr(settings, "EXTERNAL_SRT_PATH", "")):
-        cues_src = parse_srt(getattr(settings, "EXTERNAL_SRT_PATH"))
-        print(f"[INFO] Using external SRT: {getattr(settings, 'EXTERNAL_SRT_PATH')}")
-    else:
-        cues_src = cues_draft
-        print("[INFO] Using draft SRT (derived from TTS).")
-
-    # snap to ASS grid (optional)
-    if getattr(settings, "ALIGN_TO_ASS_CENTISECOND_GRID", False):
-        for c in cues_src:
-            c["start"] = round_to_ass_grid(c["start"])
-            c["end"]   = round_to_ass_grid(c["end"])
-
-    # Final audio
-    final_audio = build_audio_from_cues_repeat_all(cues_src, pause_rep_ms=PAUSE_REP_MS)
-
-    # BG music
-    bg = None
-    if bool(getattr(settings, "BG_ENABLED", True)):
-        bg = load_bg_music(getattr(settings, "BG_MUSIC", "bg_music.mp3"), len(final_audio), getattr(settings, "BG_GAIN_DB", -18))
-
-    mixed = final_audio.overlay(bg) if bg else final_audio
-    mixed.export(OUT_WAV, format="wav")
-    try:
-        mixed.export(OUT_MP3, format="mp3", bitrate="192k")
-    except Exception as e:
-        print(f"[WARN] mp3 export failed: {e}")
-    print(f"[OK] Audio written: {OUT_WAV}, {OUT_MP3}")
-
-    # ASS
-    vw, vh = map(int, str(getattr(settings, "VIDEO_SIZE", "1920x1080")).split("x"))
-    write_ass_from_cues(
-        cues_src, OUT_ASS, vw, vh,
-        base_font=getattr(settings, "FONT_NAME", "Arial"),
-        base_fs=getattr(settings, "FONT_SIZE", 48),
-    )
-    print(f"[OK] ASS written: {OUT_ASS}")
+            t += total_ms_primary
+
+            # gap before translation
+            t += max(len(silence_sent), 1700)
+
+            if bilingual and secondary:
+                seg_two = _tts(secondary, secondary_code) or _normalize(AudioSegment.silent(duration=800))
+                dur_two = len(seg_two)
+                total_ms_secondary = SECONDARY_REPEAT_CNT * dur_two + max(0, SECONDARY_REPEAT_CNT - 1) * len(silence_rep)
+
+                cues_draft.append({
+                    "start": t,
+                    "end":   t + total_ms_secondary,
+                    "text":  secondary,
+                    "lang":  secondary_code,
+                    "repeat": SECONDARY_REPEAT_CNT,
+                    "is_primary": False,
+                    "tags": [],
+                })
+                t += total_ms_secondary
+
+            # gap after each pair
+            t += len(silence_sent)
+
+        if not reuse_audio:
+            build.record("cues", cues_fp, cues=[dict(c) for c in cues_draft])  # copy: grid snapping mutates cues_draft
+
+        # SRT draft
+        srt_fp = _stage_fingerprint("srt", settings, cues_draft)
+        if build.fresh("srt", srt_fp, [OUT_SRT]):
+            print(f"[SKIP] SRT unchanged: {OUT_SRT}")
+        else:
+            write_srt_from_cues(cues_draft, OUT_SRT)
+            build.record("srt", srt_fp, [OUT_SRT])
+            print(f"[OK] SRT draft written: {OUT_SRT}")
+
+        # choose timing source
+        if getattr(settings, "READ_TIMING_FROM_EXTERNAL_SRT", False) and os.path.exists(getattr(settings, "EXTERNAL_SRT_PATH", "")):
+            cues_src = parse_srt(getattr(settings, "EXTERNAL_SRT_PATH"))
+            print(f"[INFO] Using external SRT: {getattr(settings, 'EXTERNAL_SRT_PATH')}")
+        else:
+            cues_src = cues_draft
+            print("[INFO] Using draft SRT (derived from TTS).")
 
-    # Video render
-    try:
-        bg_mode = str(getattr(settings, "BG_MODE", "single")).lower().strip()
-        if bg_mode == "none":
-            render_video_single_or_none(
-                OUT_WAV, OUT_ASS, OUT_MP4,
-                size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
-                fps=getattr(settings, "VIDEO_FPS", 30),
-                bg_image=None
-            )
-        elif bg_mode == "single":
-            render_video_single_or_none(
-                OUT_WAV, OUT_ASS, OUT_MP4,
-                size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
-                fps=getattr(settings, "VIDEO_FPS", 30),
-                bg_image=getattr(settings, "BG_IMAGE", "bg.jpg")
+        # snap to ASS grid (optional)
+        if getattr(settings, "ALIGN_TO_ASS_CENTISECOND_GRID", False):
+            for c in cues_src:
+                c["start"] = round_to_ass_grid(c["start"])
+                c["end"]   = round_to_ass_grid(c["end"])
+
+        # Final audio
+        checkpoint()
+        if reuse_audio:
+            total_audio_ms = int(build.get("audio", "duration_ms", 0))
+            print(f"[SKIP] Audio unchanged: {OUT_WAV}, {OUT_MP3}")
+        else:
+            # the video stage keys on the audio fingerprint: drop the record until the new WAV is complete
+            build.invalidate("audio")
+            # reuse the decoded draft segments → each line is decoded once per run
+            final_audio = build_audio_from_cues_repeat_all(cues_src, pause_rep_ms=PAUSE_REP_MS, settings=settings,
+                                                           segments=tts_pool)
+
+            # BG music
+            bg = None
+            if bool(getattr(settings, "BG_ENABLED", True)):
+                bg = load_bg_music(getattr(settings, "BG_MUSIC", "bg_music.mp3"), len(final_audio), getattr(settings, "BG_GAIN_DB", -18))
+
+            mixed = (overlay_bg(final_audio, bg) if overlay_bg else final_audio.overlay(bg)) if bg else final_audio
+            mixed.export(OUT_WAV, format="wav")
+            try:
+                mixed.export(OUT_MP3, format="mp3", bitrate="192k")
+            except Exception as e:
+                print(f"[WARN] mp3 export failed: {e}")
+            total_audio_ms = len(mixed)
+            build.record("audio", audio_fp, [OUT_WAV, OUT_MP3], duration_ms=total_audio_ms)
+            print(f"[OK] Audio written: {OUT_WAV}, {OUT_MP3}")
+
+        # ASS
+        vw, vh = map(int, str(getattr(settings, "VIDEO_SIZE", "1920x1080")).split("x"))
+        ass_fp = _stage_fingerprint("ass", settings, cues_src)
+        if build.fresh("ass", ass_fp, [OUT_ASS]):
+            print(f"[SKIP] ASS unchanged: {OUT_ASS}")
+        else:
+            write_ass_from_cues(
+                cues_src, OUT_ASS, vw, vh,
+                base_font=getattr(settings, "FONT_NAME", "Arial"),
+                base_fs=getattr(settings, "FONT_SIZE", 48),
             )
-        elif bg_mode == "per_sentence":
-            if get_images_for_cues is None or build_slideshow_video_cfr is None or mux_subs_and_audio_on_video is None:
-                raise RuntimeError("Per-sentence image pipeline unavailable (video_utils missing functions).")
+            build.record("ass", ass_fp, [OUT_ASS])
+            print(f"[OK] ASS written: {OUT_ASS}")
 
-            primary_cues = [c for c in cues_src if c.get("is_primary", True)]
-            images = get_images_for_cues(primary_cues)
+        # Video render
+        checkpoint()
+        try:
+            bg_mode = str(getattr(settings, "BG_MODE", "single")).lower().strip()
 
             expanded_images: List[Optional[str]] = []
-            last_img = None
-            for c in cues_src:
-                if c.get("is_primary", True):
-                    img = images.pop(0) if images else None
-                    last_img = img
-                    expanded_images.append(img)
+            if bg_mode == "per_sentence":
+                if get_images_for_cues is None or build_slideshow_video_cfr is None or mux_subs_and_audio_on_video is None:
+                    raise RuntimeError("Per-sentence image pipeline unavailable (video_utils missing functions).")
+
+                primary_cues = [c for c in cues_src if c.get("is_primary", True)]
+                images_fp = _stage_fingerprint("images", settings,
+                                               [(c.get("text"), c.get("lang"), c.get("tags")) for c in primary_cues])
+                stored = build.get("images", "images")
+                # a cue without an image (search failed / nothing found) is looked up again next run
+                if build.fresh("images", images_fp) and isinstance(stored, list) and len(stored) == len(primary_cues) \
+                        and all(img and os.path.exists(img) for img in stored):
+                    images = list(stored)
+                    if img_prefetch is not None:
+                        img_prefetch.close()
+                    print(f"[SKIP] Slideshow images unchanged ({len(images)}).")
                 else:
-                    expanded_images.append(last_img)
-
-            slideshow = build_slideshow_video_cfr(
-                cues=cues_src,
-                per_sentence_images=expanded_images,
-                total_audio_ms=len(mixed),
-                size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
-                fps=getattr(settings, "VIDEO_FPS", 30)
-            )
-            mux_subs_and_audio_on_video(slideshow, Path(OUT_ASS).resolve(), Path(OUT_WAV).resolve(), OUT_MP4)
-        else:
-            print(f"[WARN] Unknown BG_MODE={bg_mode}; rendering black background.")
-            render_video_single_or_none(
-                OUT_WAV, OUT_ASS, OUT_MP4,
-                size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
-                fps=getattr(settings, "VIDEO_FPS", 30),
-                bg_image=None
-            )
-
-        print(f"[OK] Final video written: {OUT_MP4}")
+                    images = get_images_for_cues(primary_cues, prefetch=img_prefetch)
+                    build.record("images", images_fp, images=[str(i) if i else None for i in images])
+
+                last_img = None
+                for c in cues_src:
+                    if c.get("is_primary", True):
+                        img = images.pop(0) if images else None
+                        last_img = img
+                        expanded_images.append(img)
+                    else:
+                        expanded_images.append(last_img)
+
+            video_fp = _stage_fingerprint("video", settings, audio_fp, ass_fp, [_file_sig(i) for i in expanded_images],
+                                          _file_sig(getattr(settings, "BG_IMAGE", "bg.jpg")), versions.get("ffmpeg", ""))
+            if build.fresh("video", video_fp, [OUT_MP4]):
+                print(f"[SKIP] Video unchanged: {OUT_MP4}")
+                return
+            build.invalidate("video")
+
+            if bg_mode == "none":
+                render_video_single_or_none(
+                    OUT_WAV, OUT_ASS, OUT_MP4,
+                    size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
+                    fps=getattr(settings, "VIDEO_FPS", 30),
+                    bg_image=None
+                )
+            elif bg_mode == "single":
+                render_video_single_or_none(
+                    OUT_WAV, OUT_ASS, OUT_MP4,
+                    size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
+                    fps=getattr(settings, "VIDEO_FPS", 30),
+                    bg_image=getattr(settings, "BG_IMAGE", "bg.jpg")
+                )
+            elif bg_mode == "per_sentence":
+                renderer = str(getattr(settings, "VIDEO_RENDERER", "segments")).lower().strip()
+                if renderer == "single_pass" and render_slideshow_single_pass is not None:
+                    render_slideshow_single_pass(
+                        cues_src, expanded_images, total_audio_ms,
+                        Path(OUT_WAV).resolve(), Path(OUT_ASS).resolve(), OUT_MP4,
+                        size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
+                        fps=getattr(settings, "VIDEO_FPS", 30)
+                    )
+                else:
+                    slideshow = build_slideshow_video_cfr(
+                        cues=cues_src,
+                        per_sentence_images=expanded_images,
+                        total_audio_ms=total_audio_ms,
+                        size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
+                        fps=getattr(settings, "VIDEO_FPS", 30)
+                    )
+                    try:
+                        mux_subs_and_audio_on_video(slideshow, Path(OUT_ASS).resolve(), Path(OUT_WAV).resolve(), OUT_MP4)
+                    finally:
+                        if Path(slideshow).parent.name.startswith("run_"):
+                            shutil.rmtree(Path(slideshow).parent, ignore_errors=True)
+            else:
+                print(f"[WARN] Unknown BG_MODE={bg_mode}; rendering black background.")
+                render_video_single_or_none(
+                    OUT_WAV, OUT_ASS, OUT_MP4,
+                    size=getattr(settings, "VIDEO_SIZE", "1920x1080"),
+                    fps=getattr(settings, "VIDEO_FPS", 30),
+                    bg_image=None
+                )
+
+            build.record("video", video_fp, [OUT_MP4])
+            print(f"[OK] Final video written: {OUT_MP4}")
 
-    except Exception as e:
-        print(f"[ERROR] FFmpeg video render failed: {e}")
+        except Exception as e:
+            print(f"[ERROR] FFmpeg video render failed: {e}")
+
+    # multi-target: every requested pair from one split of the file and one TTS pool
+    targets = _target_pairs(settings)
+    if targets and use_llm:
+        print("[WARN] TARGET_PAIRS ignored: LLM-generated lessons have only the primary/secondary columns.")
+        targets = []
+    base_stem = str(getattr(settings, "OUTPUT_STEM", "") or "").strip() or scenario_stem or "output"
+
+    if not targets:
+        # parse lines into triples (primary, secondary, tags)
+        logical_lines: List[Tuple[str, str, List[str]]] = []
+        for line in raw_lines:
+            parsed = _parse_line(line)
+            if parsed is None:
+                print(f"[WARN] Skipping malformed line: {line}")
+                continue
+            logical_lines.append(parsed)
+
+        if not logical_lines:
+            for pf in (tts_prefetch, img_prefetch):
+                if pf is not None:
+                    pf.close()
+            print("[WARN] No valid lines to process.")
+            sys.exit(0)
+
+        _render_target(settings, logical_lines, primary_code, secondary_code, base_stem,
+                       tts_prefetch=tts_prefetch, img_prefetch=img_prefetch)
+        return
+
+    rows = [[p.strip() for p in line.split("|")] for line in raw_lines]
+    print(f"[INFO] Multi-target: {len(rows)} line(s) × {len(targets)} pair(s) → {base_stem}_<primary>-<secondary>.*")
+    t0 = time.time()
+    for p, s in targets:
+        checkpoint()
+        p_code, s_code = _lang_code(settings, p, "en"), _lang_code(settings, s, "fr")
+        # a line without these columns is skipped (no fallback to columns 0/1 as in single-pair mode)
+        lines = [x for x in (_parse_parts(r, p, s, p_code) for r in rows if len(r) > max(p, s)) if x is not None]
+        if not lines:
+            print(f"[WARN] {p_code}-{s_code}: no line has columns {p} and {s}; skipped.")
+            continue
+        js = settings.replace(PRIMARY_LANG_IDX=p, SECONDARY_LANG_IDX=s,
+                              PRIMARY_LANG_CODE=p_code, SECONDARY_LANG_CODE=s_code,
+                              OUTPUT_STEM=f"{base_stem}_{p_code}-{s_code}")
+        print(f"[INFO] ---- Target {p_code}-{s_code}: {len(lines)} line(s) ----")
+        _render_target(js, lines, p_code, s_code, js.OUTPUT_STEM)
+    print(f"[TTS] multi-target: {tts_counts['synthesized']} clip(s) synthesized for {tts_counts['requested']} "
+          f"needed across {len(targets)} pair(s) in {time.time() - t0:.1f}s.")
 
 # -------------------------------------------------------------
 # Entrypoint
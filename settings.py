@@ -17,6 +17,9 @@ INPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 OUTPUT_DIR = Path("Output")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+OUTPUT_STEM = ""        # output file name without extension ("" = input file stem / LLM topic)
+INCREMENTAL_BUILD = True   # <output>.build.json: skip TTS/audio, SRT, ASS, images, video when their inputs are unchanged
+FORCE_REBUILD     = False  # rebuild every stage this run (the manifest is still updated)
 
 # Default input file (GUI usually overwrites this in settings_temp.py)
 INPUT_FILENAME = "sample.txt"
@@ -48,6 +51,9 @@ LANG_MAP = {
 ENABLE_BILINGUAL   = True
 PRIMARY_LANG_IDX   = 0     # column index in parsed lines
 SECONDARY_LANG_IDX = 1     # index for translation column
+# Multi-target: render these (primary, secondary) column pairs from one run, e.g. [(0, 1), (0, 2)];
+# outputs get a _<primary>-<secondary> suffix and each (column, line) is synthesized once. [] = the pair above
+TARGET_PAIRS = []
 
 # ------------------------------- #
 #        Timing / Repeats         #
@@ -72,6 +78,12 @@ SCENARIO_REPEAT = {
 LLM_PROVIDER   = "openai"      # "ollama" or "openai"
 LLM_TOPIC      = ""            # empty -> infer from input filename
 LLM_ITEMS      = 20            # number of sentences/items to generate
+LLM_STREAM     = True          # stream the completion; finished lines start TTS/image work while it generates
+LLM_CACHE      = True          # reuse parsed lines for an identical provider/model/prompt (.cache_llm)
+LLM_CACHE_TTL  = 0             # seconds a cached answer stays valid (0 = no expiry)
+LLM_REGENERATE = False         # bypass the cache for this run (the fresh answer replaces the entry)
+LLM_POOL_SIZE  = 8             # keep-alive connections per LLM endpoint (shared OpenAI client / Ollama session)
+LLM_CHUNK_SIZE = 20            # more items than this → parallel sub-prompts of ≤ this size (0 = always one prompt)
 
 # Ollama (local)
 OLLAMA_HOST     = "http://localhost:11434"
@@ -108,6 +120,18 @@ TTS_PROVIDER_MAP = {
     "default": "elevenlabs"  # all others -> ElevenLabs (paid)
 }
 
+# Concurrent synthesis: worker threads per run + max in-flight requests per provider
+# (provider limits are process-wide, i.e. shared by all jobs of the web app)
+TTS_MAX_WORKERS = 6
+TTS_CONCURRENCY = {
+    "gtts": 4,
+    "elevenlabs": 3,
+    "piper": 1,
+}
+
+# decoded PCM copies of cached clips (.cache_tts/pcm): least-recently-used files are evicted above this size
+TTS_PCM_CACHE_MB = 1024
+
 
 # Fallback voice if language not in map
 ELEVENLABS_VOICE_ID = "EXAVITQu4vr4xnSDxMaL"  # Sarah
@@ -142,6 +166,20 @@ ELEVENLABS_VOICE_MAP = {
 VIDEO_SIZE = "1920x1080"
 VIDEO_FPS  = 30
 
+# per_sentence renderer:
+#   "segments"    (default) one short encode per visual span, concat by stream copy, then one subtitle +
+#                 audio encode; every ffmpeg call opens a single image, whatever the lesson length.
+#   "single_pass" slideshow + subtitles + audio in ONE libx264 encode: quicker cold render, but ffmpeg holds
+#                 one still-image input (decoder + scaler) per span at once, so memory grows with the number
+#                 of spans (~3.7 GB for 60 spans at 1080p), and nothing is reused between renders. Opt-in.
+VIDEO_RENDERER = "segments"
+
+# "segments" renderer: encoded spans are cached by content (image hash, frames, size, fps, encoder), so a
+# re-render after a text/subtitle tweak encodes no span again and one that moves cues encodes only the
+# spans whose image or length changed; only the final subtitle + audio encode always reruns.
+# Least-recently-used segments are evicted above this size
+VIDEO_SEGMENT_CACHE_MB = 2048
+
 FONT_NAME = "Segoe UI Semibold"
 FONT_SIZE = 80
 
@@ -179,12 +217,29 @@ PIPER_LENGTH  = 1.0   # length_scale (slower speech → >1.0)
 PIPER_NOISE   = 0.5   # noise_scale
 PIPER_NOISE_W = 0.5   # noise_w
 
+# Keep Piper processes alive (model loaded once) and feed sentences over stdin (--json-input)
+PIPER_PERSISTENT = True
+PIPER_WORKERS    = 1     # processes per voice model
+PIPER_TIMEOUT    = 60    # seconds per sentence before the worker is restarted
+
 # Image search defaults
 PIXABAY_SAFESEARCH  = "true"   # "true" or "false"
 AUTO_IMAGE_LANG     = "auto"   # auto-detect language from text
 IMAGES_PER_SENTENCE = 1        # how many images we try per primary cue
 IMAGE_TIMEOUT       = 12       # seconds per HTTP request
 IMAGE_RETRIES       = 3        # HTTP retry count
+IMAGE_CUE_WORKERS    = 4       # cues resolved in parallel
+IMAGE_SEARCH_WORKERS = 8       # provider searches in flight (all cues)
+IMAGE_SPECULATIVE    = 3       # after the primary query misses: fallbacks searched ahead per cue (cancelled on a hit)
+IMAGE_PROVIDER_CONCURRENCY = {"pixabay": 4, "unsplash": 2}
+HTTP_POOL_SIZE       = 16      # keep-alive connections per host (one pooled session per image provider)
+IMAGE_SEARCH_CACHE_TTL = 7 * 24 * 3600   # seconds a ranked search result stays valid (.cache_images/search)
+IMAGE_SEARCH_CACHE_MAX = 5000            # max cached search results (oldest evicted first)
+
+# Scenario-term index (domain hints for image queries), built from the lesson corpus;
+# refreshed incrementally on first use, or offline: python term_index.py build
+TERM_INDEX_ROOT = Path("Text")
+TERM_INDEX_PATH = Path(".cache_terms") / "terms.sqlite"
 
 
 # ------------------------------- #
@@ -220,10 +275,20 @@ FFMPEG_FALLBACK = r".\ffmpeg\bin\ffmpeg.exe"
 CACHE_TTS_DIR   = Path(".cache_tts")
 CACHE_IMG_DIR   = Path(".cache_images")
 CACHE_VIDEO_DIR = Path(".cache_video")
+CACHE_LLM_DIR   = Path(".cache_llm")
 
 for d in (CACHE_TTS_DIR, CACHE_IMG_DIR, CACHE_VIDEO_DIR):
     d.mkdir(exist_ok=True)
 
+# ------------------------------- #
+#        Batch (batch.py)         #
+# ------------------------------- #
+# python batch.py "Scenario/A1/*.txt" --pairs en-fr en-de  (or POST /api/batch)
+BATCH_TEXT_ROOT = Path("Text")                       # lesson tree the batch glob is resolved against
+BATCH_WORKERS  = 2                                   # lessons rendered concurrently (caches are shared in-process);
+                                                     # /api/batch caps requests at min(BATCH_WORKERS, JOB_WORKERS)
+BATCH_MANIFEST = OUTPUT_DIR / "batch_manifest.json"  # per output: input/settings hashes, status, files
+
 # ------------------------------- #
 #            App Info             #
 # ------------------------------- #
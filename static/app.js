@@ -196,8 +196,11 @@ function stopStream() {
 async function runPipeline() {
   await saveSettings();
   addLog("[INFO] Starting...");
+  // submit once; /api/run only attaches, so EventSource reconnects resume instead of re-running
+  const res = await jpost("/api/jobs", payloadFromUI()).catch(()=>null);
+  if (!res || !res.ok || !res.job) { addLog("[ERROR] Submit failed: " + ((res && res.error) || "")); return; }
   qs("#btnStop").disabled = false;
-  evtSource = new EventSource("/api/run");
+  evtSource = new EventSource("/api/run?job_id=" + encodeURIComponent(res.job.id));
   evtSource.onmessage = (e) => {
     if (typeof e.data === "string") addLog(e.data);
 
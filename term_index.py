@@ -0,0 +1,255 @@
+# term_index.py
+# -------------------------------------------------------------
+# Scenario-term index over the lesson corpus (Text/**/*.txt)
+# - Term frequencies per file × language column, aggregated per
+#   (domain, column) for video_utils' scenario hints
+# - One SQLite file (read through mmap); PRAGMA user_version is the
+#   schema version, a mismatch drops and rebuilds the index
+# - Incremental: only files whose mtime/size/domain changed are
+#   re-tokenized; deleted files are dropped
+# - Build offline:  python term_index.py build [--full]
+#   Inspect:        python term_index.py show <domain> [--col N]
+# -------------------------------------------------------------
+
+from __future__ import annotations
+import re, sys, json, math, time, zlib, sqlite3, argparse, collections, threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import settings as _s
+
+SCHEMA_VERSION = 2
+
+TERM_INDEX_PATH = Path(getattr(_s, "TERM_INDEX_PATH", Path(".cache_terms") / "terms.sqlite"))
+TERM_INDEX_ROOT = Path(getattr(_s, "TERM_INDEX_ROOT", Path("Text")))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id       INTEGER PRIMARY KEY,
+    path     TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    domain   TEXT NOT NULL,
+    counts   BLOB NOT NULL          -- zlib(JSON {col: {term: n}}), kept for incremental re-aggregation
+);
+CREATE TABLE IF NOT EXISTS domain_terms (
+    domain TEXT NOT NULL,
+    col    INTEGER NOT NULL,
+    term   TEXT NOT NULL,
+    n      INTEGER NOT NULL,
+    PRIMARY KEY (domain, col, term)
+) WITHOUT ROWID;
+"""
+
+_HASHTAG_RE = re.compile(r"#\S+")
+_WRITE_LOCK = threading.Lock()
+
+Tokenizer = Callable[[str, str], List[str]]
+
+# -----------------------------
+# Connection
+# -----------------------------
+def _connect(db_path: Path, write: bool) -> sqlite3.Connection:
+    if write:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(f"file:{db_path.as_posix()}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA mmap_size=67108864")
+    return conn
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == SCHEMA_VERSION:
+        return
+    if version:
+        print(f"[INFO] Term index schema v{version} → v{SCHEMA_VERSION}; rebuilding.")
+    conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS domain_terms;")
+    conn.executescript(_SCHEMA)
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+# -----------------------------
+# Build / incremental update
+# -----------------------------
+def _count_file(path: Path, tokenize: Tokenizer, langs: Mapping[int, str]) -> Dict[int, collections.Counter]:
+    """Per-column term counts for one pipe-separated lesson file (hashtags are not lesson text)."""
+    counts: Dict[int, collections.Counter] = collections.defaultdict(collections.Counter)
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        for col, part in enumerate(line.split("|")):
+            part = _HASHTAG_RE.sub(" ", part).strip()
+            if not part:
+                continue
+            for tok in tokenize(part, langs.get(col, "en")):
+                if not tok.isdigit():
+                    counts[col][tok] += 1
+    return counts
+
+def update(tokenize: Tokenizer, domain_of: Callable[[str], str], langs: Mapping[int, str],
+           root: Path = TERM_INDEX_ROOT, db_path: Path = TERM_INDEX_PATH, full: bool = False) -> Dict[str, int]:
+    """Bring the index in line with root/**/*.txt; returns {"files", "updated", "removed"}."""
+    root = Path(root)
+    current = {}
+    for p in sorted(root.rglob("*.txt")) if root.is_dir() else []:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        current[p.relative_to(root).as_posix()] = (p, st.st_mtime_ns, st.st_size, domain_of(p.name))
+
+    with _WRITE_LOCK:
+        conn = _connect(Path(db_path), write=True)
+        try:
+            _ensure_schema(conn)
+            known = {} if full else {row[0]: row[1:] for row in conn.execute("SELECT path, id, mtime_ns, size, domain FROM files")}
+            stale = [rel for rel, (_, mt, sz, dom) in current.items()
+                     if rel not in known or known[rel][1:] != (mt, sz, dom)]
+            gone = [rel for rel in known if rel not in current]
+            if not stale and not gone:
+                return {"files": len(current), "updated": 0, "removed": 0}
+
+            touched = set()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if full:
+                    conn.execute("DELETE FROM files"); conn.execute("DELETE FROM domain_terms")
+                for rel in gone:
+                    fid, _, _, dom = known[rel]
+                    conn.execute("DELETE FROM files WHERE id=?", (fid,))
+                    touched.add(dom)
+                for rel in stale:
+                    p, mt, sz, dom = current[rel]
+                    try:
+                        counts = _count_file(p, tokenize, langs)
+                    except OSError as e:
+                        print(f"[WARN] Term index: cannot read {p}: {e}")
+                        continue
+                    blob = zlib.compress(json.dumps(counts, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                    if rel in known:
+                        touched.add(known[rel][3])
+                        conn.execute("UPDATE files SET mtime_ns=?, size=?, domain=?, counts=? WHERE id=?",
+                                     (mt, sz, dom, blob, known[rel][0]))
+                    else:
+                        conn.execute("INSERT INTO files(path, mtime_ns, size, domain, counts) VALUES (?,?,?,?,?)",
+                                     (rel, mt, sz, dom, blob))
+                    touched.add(dom)
+                for dom in touched:
+                    _aggregate_domain(conn, dom)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+    if full:
+        _vacuum(Path(db_path))
+    return {"files": len(current), "updated": len(stale), "removed": len(gone)}
+
+def _aggregate_domain(conn: sqlite3.Connection, domain: str) -> None:
+    total: Dict[Tuple[int, str], int] = collections.Counter()
+    for (blob,) in conn.execute("SELECT counts FROM files WHERE domain=?", (domain,)):
+        for col, c in json.loads(zlib.decompress(blob)).items():
+            for term, n in c.items():
+                total[(int(col), term)] += n
+    conn.execute("DELETE FROM domain_terms WHERE domain=?", (domain,))
+    conn.executemany("INSERT INTO domain_terms(domain, col, term, n) VALUES (?,?,?,?)",
+                     ((domain, col, term, n) for (col, term), n in total.items()))
+
+def _vacuum(db_path: Path) -> None:
+    conn = _connect(db_path, write=True)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+# -----------------------------
+# Lookup
+# -----------------------------
+def top_terms(domain: str, col: int = 0, limit: int = 200, min_count: int = 1, min_len: int = 3,
+              db_path: Path = TERM_INDEX_PATH) -> List[Tuple[str, int]]:
+    """Most frequent terms of a domain/column as (term, count), highest first; [] if the index is missing."""
+    if not Path(db_path).exists():
+        return []
+    conn = _connect(Path(db_path), write=False)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            return []
+        return conn.execute(
+            "SELECT term, n FROM domain_terms WHERE domain=? AND col=? AND n>=? AND length(term)>=? "
+            "ORDER BY n DESC, term LIMIT ?", (domain, int(col), int(min_count), int(min_len), int(limit))).fetchall()
+    finally:
+        conn.close()
+
+def distinctive_terms(domain: str, col: int = 0, limit: int = 20, min_count: int = 1, min_len: int = 3,
+                      db_path: Path = TERM_INDEX_PATH) -> List[Tuple[str, float]]:
+    """Terms that characterise a domain: count × log((domains+1)/domains using the term), best first."""
+    if not Path(db_path).exists():
+        return []
+    conn = _connect(Path(db_path), write=False)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            return []
+        n_domains = conn.execute("SELECT COUNT(DISTINCT domain) FROM domain_terms WHERE col=?", (int(col),)).fetchone()[0]
+        rows = conn.execute(
+            "WITH df AS (SELECT term, COUNT(*) AS df FROM domain_terms WHERE col=? GROUP BY term) "
+            "SELECT t.term, t.n, df.df FROM domain_terms t JOIN df ON df.term = t.term "
+            "WHERE t.domain=? AND t.col=? AND t.n>=? AND length(t.term)>=?",
+            (int(col), domain, int(col), int(min_count), int(min_len))).fetchall()
+    finally:
+        conn.close()
+    scored = [(term, n * math.log((n_domains + 1) / df)) for term, n, df in rows]
+    scored.sort(key=lambda x: (-x[1], x[0]))
+    return scored[:limit]
+
+def domains(db_path: Path = TERM_INDEX_PATH) -> Dict[str, int]:
+    """{domain: file count} currently indexed."""
+    if not Path(db_path).exists():
+        return {}
+    conn = _connect(Path(db_path), write=False)
+    try:
+        return dict(conn.execute("SELECT domain, COUNT(*) FROM files GROUP BY domain ORDER BY domain").fetchall())
+    except sqlite3.Error:
+        return {}
+    finally:
+        conn.close()
+
+# -----------------------------
+# CLI
+# -----------------------------
+def _cli(argv: Optional[Iterable[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Build or inspect the scenario-term index.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="index root/**/*.txt (incremental unless --full)")
+    b.add_argument("--root", type=Path, default=TERM_INDEX_ROOT)
+    b.add_argument("--db", type=Path, default=TERM_INDEX_PATH)
+    b.add_argument("--full", action="store_true", help="drop and re-tokenize every file")
+    s = sub.add_parser("show", help="print the top terms of a domain")
+    s.add_argument("domain", nargs="?")
+    s.add_argument("--col", type=int, default=0)
+    s.add_argument("--limit", type=int, default=20)
+    s.add_argument("--by-count", action="store_true", help="raw frequency instead of domain-distinctive ranking")
+    s.add_argument("--db", type=Path, default=TERM_INDEX_PATH)
+    args = ap.parse_args(list(argv) if argv is not None else None)
+
+    if args.cmd == "build":
+        import video_utils as vu
+        t0 = time.time()
+        stats = update(vu._tokenize, vu._infer_domain_from_filename, dict(getattr(_s, "LANG_MAP", {0: "en"})),
+                       root=args.root, db_path=args.db, full=args.full)
+        print(f"[INFO] Term index {args.db}: {stats['files']} file(s), {stats['updated']} updated, "
+              f"{stats['removed']} removed in {time.time() - t0:.2f}s")
+        return 0
+
+    if not args.domain:
+        for dom, n in domains(args.db).items():
+            print(f"{dom:<12} {n} file(s)")
+        return 0
+    rank = top_terms if args.by_count else distinctive_terms
+    for term, score in rank(args.domain, args.col, limit=args.limit, db_path=args.db):
+        print(f"{score:>9.1f}  {term}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_cli())
@@ -0,0 +1,18 @@
+# tests/conftest.py
+# Tests import the app modules straight from the repo root (there is no package to install).
+# The modules keep their caches in cwd-relative dirs (.cache_tts, .cache_video, …), so the whole
+# session runs in a scratch directory instead of the checkout.
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_WORKDIR = tempfile.mkdtemp(prefix="tests_")
+os.chdir(_WORKDIR)
+atexit.register(shutil.rmtree, _WORKDIR, ignore_errors=True)
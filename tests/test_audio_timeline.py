@@ -0,0 +1,108 @@
+# tests/test_audio_timeline.py
+# NumPy timeline builder / background mixer (audio_utils) against the pydub-only path it replaced.
+import numpy as np
+import pytest
+
+import audio_utils as au
+from pydub import AudioSegment
+
+RATE, CH = au.SAMPLE_RATE, au.CHANNELS
+DTYPE = au._NP_DTYPES[au.SAMPLE_WIDTH]
+
+
+def _noise(ms, seed, amp=12000):
+    rng = np.random.default_rng(seed)
+    arr = rng.integers(-amp, amp, size=(ms * RATE // 1000, CH), dtype=DTYPE)
+    return au._array_to_seg(arr)
+
+
+def _pcm(seg):
+    return au._seg_to_array(seg)
+
+
+@pytest.fixture
+def cues():
+    # ms values land on whole frames at SAMPLE_RATE; the second cue is too short for its repeats,
+    # the third starts before the second one ends, the last has no slot (end == start)
+    return [
+        {"start": 0, "end": 1500, "text": "one", "lang": "en", "repeat": 2},
+        {"start": 2000, "end": 2300, "text": "two", "lang": "fr", "repeat": 2},
+        {"start": 2200, "end": 3000, "text": "three", "lang": "en", "repeat": 1},
+        {"start": 3500, "end": 3500, "text": "four", "lang": "en", "repeat": 3},
+    ]
+
+
+@pytest.fixture
+def segments():
+    return {("en", "one"): _noise(400, 1), ("fr", "two"): _noise(250, 2),
+            ("en", "three"): _noise(500, 3), ("en", "four"): _noise(120, 4)}
+
+
+def _reference(cues, segments, gap_ms):
+    """Cues placed at exact frame offsets: repeats joined by gap_ms of silence, cut/padded to the slot."""
+    gap = gap_ms * RATE // 1000
+    placed, cursor = [], 0
+    for c in cues:
+        pcm = _pcm(segments[(c["lang"], c["text"])])
+        body = [pcm]
+        for _ in range(c["repeat"] - 1):
+            body += [np.zeros((gap, CH), DTYPE), pcm]
+        body = np.concatenate(body)
+        slot = (c["end"] - c["start"]) * RATE // 1000
+        if slot > 0:
+            body = np.concatenate([body, np.zeros((max(0, slot - len(body)), CH), DTYPE)])[:slot]
+        offset = max(c["start"] * RATE // 1000, cursor)
+        placed.append((offset, body))
+        cursor = offset + len(body)
+    out = np.zeros((cursor, CH), DTYPE)
+    for offset, body in placed:
+        out[offset:offset + len(body)] = body
+    return out
+
+
+def test_timeline_places_cues_at_exact_offsets(cues, segments):
+    built = au.build_audio_snapped_to_cues(cues, pause_rep_ms=100, segments=segments)
+    assert (built.frame_rate, built.channels, built.sample_width) == (RATE, CH, au.SAMPLE_WIDTH)
+    np.testing.assert_array_equal(_pcm(built), _reference(cues, segments, 100))
+
+
+def test_timeline_matches_pydub_path(cues, segments):
+    fast = au.build_audio_snapped_to_cues(cues, pause_rep_ms=100, segments=segments)
+    slow = au._build_audio_concat(cues, pause_rep_ms=100, segments=segments)
+    # pydub's silent() rounding lets the old path drift by a few frames, never by a whole ms per cue
+    assert abs(len(_pcm(fast)) - len(_pcm(slow))) <= len(cues) * RATE // 1000
+    # the first cue starts at 0 in both: its audio is identical
+    head = len(_pcm(segments[("en", "one")]))
+    np.testing.assert_array_equal(_pcm(fast)[:head], _pcm(slow)[:head])
+
+
+def test_timeline_without_numpy_uses_pydub_path(monkeypatch, cues, segments):
+    monkeypatch.setattr(au, "np", None)
+    built = au.build_audio_snapped_to_cues(cues, pause_rep_ms=100, segments=segments)
+    monkeypatch.undo()
+    expected = au._build_audio_concat(cues, pause_rep_ms=100, segments=segments)
+    assert built.raw_data == expected.raw_data
+
+
+def test_overlay_is_bit_identical_to_pydub():
+    # loud enough that the sum saturates
+    voice, bg = _noise(700, 5, amp=30000), _noise(500, 6, amp=30000)
+    assert au.overlay_bg(voice, bg).raw_data == voice.overlay(bg).raw_data
+    assert au.overlay_bg(voice, None) is voice
+
+
+def test_bg_music_gain_and_tiling(tmp_path):
+    src = _noise(300, 7)
+    path = tmp_path / "bg.wav"
+    src.export(str(path), format="wav")
+    bg = au.load_bg_music(str(path), 1000, gain_db=-6.0)
+    arr = _pcm(bg)
+    assert len(arr) == 1000 * RATE // 1000
+    gained = np.rint(_pcm(src).astype(np.float32) * np.float32(10 ** (-6.0 / 20))).astype(DTYPE)
+    n = len(gained)
+    np.testing.assert_array_equal(arr[:n], gained)
+    np.testing.assert_array_equal(arr[n:2 * n], gained)
+    # same level as pydub's own gain, within rounding
+    ref = _pcm(src.apply_gain(-6.0))
+    assert np.abs(arr[:n].astype(np.int32) - ref.astype(np.int32)).max() <= 1
+    assert au.load_bg_music(str(tmp_path / "missing.wav"), 1000) is None
@@ -0,0 +1,102 @@
+# tests/test_build_manifest.py
+# main._BuildManifest: stage records survive on disk, and a stage that fails after invalidate() is
+# rebuilt by the next normal run (never skipped on the previous run's record).
+from pathlib import Path
+
+import pytest
+from pydub import AudioSegment
+
+import main
+from job_settings import default_settings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_invalidate_is_persisted(tmp_path):
+    out = tmp_path / "lesson.wav"
+    out.write_bytes(b"x")
+    m = main._BuildManifest(tmp_path / "lesson")
+    m.record("audio", "fp1", [str(out)], duration_ms=10)
+    assert main._BuildManifest(tmp_path / "lesson").fresh("audio", "fp1", [str(out)])
+
+    forced = main._BuildManifest(tmp_path / "lesson", force=True)
+    forced.invalidate("audio")
+    again = main._BuildManifest(tmp_path / "lesson")
+    assert not again.fresh("audio", "fp1", [str(out)])
+    assert again.get("audio", "duration_ms") is None
+
+    # INCREMENTAL_BUILD off still drops the stale record a later incremental run would read
+    m = main._BuildManifest(tmp_path / "lesson")
+    m.record("video", "fp2", [str(out)])
+    main._BuildManifest(tmp_path / "lesson", enabled=False).invalidate("video")
+    assert not main._BuildManifest(tmp_path / "lesson").fresh("video", "fp2", [str(out)])
+
+
+class _Track(AudioSegment):
+    """Final mix whose export just writes the file (no ffmpeg needed for the MP3)."""
+    fail = False
+
+    def export(self, out_f=None, format="mp3", **kw):
+        Path(out_f).write_bytes(b"partial" if _Track.fail else b"audio:" + format.encode())
+        if _Track.fail:
+            raise OSError("disk full")
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    calls = []
+    state = {"video_fails": False}
+
+    def synth(items, provider=None, settings=None, prefetch=None):
+        calls.append("tts")
+        return {it: AudioSegment.silent(duration=300) for it in items}
+
+    def build_audio(cues, **kw):
+        calls.append("audio")
+        return _Track.silent(duration=cues[-1]["end"])
+
+    def render(wav, ass, mp4, **kw):
+        calls.append("video")
+        Path(mp4).write_bytes(b"truncated" if state["video_fails"] else b"video")
+        if state["video_fails"]:
+            raise RuntimeError("ffmpeg killed")
+
+    monkeypatch.setattr(main, "synthesize_many", synth)
+    monkeypatch.setattr(main, "build_audio_from_cues_repeat_all", build_audio)
+    monkeypatch.setattr(main, "render_video_single_or_none", render)
+    monkeypatch.setattr(main, "load_bg_music", lambda *a, **k: None)
+    monkeypatch.setattr(_Track, "fail", False)
+    settings = default_settings().replace(
+        INPUT_DIR=str(ROOT / "Text" / "Scenario" / "A1"), INPUT_FILENAME="A1_at_the_bank.txt",
+        MODE="scenario", BG_MODE="none", OUTPUT_DIR=str(tmp_path / "out"), GENERATE_WITH_LLM=False)
+
+    def run(**overrides):
+        calls.clear()
+        main.main(settings.replace(**overrides))
+        return list(calls)
+    return run, state
+
+
+def test_failed_forced_video_is_rebuilt_by_next_run(pipeline):
+    run, state = pipeline
+    assert "video" in run()
+    assert "video" not in run()                  # unchanged → skipped
+
+    state["video_fails"] = True
+    assert "video" in run(FORCE_REBUILD=True)    # error is logged and swallowed, MP4 left truncated
+    state["video_fails"] = False
+    assert "video" in run()                      # the old record must not vouch for the truncated MP4
+    assert "video" not in run()
+
+
+def test_failed_forced_audio_is_rebuilt_by_next_run(pipeline):
+    run, _state = pipeline
+    assert "audio" in run()
+    assert "audio" not in run()
+
+    _Track.fail = True
+    with pytest.raises(OSError):
+        run(FORCE_REBUILD=True)                  # WAV export dies half-way
+    _Track.fail = False
+    assert "audio" in run()                      # the truncated WAV is not taken as fresh
+    assert "audio" not in run()
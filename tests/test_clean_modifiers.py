@@ -0,0 +1,118 @@
+# tests/test_clean_modifiers.py
+# Golden test for video_utils._clean_modifiers over every column of the Text/ corpus.
+# The fixture is built from the baseline implementation (set-ordered str.replace loop, commit c463957)
+# run under PYTHONHASHSEED 0-4:
+#   "baseline": sentences the baseline changes, with its output (identical under every seed);
+#   "intended": the few sentences whose baseline output varied by seed (a shorter modifier such as
+#               "milk" replaced before "oat milk"), with every baseline variant and the now-fixed
+#               longest-first result.
+# Every other sentence must come back as its plain normalized form. Rebuild with:
+#     git show c463957:video_utils.py > /tmp/vu_baseline.py
+#     python tests/test_clean_modifiers.py /tmp/vu_baseline.py
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "clean_modifiers_golden.json"
+SEEDS = range(5)
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import video_utils as vu  # noqa: E402
+
+
+def _corpus_sentences():
+    sents = set()
+    for f in sorted((ROOT / "Text").rglob("*.txt")):
+        for ln in f.read_text(encoding="utf-8", errors="ignore").splitlines():
+            for part in ln.split("|"):
+                part = re.sub(r"#\S+", "", part).strip()
+                if part:
+                    sents.add(part)
+    return sorted(sents)
+
+
+def _plain(text):
+    return re.sub(r"\s+", " ", vu._normalize_text(text)).strip()
+
+
+def test_corpus_matches_baseline():
+    golden = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    baseline, intended = golden["baseline"], golden["intended"]
+    sents = _corpus_sentences()
+    assert sents, "Text/ corpus is empty"
+    mismatches = []
+    for s in sents:
+        want = intended[s]["expected"] if s in intended else baseline.get(s, _plain(s))
+        got = vu._clean_modifiers(s)
+        if got != want:
+            mismatches.append((s, want, got))
+    assert not mismatches, f"{len(mismatches)} sentences changed, e.g. {mismatches[:5]}"
+
+
+def test_intended_changes_are_one_of_the_baseline_results():
+    golden = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    assert len(golden["intended"]) == 6
+    for s, entry in golden["intended"].items():
+        assert len(entry["baseline"]) > 1, s
+        assert entry["expected"] in entry["baseline"], s
+
+
+@pytest.mark.parametrize("text, expected", [
+    # longest phrase wins: the whole "oat milk" goes, not just "milk" (baseline: seed-dependent)
+    ("Do you have oat milk for coffee?", "do you have for coffee"),
+    ("Can you make it with soy milk?", "can you make it with"),
+    ("I drink coffee with milk.", "i drink coffee"),
+    ("I drink cold water with ice.", "i drink cold water"),
+    # negators only as whole space-delimited tokens; of two adjacent repeats (" not not ", e.g. from
+    # "not noticed" → "not not d") the second is kept, as str.replace(" not ", " ") did
+    ("I had not noticed it", "i had not d it"),
+    ("a not not not b", "a not b"),
+    ("no sugar, not now", "now"),
+    ("a not no b", "a b"),
+    ("nothing is known", "nothing is known"),
+])
+def test_examples(text, expected):
+    assert vu._clean_modifiers(text) == expected
+
+
+def _dump_baseline(module_path):
+    spec = importlib.util.spec_from_file_location("vu_baseline", module_path)
+    base = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(base)
+    json.dump({s: base._clean_modifiers(s) for s in _corpus_sentences()}, sys.stdout, ensure_ascii=False)
+
+
+def _build_fixture(module_path):
+    runs = []
+    for seed in SEEDS:
+        env = dict(os.environ, PYTHONHASHSEED=str(seed))
+        out = subprocess.run([sys.executable, __file__, "--dump", module_path], env=env, cwd=str(ROOT),
+                             check=True, capture_output=True, text=True, encoding="utf-8").stdout
+        runs.append(json.loads(out))
+    baseline, intended = {}, {}
+    for s in runs[0]:
+        outs = sorted({r[s] for r in runs})
+        if len(outs) > 1:
+            intended[s] = {"baseline": outs, "expected": vu._clean_modifiers(s)}
+        elif outs[0] != _plain(s):
+            baseline[s] = outs[0]
+    return {"baseline": baseline, "intended": intended}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--dump"]:
+        _dump_baseline(sys.argv[2])
+        sys.exit(0)
+    data = _build_fixture(sys.argv[1])
+    FIXTURE.parent.mkdir(parents=True, exist_ok=True)
+    FIXTURE.write_text(json.dumps(data, ensure_ascii=False, indent=0, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"wrote {len(data['baseline'])} baseline + {len(data['intended'])} intended entries to {FIXTURE}")
@@ -0,0 +1,71 @@
+# tests/test_image_download.py
+# video_utils._download_image under concurrency: one complete file per provider/query/src, published
+# atomically (no partial JPEG visible, no temp files left behind).
+import threading
+import time
+
+import video_utils as vu
+
+PAYLOAD = b"\xff\xd8" + b"x" * 8_000_000 + b"\xff\xd9"
+
+
+class _Resp:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class _SlowSession:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, src, timeout=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.05)
+        if self.fail:
+            raise OSError("connection reset")
+        return _Resp(PAYLOAD)
+
+
+def test_parallel_downloads_publish_one_complete_file(tmp_path):
+    sess = _SlowSession()
+    seen_sizes = []
+    results = []
+
+    def fetch():
+        results.append(vu._download_image(sess, "https://img/1.jpg", "coffee", tmp_path, "pixabay"))
+
+    def watch():
+        # anything visible under the final name is the whole image
+        end = time.monotonic() + 0.5
+        while time.monotonic() < end:
+            for p in tmp_path.glob("*.jpg"):
+                seen_sizes.append(p.stat().st_size)
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)] + [threading.Thread(target=watch)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(results)) == 1 and results[0] is not None
+    assert results[0].read_bytes() == PAYLOAD
+    assert set(seen_sizes) <= {len(PAYLOAD)}
+    assert [p.name for p in tmp_path.iterdir()] == [results[0].name]
+
+
+def test_cached_file_is_not_fetched_again(tmp_path):
+    sess = _SlowSession()
+    first = vu._download_image(sess, "https://img/2.jpg", "tea", tmp_path, "pexels")
+    again = vu._download_image(sess, "https://img/2.jpg", "tea", tmp_path, "pexels")
+    assert first == again and sess.calls == 1
+
+
+def test_failed_download_leaves_nothing(tmp_path):
+    assert vu._download_image(_SlowSession(fail=True), "https://img/3.jpg", "milk", tmp_path, "pixabay") is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,146 @@
+# tests/test_jobs.py
+# jobs.JobEngine: bounded admission (QueueFull), cancel of queued / running / finished jobs, log capture.
+import contextvars
+import threading
+import time
+
+import pytest
+
+from jobs import JobEngine, QueueFull, checkpoint, install_log_router
+
+
+def _until(pred, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def engine():
+    eng = JobEngine(max_workers=1, max_queue=2)
+    yield eng
+    for j in eng.list():
+        eng.cancel(j.id)
+    eng.shutdown()
+
+
+def _route_logs():
+    # pytest swaps sys.stdout between fixture setup and the test call; route it through the jobs again
+    install_log_router()
+
+
+def _blocker(release):
+    def run():
+        while not release.wait(0.01):
+            checkpoint()
+    return run
+
+
+def test_admission_rejects_beyond_max_queue(engine):
+    release = threading.Event()
+    running = engine.submit(_blocker(release), label="running")
+    _until(lambda: running.status == "running")
+
+    queued = [engine.submit(lambda: None, label=f"q{i}") for i in range(2)]
+    assert [j.status for j in queued] == ["queued", "queued"]
+    with pytest.raises(QueueFull):
+        engine.submit(lambda: None)
+    assert engine.stats() == {"workers": 1, "max_queue": 2, "queued": 2, "running": 1}
+    assert len(engine.list()) == 3   # the rejected job was never registered
+
+    release.set()
+    for j in [running, *queued]:
+        assert j.wait(5)
+        assert (j.status, j.exit_code) == ("done", 0)
+    # the queue drained: admission is open again
+    assert engine.submit(lambda: None).wait(5)
+
+
+def test_cancel_queued_job_frees_its_slot_and_never_runs(engine):
+    release = threading.Event()
+    running = engine.submit(_blocker(release))
+    _until(lambda: running.status == "running")
+    ran = threading.Event()
+    victim = engine.submit(ran.set)
+    engine.submit(lambda: None)
+
+    assert engine.cancel(victim.id) is victim
+    assert (victim.status, victim.exit_code) == ("cancelled", -1)
+    assert victim.finished and victim.to_dict()["cancel_requested"]
+    # its slot is free at once, without waiting for the worker
+    engine.submit(lambda: None)
+
+    release.set()
+    _until(lambda: all(j.finished for j in engine.list()))
+    assert not ran.is_set()
+    assert victim.status == "cancelled"
+
+
+def test_cancel_running_job_stops_at_next_checkpoint(engine):
+    _route_logs()
+    started = threading.Event()
+
+    def work():
+        print("step 1")
+        started.set()
+        while True:
+            try:
+                checkpoint()
+            except Exception:   # JobCancelled is a BaseException: pipeline `except Exception` can't eat it
+                pytest.fail("cancel was caught as Exception")
+            time.sleep(0.01)
+
+    job = engine.submit(work)
+    assert started.wait(5)
+    engine.cancel(job.id)
+    assert job.wait(5)
+    assert (job.status, job.exit_code) == ("cancelled", -1)
+    assert job.log_text().splitlines() == ["step 1", "[INFO] Job cancelled."]
+
+
+def test_cancel_finished_or_unknown_job(engine):
+    job = engine.submit(lambda: None)
+    assert job.wait(5)
+    assert engine.cancel(job.id) is job
+    assert (job.status, job.exit_code) == ("done", 0)
+    assert not job.to_dict()["cancel_requested"]
+    assert engine.cancel("nope") is None
+
+
+def test_exit_status_and_log_routing(engine, capsys):
+    _route_logs()
+    def ok():
+        print("hello from the job")
+        # helper threads that copy the context log into the same job
+        t = threading.Thread(target=contextvars.copy_context().run, args=(print, "from a helper"))
+        t.start(); t.join()
+
+    def boom():
+        raise ValueError("bad input")
+
+    def exits(code):
+        raise SystemExit(code)
+
+    j_ok, j_fail = engine.submit(ok), engine.submit(boom)
+    assert j_ok.wait(5) and j_fail.wait(5)
+    j0 = engine.submit(exits, 0); j2 = engine.submit(exits, 2)
+    assert j0.wait(5) and j2.wait(5)
+
+    assert (j_ok.status, j_ok.exit_code) == ("done", 0)
+    assert j_ok.log_text() == "hello from the job\nfrom a helper\n"
+    assert (j_fail.status, j_fail.exit_code) == ("failed", 1)
+    assert "[FATAL] bad input" in j_fail.log_text()
+    assert (j0.status, j0.exit_code) == ("done", 0)
+    assert (j2.status, j2.exit_code) == ("failed", 2)
+    assert "hello from the job" not in capsys.readouterr().out
+
+
+def test_follow_resumes_from_index(engine):
+    _route_logs()
+    job = engine.submit(lambda: print("a\nb\nc"))
+    assert job.wait(5)
+    assert list(job.follow(0)) == [(0, "a"), (1, "b"), (2, "c")]
+    assert list(job.follow(2)) == [(2, "c")]
+    assert list(job.follow(3)) == []
@@ -0,0 +1,77 @@
+# tests/test_lexicon_matcher.py
+# The per-language word trie (video_utils._LexiconIndex.match) must find exactly what the regex scan
+# it replaced found: for every variant, a hit where re.search(r"\bvariant\b") hits, at the same offset.
+import re
+from pathlib import Path
+
+import pytest
+
+import video_utils as vu
+
+ROOT = Path(__file__).resolve().parent.parent
+COLUMN_CODES = {0: "en", 1: "fr", 2: "de"}   # other columns are matched with the en lexicon
+
+
+def _regex_match(joined, code):
+    """canonical -> {variant rank: leftmost start}, by one \\b-bounded regex search per variant."""
+    found = {}
+    for canonical, variants in vu.LEXICON.items():
+        for rank, p in enumerate(list(variants.get(code, [])) + list(variants.get("en", []))):
+            v = vu._normalize_text(p)
+            if not v:
+                continue
+            m = re.search(rf"\b{re.escape(v)}\b", joined)
+            if m:
+                found.setdefault(canonical, {})[rank] = m.start()
+    return found
+
+
+def _corpus_sample(step=100):
+    out = []
+    files = sorted((ROOT / "Text").rglob("*.txt"))
+    n = 0
+    for f in files:
+        for ln in f.read_text(encoding="utf-8", errors="ignore").splitlines():
+            n += 1
+            if n % step:
+                continue
+            for col, part in enumerate(ln.split("|")):
+                part = re.sub(r"#\S+", "", part).strip()
+                if part:
+                    out.append((part, COLUMN_CODES.get(col, "en")))
+    return out
+
+
+def test_trie_matches_regex_scan_on_corpus():
+    sample = _corpus_sample()
+    assert sample, "Text/ corpus is empty"
+    diffs = []
+    for text, code in sample:
+        joined = " ".join(vu._tokenize(text, code))
+        got = vu._lexicon_index(code).match(joined)
+        want = _regex_match(joined, code)
+        if got != want:
+            diffs.append((text, code, got, want))
+    assert not diffs, f"{len(diffs)} of {len(sample)} differ, e.g. {diffs[:3]}"
+
+
+@pytest.mark.parametrize("text, code", [
+    ("I would like a cup of coffee and a croissant", "en"),
+    ("Un café et un croissant, s'il vous plaît", "fr"),
+    ("Ich möchte einen Kaffee", "de"),
+    ("یک قهوه لطفا", "fa"),
+    ("coffee-shop coffeecoffee   coffee", "en"),
+    ("", "en"),
+])
+def test_trie_matches_regex_scan_examples(text, code):
+    joined = " ".join(vu._tokenize(text, code))
+    assert vu._lexicon_index(code).match(joined) == _regex_match(joined, code)
+
+
+@pytest.mark.parametrize("text, code, expected", [
+    ("a latte and a croissant", "en", ["latte", "croissant"]),
+    ("a croissant and a latte", "en", ["croissant", "latte"]),
+    ("un croissant et un latte", "fr", ["croissant", "latte"]),
+])
+def test_detect_candidates_orders_by_first_occurrence(text, code, expected):
+    assert vu._detect_candidates(text, code) == expected
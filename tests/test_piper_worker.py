@@ -0,0 +1,104 @@
+# tests/test_piper_worker.py
+# Persistent Piper workers (audio_utils._PiperWorker / _tts_piper) driven by a fake `piper` script that
+# speaks the same --json-input protocol and logs every process start and sentence.
+import json
+import os
+import stat
+import sys
+import textwrap
+import types
+
+import pytest
+
+import audio_utils as au
+
+# the fake binary is a #! script
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="fake piper needs a POSIX shebang")
+
+FAKE_PIPER = textwrap.dedent("""\
+    #!{python}
+    import json, os, sys, wave
+
+    LOG = {log!r}
+
+    def log(kind, text):
+        with open(LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps({{"pid": os.getpid(), "kind": kind, "text": text}}) + "\\n")
+
+    def speak(text, path):
+        with wave.open(path, "wb") as w:
+            w.setnchannels(1); w.setsampwidth(2); w.setframerate(16000)
+            w.writeframes(b"\\x01\\x00" * 160 * max(1, len(text)))   # 10 ms per character
+
+    args = sys.argv[1:]
+    if "--json-input" in args:
+        log("start", "")
+        for line in sys.stdin:
+            req = json.loads(line)
+            if req["text"] == "CRASH":
+                sys.exit(3)
+            log("json", req["text"])
+            speak(req["text"], req["output_file"])
+            print(req["output_file"], flush=True)
+    else:
+        text = open(args[args.index("--input_file") + 1], encoding="utf-8").read()
+        log("oneshot", text)
+        speak(text, args[args.index("--output_file") + 1])
+""")
+
+
+@pytest.fixture
+def piper(tmp_path, monkeypatch):
+    log = tmp_path / "piper.log"
+    exe = tmp_path / "piper"
+    exe.write_text(FAKE_PIPER.format(python=sys.executable, log=str(log)), encoding="utf-8")
+    exe.chmod(exe.stat().st_mode | stat.S_IXUSR)
+    model = tmp_path / "voice.onnx"
+    model.write_bytes(b"onnx")
+    monkeypatch.setattr(au, "CACHE_TTS_DIR", tmp_path / "tts")
+    monkeypatch.setattr(au, "PCM_CACHE_DIR", tmp_path / "tts" / "pcm")
+    settings = types.SimpleNamespace(PIPER_BIN=str(exe), PIPER_MODEL=str(model), PIPER_CONFIG="",
+                                     PIPER_MODEL_MAP={}, PIPER_PERSISTENT=True, PIPER_WORKERS=1, PIPER_TIMEOUT=20)
+
+    def entries():
+        if not log.exists():
+            return []
+        return [json.loads(ln) for ln in log.read_text(encoding="utf-8").splitlines()]
+
+    yield settings, entries
+    au._close_piper_workers()
+    au._PIPER_POOLS.clear()
+
+
+def test_one_process_serves_many_sentences(piper):
+    settings, entries = piper
+    lens = [len(au._tts_piper(t, "lb", settings=settings)) for t in ("Moien", "Wéi geet et?", "Merci")]
+    assert lens == [50, 120, 50]
+    log = entries()
+    assert [e["kind"] for e in log] == ["start", "json", "json", "json"]
+    assert len({e["pid"] for e in log}) == 1
+
+    # cached: no further piper traffic
+    au._tts_piper("Moien", "lb", settings=settings)
+    assert len(entries()) == 4
+
+
+def test_dead_worker_falls_back_then_restarts(piper):
+    settings, entries = piper
+    au._tts_piper("first", "lb", settings=settings)
+    seg = au._tts_piper("CRASH", "lb", settings=settings)
+    assert len(seg) == 50                       # the one-shot run still produced the sentence
+    au._tts_piper("after", "lb", settings=settings)
+
+    log = entries()
+    assert [(e["kind"], e["text"]) for e in log] == [
+        ("start", ""), ("json", "first"), ("oneshot", "CRASH"), ("start", ""), ("json", "after")]
+    assert log[0]["pid"] != log[3]["pid"]
+
+
+def test_persistent_off_runs_one_shot(piper):
+    settings, entries = piper
+    settings.PIPER_PERSISTENT = False
+    au._tts_piper("one", "lb", settings=settings)
+    au._tts_piper("two", "lb", settings=settings)
+    assert [e["kind"] for e in entries()] == ["oneshot", "oneshot"]
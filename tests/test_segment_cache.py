@@ -0,0 +1,103 @@
+# tests/test_segment_cache.py
+# Content-addressed slideshow segment cache (video_utils.build_slideshow_video_cfr, "segments" renderer).
+# ffmpeg is replaced by a recorder that writes each command's output file.
+import os
+import time
+
+import pytest
+
+import video_utils as vu
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(vu, "CACHE_VIDEO_DIR", tmp_path / "video")
+    monkeypatch.setattr(vu, "SEGMENT_CACHE_DIR", tmp_path / "video" / "segments")
+    vu.CACHE_VIDEO_DIR.mkdir(parents=True)
+    return vu.SEGMENT_CACHE_DIR
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    calls = []
+
+    def run(cmd, check=False, **kw):
+        calls.append(list(cmd))
+        with open(cmd[-1], "w", encoding="utf-8") as f:
+            f.write(" ".join(cmd))
+    monkeypatch.setattr(vu.subprocess, "run", run)
+    return calls
+
+
+def _encodes(calls):
+    return [c for c in calls if "concat" not in c]
+
+
+def _image(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def test_segment_key_follows_content_not_path(tmp_path):
+    a = _image(tmp_path / "a.jpg", b"pixels-a")
+    b = _image(tmp_path / "copy_of_a.jpg", b"pixels-a")
+    c = _image(tmp_path / "c.jpg", b"pixels-c")
+    key = vu._segment_key(a, 30, 1920, 1080, 30)
+    assert vu._segment_key(b, 30, 1920, 1080, 30) == key
+    assert vu._segment_key(c, 30, 1920, 1080, 30) != key
+    assert vu._segment_key(a, 31, 1920, 1080, 30) != key
+    assert vu._segment_key(a, 30, 1280, 720, 30) != key
+    assert vu._segment_key(a, 30, 1920, 1080, 25) != key
+    assert vu._segment_key(None, 30, 1920, 1080, 30) != key
+    # an edited image gets a new digest (memo is keyed by size + mtime)
+    _image(a, b"pixels-a, edited")
+    assert vu._segment_key(a, 30, 1920, 1080, 30) != key
+
+
+def test_second_build_reuses_every_segment(tmp_path, cache, ffmpeg):
+    imgs = [_image(tmp_path / f"{i}.jpg", f"img{i}".encode()) for i in range(3)]
+    cues = [{"start": 0}, {"start": 1000}, {"start": 2000}, {"start": 3000}]
+    per_img = [imgs[0], imgs[1], None, imgs[2]]
+
+    first = vu.build_slideshow_video_cfr(cues, per_img, 4000, size="640x360", fps=30)
+    assert first.exists()
+    assert len(_encodes(ffmpeg)) == 4
+    assert len(list(cache.glob("*.mp4"))) == 4
+    concat = [c for c in ffmpeg if "concat" in c]
+    assert concat and concat[0][concat[0].index("-c") + 1] == "copy"
+
+    ffmpeg.clear()
+    vu.build_slideshow_video_cfr(cues, per_img, 4000, size="640x360", fps=30)
+    assert _encodes(ffmpeg) == []
+
+    # only the span whose duration changed is encoded again
+    ffmpeg.clear()
+    vu.build_slideshow_video_cfr(cues, per_img, 4500, size="640x360", fps=30)
+    assert len(_encodes(ffmpeg)) == 1
+
+
+def test_identical_spans_share_one_segment(tmp_path, cache, ffmpeg):
+    img = _image(tmp_path / "same.jpg", b"same")
+    cues = [{"start": 0}, {"start": 1000}, {"start": 2000}]
+    vu.build_slideshow_video_cfr(cues, [img, img, img], 3000, size="640x360", fps=30)
+    assert len(_encodes(ffmpeg)) == 1
+    listing = (next(vu.CACHE_VIDEO_DIR.glob("run_*")) / "list.txt").read_text(encoding="utf-8").splitlines()
+    assert len(listing) == 3 and len(set(listing)) == 1
+
+
+def test_eviction_is_lru_and_spares_kept_and_recent(cache):
+    cache.mkdir(parents=True)
+    now = time.time()
+    mb = b"\0" * (1024 * 1024)
+    ages = {"old": 5000, "older": 6000, "oldest": 7000, "kept": 8000, "recent": 10}
+    for name, age in ages.items():
+        p = cache / f"{name}.mp4"
+        p.write_bytes(mb)
+        os.utime(p, (now - age, now - age))
+
+    vu._evict_segments({"kept"}, max_mb=3)
+    left = sorted(p.stem for p in cache.glob("*.mp4"))
+    assert left == ["kept", "old", "recent"]
+
+    vu._evict_segments(set(), max_mb=0)
+    assert sorted(p.stem for p in cache.glob("*.mp4")) == ["recent"]
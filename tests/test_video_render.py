@@ -0,0 +1,95 @@
+# tests/test_video_render.py
+# per_sentence renderers run through real ffmpeg (skipped when ffmpeg is not on PATH): frame-exact
+# length, the right still in every span, an audio track, and the segment cache on a re-render.
+import re
+import shutil
+import subprocess
+
+import pytest
+
+import video_utils as vu
+from pydub import AudioSegment
+from subtitles import write_ass_from_cues
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+SIZE, FPS = "320x180", 10
+COLORS = {"red": (255, 0, 0), "green": (0, 128, 0), "blue": (0, 0, 255)}   # ffmpeg color names
+
+
+def _ffmpeg(*args):
+    return subprocess.run(["ffmpeg", "-hide_banner", "-y", *args], check=True, capture_output=True, text=True)
+
+
+@pytest.fixture
+def lesson(tmp_path, monkeypatch):
+    monkeypatch.setattr(vu, "CACHE_VIDEO_DIR", tmp_path / "video")
+    monkeypatch.setattr(vu, "SEGMENT_CACHE_DIR", tmp_path / "video" / "segments")
+    vu.CACHE_VIDEO_DIR.mkdir(parents=True)
+    imgs = {}
+    for name in COLORS:
+        imgs[name] = tmp_path / f"{name}.jpg"
+        _ffmpeg("-f", "lavfi", "-i", f"color=c={name}:s=640x400", "-frames:v", "1", str(imgs[name]))
+    # 4 spans: red, green, black (no image), blue; secondary-style reuse of one image is a merged run
+    cues = [{"start": 0, "end": 900, "text": "one"}, {"start": 1000, "end": 1900, "text": "two"},
+            {"start": 2000, "end": 2900, "text": "three"}, {"start": 3000, "end": 3900, "text": "four"}]
+    images = [imgs["red"], imgs["green"], None, imgs["blue"]]
+    total_ms = 4000
+    wav = tmp_path / "a.wav"
+    AudioSegment.silent(duration=total_ms, frame_rate=vu.SAMPLE_RATE).set_channels(vu.CHANNELS).export(str(wav), format="wav")
+    ass = tmp_path / "a.ass"
+    w, h = map(int, SIZE.split("x"))
+    write_ass_from_cues(cues, str(ass), w, h)
+    return cues, images, total_ms, wav, ass, tmp_path
+
+
+def _probe(mp4):
+    """(video frame count, has audio, corner RGB of the middle frame of each 1 s span)."""
+    err = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(mp4), "-map", "0:v", "-f", "null", "-"],
+                         capture_output=True, text=True).stderr
+    frames = int(re.findall(r"frame=\s*(\d+)", err)[-1])
+    has_audio = bool(re.search(r"Stream #0:\d.*Audio", err))
+    raw = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(mp4), "-vf", "scale=8:8", "-f", "rawvideo",
+                          "-pix_fmt", "rgb24", "-"], check=True, capture_output=True).stdout
+    per = 8 * 8 * 3
+    corners = [tuple(raw[i * per:i * per + 3]) for i in (5, 15, 25, 35)]
+    return frames, has_audio, corners
+
+
+def _close(rgb, want, tol=40):
+    return all(abs(a - b) <= tol for a, b in zip(rgb, want))
+
+
+def _check(mp4):
+    frames, has_audio, corners = _probe(mp4)
+    assert frames == 4000 * FPS // 1000
+    assert has_audio
+    for rgb, want in zip(corners, [COLORS["red"], COLORS["green"], (0, 0, 0), COLORS["blue"]]):
+        assert _close(rgb, want), (rgb, want)
+
+
+def test_single_pass_render(lesson):
+    cues, images, total_ms, wav, ass, tmp = lesson
+    out = vu.render_slideshow_single_pass(cues, images, total_ms, wav, ass, tmp / "single.mp4", size=SIZE, fps=FPS)
+    _check(out)
+
+
+def test_segments_render_and_rerender_reuses_spans(lesson, capsys):
+    cues, images, total_ms, wav, ass, tmp = lesson
+    slideshow = vu.build_slideshow_video_cfr(cues, images, total_ms, size=SIZE, fps=FPS)
+    vu.mux_subs_and_audio_on_video(slideshow, ass, wav, str(tmp / "segments.mp4"))
+    _check(tmp / "segments.mp4")
+    assert "4 total, 0 cached, 4 encoded" in capsys.readouterr().out
+
+    # a text tweak (new subtitles, same timing and images) encodes no span again
+    cues[1]["text"] = "two, edited"
+    write_ass_from_cues(cues, str(ass), *map(int, SIZE.split("x")))
+    slideshow = vu.build_slideshow_video_cfr(cues, images, total_ms, size=SIZE, fps=FPS)
+    vu.mux_subs_and_audio_on_video(slideshow, ass, wav, str(tmp / "segments2.mp4"))
+    _check(tmp / "segments2.mp4")
+    assert "4 total, 4 cached, 0 encoded" in capsys.readouterr().out
+
+    # a longer first line shifts every later cue: only the span whose length changed is encoded
+    shifted = [dict(c, start=c["start"] + (500 if i else 0)) for i, c in enumerate(cues)]
+    vu.build_slideshow_video_cfr(shifted, images, total_ms + 500, size=SIZE, fps=FPS)
+    assert "4 total, 3 cached, 1 encoded" in capsys.readouterr().out
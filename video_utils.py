@@ -3,31 +3,35 @@
 # Video & Image utilities (Pixabay + Unsplash + FFmpeg slideshow)
 # v4: Drop‑in with lightweight NLP + dual provider (Pixabay & Unsplash)
 #  - Multilingual NLP (EN/FR/DE/FA), fuzzy matching (char‑trigram)
-#  - Dynamic scenario-term mining from local .txt files (optional)
+#  - Scenario-term hints from the Text/ corpus index (term_index.py)
 #  - Multi-query fallback + domain anchors
 #  - **NEW:** Unsplash search (alongside Pixabay) with combined re‑ranking.
 #  - Picks the *best* and most relevant image across both providers.
 #  - Public API unchanged:
 #       sentence_to_query(), sentence_to_query_extras(),
-#       get_images_for_cues(), pixabay_search_and_download(),
+#       get_images_for_cues(), CueImagePrefetcher, pixabay_search_and_download(),
 #       build_slideshow_video_cfr(), mux_subs_and_audio_on_video(),
-#       render_video_single_or_none()
+#       render_video_single_or_none(), render_slideshow_single_pass()
 # -------------------------------------------------------------
 
-import subprocess, hashlib, os, string, re, unicodedata, math, random, json, collections
+import subprocess, hashlib, os, string, re, unicodedata, math, random, json, collections, tempfile, shutil, time
+import threading, contextvars, contextlib, functools
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Set
+from typing import List, Tuple, Optional, Dict, Set, FrozenSet, NamedTuple
 
 import requests
 from requests.adapters import HTTPAdapter, Retry
 
-# --- Load settings from settings_temp (GUI) if available; else settings.py ---
-from pathlib import Path
+# --- Defaults from settings.py (per-run size/fps are passed explicitly by main) ---
+import settings as _s
+import term_index
 
+# cooperative cancel for web jobs (no-op from the CLI)
 try:
-    import settings_temp as _s
+    from jobs import checkpoint
 except Exception:
-    import settings as _s
+    def checkpoint() -> None: pass
 
 # Safe defaults (used if a key is missing)
 PIXABAY_SAFESEARCH   = getattr(_s, "PIXABAY_SAFESEARCH", "true")  # Pixabay expects "true"/"false"
@@ -35,6 +39,13 @@ AUTO_IMAGE_LANG      = getattr(_s, "AUTO_IMAGE_LANG", "auto")
 IMAGES_PER_SENTENCE  = int(getattr(_s, "IMAGES_PER_SENTENCE", 1))
 IMAGE_TIMEOUT        = int(getattr(_s, "IMAGE_TIMEOUT", 12))
 IMAGE_RETRIES        = int(getattr(_s, "IMAGE_RETRIES", 3))
+IMAGE_CUE_WORKERS    = int(getattr(_s, "IMAGE_CUE_WORKERS", 4))
+IMAGE_SEARCH_WORKERS = int(getattr(_s, "IMAGE_SEARCH_WORKERS", 8))
+IMAGE_SPECULATIVE    = int(getattr(_s, "IMAGE_SPECULATIVE", 3))
+IMAGE_PROVIDER_CONCURRENCY = dict(getattr(_s, "IMAGE_PROVIDER_CONCURRENCY", {"pixabay": 4, "unsplash": 2}))
+HTTP_POOL_SIZE       = int(getattr(_s, "HTTP_POOL_SIZE", 16))
+IMAGE_SEARCH_CACHE_TTL = int(getattr(_s, "IMAGE_SEARCH_CACHE_TTL", 7 * 24 * 3600))
+IMAGE_SEARCH_CACHE_MAX = int(getattr(_s, "IMAGE_SEARCH_CACHE_MAX", 5000))
 
 CACHE_IMG_DIR        = getattr(_s, "CACHE_IMG_DIR", Path(".cache_images"))
 CACHE_VIDEO_DIR      = getattr(_s, "CACHE_VIDEO_DIR", Path(".cache_video"))
@@ -43,6 +54,7 @@ SAMPLE_RATE          = int(getattr(_s, "SAMPLE_RATE", 48000))
 CHANNELS             = int(getattr(_s, "CHANNELS", 2))
 VIDEO_SIZE           = str(getattr(_s, "VIDEO_SIZE", "1920x1080"))
 VIDEO_FPS            = int(getattr(_s, "VIDEO_FPS", 30))
+VIDEO_SEGMENT_CACHE_MB = int(getattr(_s, "VIDEO_SEGMENT_CACHE_MB", 2048))
 
 # Ensure caches exist
 CACHE_IMG_DIR.mkdir(parents=True, exist_ok=True)
@@ -134,17 +146,21 @@ def _tokenize(text: str, lang: str) -> List[str]:
 # ------------------------------- #
 #        Char‑trigram utils       #
 # ------------------------------- #
-def _trigrams(s: str, n: int = 3) -> Set[str]:
+@functools.lru_cache(maxsize=65536)
+def _trigrams(s: str, n: int = 3) -> FrozenSet[str]:
     s = f"  {s}  "
-    return set(s[i:i+n] for i in range(len(s)-n+1))
+    return frozenset(s[i:i+n] for i in range(len(s)-n+1))
+
+@functools.lru_cache(maxsize=65536)
+def _norm_trigrams(s: str) -> FrozenSet[str]:
+    return _trigrams(_normalize_text(s))
 
 def _tri_sim(a: str, b: str) -> float:
-    A, B = _trigrams(_normalize_text(a)), _trigrams(_normalize_text(b))
+    A, B = _norm_trigrams(a), _norm_trigrams(b)
     if not A or not B:
         return 0.0
     inter = len(A & B)
-    union = len(A | B)
-    return inter / union
+    return inter / (len(A) + len(B) - inter)
 
 # ------------------------------- #
 #        Domain Lexicon           #
@@ -360,15 +376,12 @@ MODIFIER_PHRASES = {
 }
 
 # ------------------------------- #
-#      Dynamic Scenario Mining    #
+#      Scenario Term Hints        #
 # ------------------------------- #
-_SCENARIO_TERMS: Dict[str, Set[str]] = {}
-_SCENARIO_LOADED = False
-
-def _scenario_paths() -> List[Path]:
-    here = Path(__file__).resolve().parent
-    candidates = list(here.glob("A*_*.txt")) + list(here.parent.glob("A*_*.txt"))
-    return candidates
+# Term frequencies come from term_index (SQLite over Text/**/*.txt, per domain × language column),
+# refreshed incrementally once per process; build it offline with `python term_index.py build`.
+_TERM_INDEX_LOCK = threading.Lock()
+_TERM_INDEX_FRESH = False
 
 def _infer_domain_from_filename(fn: str) -> str:
     f = fn.lower()
@@ -381,98 +394,171 @@ def _infer_domain_from_filename(fn: str) -> str:
     if "hotel" in f: return "hotel"
     if "phone" in f: return "phone"
     if "post" in f: return "post"
-    if "cafe" in f: return "food"
+    if "cafe" in f or "_caf." in f: return "food"
     return "generic"
 
-def _load_scenario_terms_once():
-    global _SCENARIO_LOADED, _SCENARIO_TERMS
-    if _SCENARIO_LOADED:
-        return
-    _SCENARIO_LOADED = True
-    term_freq: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
-
-    for p in _scenario_paths():
+def _refresh_term_index_once() -> None:
+    global _TERM_INDEX_FRESH
+    with _TERM_INDEX_LOCK:
+        if _TERM_INDEX_FRESH:
+            return
+        _TERM_INDEX_FRESH = True
         try:
-            text = p.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            continue
-        lang_guess = guess_lang(text)
-        tokens = _tokenize(text, lang_guess)
-        domain = _infer_domain_from_filename(p.name)
-        for t in tokens:
-            if t.isdigit():
-                continue
-            term_freq[domain][t] += 1
-
-    for domain, counter in term_freq.items():
-        keep = set([t for t, c in counter.most_common(200) if c >= NLPConfig.FREQ_MIN_SCENARIO and len(t) > 2])
-        _SCENARIO_TERMS[domain] = keep
+            stats = term_index.update(_tokenize, _infer_domain_from_filename, dict(getattr(_s, "LANG_MAP", {0: "en"})))
+            if stats["updated"] or stats["removed"]:
+                print(f"[INFO] Term index: {stats['updated']} file(s) re-indexed, {stats['removed']} removed.")
+        except Exception as e:
+            print(f"[WARN] Term index refresh failed ({e}); using the existing index.")
+
+@functools.lru_cache(maxsize=64)
+def _scenario_hints(domain: str, col: int) -> Tuple[str, ...]:
+    # "generic" pools every unclassified lesson; its top words are not a scene, so it gets no hints
+    if domain == "generic":
+        return ()
+    _refresh_term_index_once()
+    try:
+        top = term_index.distinctive_terms(domain, col, limit=20, min_count=NLPConfig.FREQ_MIN_SCENARIO)
+    except Exception as e:
+        print(f"[WARN] Term index lookup failed for {domain!r}: {e}")
+        return ()
+    return tuple(t for t, _score in top)
 
-def _scenario_hints_for(domain: str) -> List[str]:
-    _load_scenario_terms_once()
-    return sorted(list(_SCENARIO_TERMS.get(domain, set())))[:20]
+def _scenario_hints_for(domain: str, col: int = 0) -> List[str]:
+    """Terms that characterise a domain's lessons, best first (English column by default: hints extend image queries)."""
+    return list(_scenario_hints(domain, col))
 
 # ------------------------------- #
 #       Core matching logic       #
 # ------------------------------- #
+# Modifier stripper, compiled once: phrases match as normalized substrings (as str.replace did),
+# longest first so "oat milk" / "with milk" win over "milk" (the old set-ordered replace loop could
+# leave "oat" behind, depending on the hash seed); negators only as space-delimited tokens, where a
+# repeat of the token just dropped is kept (" no " replace semantics: "had not not d" → "had not d").
+# tests/test_clean_modifiers.py pins the output over the Text/ corpus against the baseline.
+_MODIFIER_RE = re.compile("|".join(
+    re.escape(p) for p in sorted({_normalize_text(m) for m in MODIFIER_PHRASES} - {""}, key=lambda p: (-len(p), p))
+))
+_NEGATOR_RE = re.compile(r"(?<= )(?:%s)(?= )" % "|".join(
+    re.escape(n) for n in sorted(NEGATORS, key=lambda n: (-len(n), n))
+))
+
 def _clean_modifiers(text: str) -> str:
-    t = _normalize_text(text)
-    for m in MODIFIER_PHRASES:
-        t = t.replace(_normalize_text(m), " ")
-    for n in NEGATORS:
-        t = t.replace(f" {n} ", " ")
+    t = _MODIFIER_RE.sub(" ", _normalize_text(text))
+    last = [-1, ""]
+    def _drop(m: "re.Match") -> str:
+        if m.start() == last[0] + 1 and m.group() == last[1]:
+            last[0] = -1
+            return m.group()
+        last[0], last[1] = m.end(), m.group()
+        return ""
+    t = _NEGATOR_RE.sub(_drop, t)
     t = re.sub(r"\s+", " ", t).strip()
     return t
 
+# Lexicon index (one per language code, built on first use):
+# plain variants ("\w+( \w+)*" after normalization) live in a word trie, so matching is one walk over
+# the sentence's \w+ runs; a variant matches where regex \bvariant\b would (same runs, single spaces between).
+_WORD_RE = re.compile(r"\w+")
+_PLAIN_VARIANT_RE = re.compile(r"\w+(?: \w+)*")
+_LEXICON_ORDER = {c: i for i, c in enumerate(LEXICON)}
+
+class _LexiconIndex:
+    def __init__(self, code: str):
+        self.code = code
+        self.trie: Dict = {}   # word -> child dict; key None -> [(canonical, rank)]
+        self.regex_variants: List[Tuple[str, int, "re.Pattern"]] = []
+        # fuzzy side: trigram -> variant ids (inverted index) + per-variant trigram count
+        self.tri_index: Dict[str, List[int]] = {}
+        self.variant_canon: List[str] = []
+        self.variant_size: List[int] = []
+        self._fuzzy_memo: Dict[str, FrozenSet[str]] = {}
+        for canonical, variants in LEXICON.items():
+            # rank = position in (code variants + en variants): first_idx() prefers the earliest-listed phrase
+            for rank, p in enumerate(list(variants.get(code, [])) + list(variants.get("en", []))):
+                v = _normalize_text(p)
+                if not v:
+                    continue
+                if _PLAIN_VARIANT_RE.fullmatch(v):
+                    node = self.trie
+                    for w in v.split(" "):
+                        node = node.setdefault(w, {})
+                    node.setdefault(None, []).append((canonical, rank))
+                else:
+                    self.regex_variants.append((canonical, rank, re.compile(rf"\b{re.escape(v)}\b")))
+            vlist = list(variants.get(code, [])) + (list(variants.get("en", [])) if code != "en" else [])
+            for v in vlist:
+                V = _trigrams(_normalize_text(v))
+                vid = len(self.variant_canon)
+                self.variant_canon.append(canonical)
+                self.variant_size.append(len(V))
+                for g in V:
+                    self.tri_index.setdefault(g, []).append(vid)
+
+    def match(self, joined: str) -> Dict[str, Dict[int, int]]:
+        """canonical -> {variant rank: leftmost start} for every exact (word-bounded) variant hit."""
+        runs = [(m.start(), m.end(), m.group()) for m in _WORD_RE.finditer(joined)]
+        found: Dict[str, Dict[int, int]] = {}
+        for i, (start, _end, w) in enumerate(runs):
+            node = self.trie.get(w)
+            j = i
+            while node is not None:
+                for canonical, rank in node.get(None, ()):
+                    found.setdefault(canonical, {}).setdefault(rank, start)
+                j += 1
+                if j >= len(runs) or runs[j][0] != runs[j - 1][1] + 1 or joined[runs[j - 1][1]] != " ":
+                    break
+                node = node.get(runs[j][2])
+        for canonical, rank, rx in self.regex_variants:
+            m = rx.search(joined)
+            if m:
+                d = found.setdefault(canonical, {})
+                d[rank] = min(d.get(rank, m.start()), m.start())
+        return found
+
+    def fuzzy_hits(self, tokens: List[str]) -> List[str]:
+        """Typo-tolerant fallback: best token×variant trigram Jaccard ≥ TRIGRAM_MATCH_THRESHOLD."""
+        matched: Set[str] = set()
+        for t in tokens:
+            matched.update(self._fuzzy_token(t))
+        return sorted(matched, key=_LEXICON_ORDER.__getitem__)
+
+    def _fuzzy_token(self, token: str) -> FrozenSet[str]:
+        hit = self._fuzzy_memo.get(token)
+        if hit is not None:
+            return hit
+        T = _norm_trigrams(token)
+        shared: Dict[int, int] = collections.Counter(vid for g in T for vid in self.tri_index.get(g, ()))
+        th = NLPConfig.TRIGRAM_MATCH_THRESHOLD
+        out = set()
+        for vid, inter in shared.items():
+            # Jaccard only for variants sharing a trigram (everything else scores 0)
+            if inter / (len(T) + self.variant_size[vid] - inter) >= th:
+                out.add(self.variant_canon[vid])
+        hit = frozenset(out)
+        if len(self._fuzzy_memo) < 50000:
+            self._fuzzy_memo[token] = hit
+        return hit
+
+_LEXICON_INDEXES: Dict[str, _LexiconIndex] = {}
+
+def _lexicon_index(code: str) -> _LexiconIndex:
+    idx = _LEXICON_INDEXES.get(code)
+    if idx is None:
+        idx = _LEXICON_INDEXES[code] = _LexiconIndex(code)
+    return idx
+
 def _detect_candidates(text: str, lang: str) -> List[str]:
     tokens = _tokenize(text, lang)
     joined = " ".join(tokens)
-    hits: List[str] = []
-
-    for canonical, variants in LEXICON.items():
-        vlist = []
-        code = lang.split("-")[0][:2]
-        vlist.extend(variants.get(code, []))
-        if code != "en":
-            vlist.extend(variants.get("en", []))
-        found = False
-        for v in sorted(set(vlist), key=len, reverse=True):
-            v_norm = _normalize_text(v)
-            if v_norm and re.search(rf"\b{re.escape(v_norm)}\b", joined):
-                hits.append(canonical)
-                found = True
-                break
-        if found:
-            continue
-
-    if not hits:
-        for canonical, variants in LEXICON.items():
-            vlist = []
-            code = lang.split("-")[0][:2]
-            vlist.extend(variants.get(code, []))
-            if code != "en":
-                vlist.extend(variants.get("en", []))
-            best = 0.0
-            for v in vlist:
-                v_norm = _normalize_text(v)
-                for tok in tokens:
-                    s = _tri_sim(tok, v_norm)
-                    if s > best:
-                        best = s
-            if best >= NLPConfig.TRIGRAM_MATCH_THRESHOLD:
-                hits.append(canonical)
+    idx = _lexicon_index(lang.split("-")[0][:2])
+    found = idx.match(joined)
+    hits = list(found) if found else idx.fuzzy_hits(tokens)
 
     def first_idx(key):
-        phrases = []
-        code = lang.split("-")[0][:2]
-        phrases.extend(LEXICON[key].get(code, []))
-        phrases.extend(LEXICON[key].get("en", []))
-        for p in phrases:
-            m = re.search(rf"\b{re.escape(_normalize_text(p))}\b", joined)
-            if m:
-                return m.start()
-        return 10**9
-    return sorted(set(hits), key=first_idx)
+        # start of the earliest-listed matching phrase; ties keep LEXICON order
+        ranks = found.get(key)
+        return (ranks[min(ranks)] if ranks else 10**9, _LEXICON_ORDER[key])
+    return sorted(hits, key=first_idx)
 
 def _classify(canonical: str) -> str:
     if canonical in {"espresso","americano","cappuccino","latte","flat white","black coffee","green tea","herbal tea","hot chocolate","croissant","sandwich"}:
@@ -513,12 +599,25 @@ def _domain_anchor(domain: str) -> List[str]:
     }
     return mapping.get(domain, mapping["generic"])
 
-def sentence_to_query(text: str, lang: str = AUTO_IMAGE_LANG, max_words: int = NLPConfig.MAX_QUERY_TOKENS) -> str:
-    auto = lang if lang and lang != "auto" else guess_lang(text)
-    text_norm = _clean_modifiers(text)
-    tokens = _tokenize(text_norm, auto)
+# ------------------------------- #
+#   Query plan (memoized per line) #
+# ------------------------------- #
+class _QueryPlan(NamedTuple):
+    tokens: Tuple[str, ...]     # cleaned, stopword-free tokens
+    hits: Tuple[str, ...]       # lexicon canonicals, sentence order
+
+def _resolve_lang(text: str, lang: Optional[str]) -> str:
+    return lang if lang and lang != "auto" else guess_lang(text)
+
+@functools.lru_cache(maxsize=4096)
+def _query_plan(text: str, lang: str) -> _QueryPlan:
+    """Tokenize + modifier cleanup + lexicon detection once per (text, resolved lang); shared by parse and image time."""
+    tokens = tuple(_tokenize(_clean_modifiers(text), lang))
+    return _QueryPlan(tokens, tuple(_detect_candidates(" ".join(tokens), lang)))
 
-    hits = _detect_candidates(text_norm, auto)
+def sentence_to_query(text: str, lang: str = AUTO_IMAGE_LANG, max_words: int = NLPConfig.MAX_QUERY_TOKENS) -> str:
+    plan = _query_plan(text, _resolve_lang(text, lang))
+    tokens, hits = list(plan.tokens), plan.hits
     if hits:
         first = hits[0]
         tmpl, _cat = QUERY_TEMPLATES.get(first, (first, None))
@@ -550,11 +649,14 @@ def sentence_to_query(text: str, lang: str = AUTO_IMAGE_LANG, max_words: int = N
     return phrase or anchors[0]
 
 def sentence_to_query_extras(text: str, lang: str) -> Tuple[List[Tuple[str, Optional[str]]], Optional[str]]:
-    auto = lang if lang and lang != "auto" else guess_lang(text)
-    primary = sentence_to_query(text, auto)
+    pairs, primary_cat = _query_extras(text, _resolve_lang(text, lang))
+    return list(pairs), primary_cat
 
-    tokens = _tokenize(_clean_modifiers(text), auto)
-    hits = _detect_candidates(" ".join(tokens), auto)
+@functools.lru_cache(maxsize=4096)
+def _query_extras(text: str, auto: str) -> Tuple[Tuple[Tuple[str, Optional[str]], ...], Optional[str]]:
+    primary = sentence_to_query(text, auto)
+    plan = _query_plan(text, auto)
+    tokens, hits = list(plan.tokens), list(plan.hits)
     primary_cat = None
     domain = "generic"
     if hits:
@@ -610,18 +712,50 @@ def sentence_to_query_extras(text: str, lang: str) -> Tuple[List[Tuple[str, Opti
             seen.add(key)
         if len(uniq) >= (1 + NLPConfig.MAX_FALLBACKS):
             break
-    return uniq, primary_cat
+    return tuple(uniq), primary_cat
 
 # ------------------------------- #
 #        HTTP & Keys              #
 # ------------------------------- #
-def _requests_session_with_retries() -> requests.Session:
+def _requests_session_with_retries(pool_size: int = 10) -> requests.Session:
     s = requests.Session()
     retries = Retry(total=IMAGE_RETRIES, backoff_factor=0.6, status_forcelist=[429,500,502,503,504])
-    s.mount("https://", HTTPAdapter(max_retries=retries))
-    s.mount("http://", HTTPAdapter(max_retries=retries))
+    s.mount("https://", HTTPAdapter(max_retries=retries, pool_connections=4, pool_maxsize=pool_size))
+    s.mount("http://", HTTPAdapter(max_retries=retries, pool_connections=4, pool_maxsize=pool_size))
     return s
 
+# One keep-alive session per provider (API + CDN hosts), shared by all cues and jobs
+_HTTP_SESSIONS: Dict[str, requests.Session] = {}
+_HTTP_SESSIONS_LOCK = threading.Lock()
+
+def _http_session(provider: str) -> requests.Session:
+    with _HTTP_SESSIONS_LOCK:
+        sess = _HTTP_SESSIONS.get(provider)
+        if sess is None:
+            sess = _HTTP_SESSIONS[provider] = _requests_session_with_retries(HTTP_POOL_SIZE)
+        return sess
+
+def http_pool_stats() -> Dict[str, Dict]:
+    """Per provider/host: requests sent vs TCP/TLS connections opened (the rest reused a pooled connection)."""
+    out: Dict[str, Dict] = {}
+    with _HTTP_SESSIONS_LOCK:
+        sessions = list(_HTTP_SESSIONS.items())
+    for provider, sess in sessions:
+        hosts = {}
+        for adapter in set(sess.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                reqs, conns = int(pool.num_requests), int(pool.num_connections)
+                hosts[f"{pool.scheme}://{pool.host}"] = {
+                    "requests": reqs, "connections": conns, "reused": max(0, reqs - conns),
+                    "hit_rate": round(max(0, reqs - conns) / reqs, 3) if reqs else 0.0,
+                }
+        out[provider] = hosts
+    return out
+
 def read_pixabay_key_from_file() -> Optional[str]:
     for d in (Path.cwd(), Path(__file__).resolve().parent):
         f = d / "pixabay.key"
@@ -646,6 +780,59 @@ def read_unsplash_key_from_file() -> Optional[str]:
                 pass
     return None
 
+# ------------------------------- #
+#     Search result cache         #
+# ------------------------------- #
+# ranked hit lists on disk: .cache_images/search/<sha>.json; failed searches are never stored
+SEARCH_CACHE_DIR = CACHE_IMG_DIR / "search"
+_SEARCH_CACHE_WRITES = 0
+_SEARCH_CACHE_LOCK = threading.Lock()
+
+def _search_cache_path(provider: str, query: str, category: Optional[str], per_page: int, safesearch: str) -> Path:
+    raw = json.dumps([provider, query, category or "", int(per_page), str(safesearch)], ensure_ascii=False)
+    return SEARCH_CACHE_DIR / (hashlib.sha256(raw.encode("utf-8")).hexdigest() + ".json")
+
+def _search_cache_get(path: Path) -> Optional[List[Dict]]:
+    try:
+        if time.time() - path.stat().st_mtime > IMAGE_SEARCH_CACHE_TTL:
+            path.unlink(missing_ok=True)
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))["ranked"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _search_cache_put(path: Path, ranked: List[Dict]) -> None:
+    global _SEARCH_CACHE_WRITES
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"ts": time.time(), "ranked": ranked}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        return
+    with _SEARCH_CACHE_LOCK:
+        _SEARCH_CACHE_WRITES += 1
+        if _SEARCH_CACHE_WRITES % 50:
+            return
+    _prune_search_cache()
+
+def _prune_search_cache() -> None:
+    """Drop expired entries, then the oldest ones above IMAGE_SEARCH_CACHE_MAX."""
+    now = time.time()
+    entries = []
+    for p in SEARCH_CACHE_DIR.glob("*.json"):
+        try:
+            mtime = p.stat().st_mtime
+        except OSError:
+            continue
+        if now - mtime > IMAGE_SEARCH_CACHE_TTL:
+            p.unlink(missing_ok=True)
+        else:
+            entries.append((mtime, p))
+    entries.sort()
+    for _, p in entries[:max(0, len(entries) - IMAGE_SEARCH_CACHE_MAX)]:
+        p.unlink(missing_ok=True)
+
 # ------------------------------- #
 #        Ranking / Scoring        #
 # ------------------------------- #
@@ -692,7 +879,11 @@ def _pixabay_ranked(query: str, key: str, category: Optional[str]) -> List[Dict]
     }
     if category:
         params["category"] = category
-    sess = _requests_session_with_retries()
+    cache_p = _search_cache_path("pixabay", query, category, params["per_page"], params["safesearch"])
+    cached = _search_cache_get(cache_p)
+    if cached is not None:
+        return cached
+    sess = _http_session("pixabay")
     try:
         r = sess.get(url, params=params, timeout=IMAGE_TIMEOUT)
         r.raise_for_status()
@@ -721,6 +912,7 @@ def _pixabay_ranked(query: str, key: str, category: Optional[str]) -> List[Dict]
             "meta": {"pageURL": h.get("pageURL"), "user": h.get("user"), "user_id": h.get("user_id")}
         })
     ranked.sort(key=lambda x: x["score"], reverse=True)
+    _search_cache_put(cache_p, ranked)
     return ranked
 
 def _download_image(sess: requests.Session, src: str, query: str, dest_dir: Path, provider: str) -> Optional[Path]:
@@ -730,7 +922,14 @@ def _download_image(sess: requests.Session, src: str, query: str, dest_dir: Path
         if not dst.exists():
             img = sess.get(src, timeout=IMAGE_TIMEOUT)
             img.raise_for_status()
-            dst.write_bytes(img.content)
+            # private temp file + atomic rename: parallel cues / prefetch / jobs may fetch the same src,
+            # and exists() must never see a half-written JPEG
+            tmp = dst.with_name(f"{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                tmp.write_bytes(img.content)
+                os.replace(tmp, dst)
+            finally:
+                tmp.unlink(missing_ok=True)
         return dst
     except Exception:
         return None
@@ -744,7 +943,7 @@ def pixabay_search_and_download(query: str, dest_dir: Path, n: int = 1, key_once
     dest_dir.mkdir(parents=True, exist_ok=True)
     ranked = _pixabay_ranked(query, key, category)
     out: List[Path] = []
-    sess = _requests_session_with_retries()
+    sess = _http_session("pixabay")
     seen = set()
     for item in ranked:
         if item["src"] in seen: continue
@@ -767,7 +966,11 @@ def _unsplash_ranked(query: str, key: str) -> List[Dict]:
         "orientation": ProviderConfig.ORIENTATION,
         "content_filter": ProviderConfig.CONTENT_FILTER
     }
-    sess = _requests_session_with_retries()
+    cache_p = _search_cache_path("unsplash", query, None, params["per_page"], params["content_filter"])
+    cached = _search_cache_get(cache_p)
+    if cached is not None:
+        return cached
+    sess = _http_session("unsplash")
     try:
         r = sess.get(url, headers=headers, params=params, timeout=IMAGE_TIMEOUT)
         r.raise_for_status()
@@ -812,6 +1015,7 @@ def _unsplash_ranked(query: str, key: str) -> List[Dict]:
             }
         })
     ranked.sort(key=lambda x: x["score"], reverse=True)
+    _search_cache_put(cache_p, ranked)
     return ranked
 
 def _write_credit_sidecar(image_path: Path, item: Dict):
@@ -830,41 +1034,66 @@ def _write_credit_sidecar(image_path: Path, item: Dict):
     except Exception:
         pass
 
-def _search_both_ranked(query: str, category: Optional[str]) -> List[Dict]:
-    ranked_all: List[Dict] = []
+# ------------------------------- #
+#   Concurrent provider searches  #
+# ------------------------------- #
+# one process-wide pool for provider HTTP searches + a semaphore per provider (rate limits);
+# cue-level work runs on a separate pool, so waiting cues never starve the searches
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=max(1, IMAGE_SEARCH_WORKERS), thread_name_prefix="img-search")
+_PROVIDER_SEMS = {p: threading.BoundedSemaphore(max(1, int(n))) for p, n in IMAGE_PROVIDER_CONCURRENCY.items()}
+
+def _submit_in_context(pool: ThreadPoolExecutor, fn, *args) -> Future:
+    # copy_context: worker threads keep the job's log routing / cancel flag
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+def _provider_keys(verbose: bool = True) -> Tuple[Optional[str], Optional[str]]:
     pix_key = read_pixabay_key_from_file()
     uns_key = read_unsplash_key_from_file()
-
-    if pix_key:
-        ranked_all.extend(_pixabay_ranked(query, pix_key, category))
-    else:
+    if verbose and not pix_key:
         print("ℹ️ Pixabay key not found, skipping Pixabay for this query.")
-    if uns_key:
-        ranked_all.extend(_unsplash_ranked(query, uns_key))
-    else:
+    if verbose and not uns_key:
         print("ℹ️ Unsplash key not found, skipping Unsplash for this query.")
+    return pix_key, uns_key
+
+def _provider_search(provider: str, query: str, key: str, category: Optional[str]) -> List[Dict]:
+    with _PROVIDER_SEMS.get(provider) or contextlib.nullcontext():
+        checkpoint()
+        if provider == "pixabay":
+            return _pixabay_ranked(query, key, category)
+        return _unsplash_ranked(query, key)
+
+def _submit_search(query: str, category: Optional[str], keys: Tuple[Optional[str], Optional[str]]) -> List[Future]:
+    """Start both providers' searches for one query at once."""
+    pix_key, uns_key = keys
+    futs: List[Future] = []
+    if pix_key:
+        futs.append(_submit_in_context(_SEARCH_POOL, _provider_search, "pixabay", query, pix_key, category))
+    if uns_key:
+        futs.append(_submit_in_context(_SEARCH_POOL, _provider_search, "unsplash", query, uns_key, None))
+    return futs
 
+def _merge_ranked(futs: List[Future]) -> List[Dict]:
+    ranked_all: List[Dict] = []
+    for f in futs:   # fixed provider order + stable sort → deterministic ties
+        try:
+            ranked_all.extend(f.result())
+        except Exception as e:
+            print(f"⚠️ Image search failed: {e}")
     ranked_all.sort(key=lambda x: x["score"], reverse=True)
     return ranked_all
 
-def search_and_download_best(query: str, dest_dir: Path, n: int = 1, category: Optional[str] = None) -> List[Path]:
-    """
-    Search both Unsplash & Pixabay, combine & re-rank, download top-n unique images.
-    """
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    ranked_all = _search_both_ranked(query, category)
-    if not ranked_all:
-        return []
+def _search_both_ranked(query: str, category: Optional[str]) -> List[Dict]:
+    return _merge_ranked(_submit_search(query, category, _provider_keys()))
 
+def _download_best(ranked_all: List[Dict], query: str, dest_dir: Path, n: int = 1) -> List[Path]:
     out: List[Path] = []
-    sess = _requests_session_with_retries()
     seen_src = set()
     for item in ranked_all:
         src = item["src"]
         if src in seen_src:
             continue
         seen_src.add(src)
-        p = _download_image(sess, src, query, dest_dir, item["provider"])
+        p = _download_image(_http_session(item["provider"]), src, query, dest_dir, item["provider"])
         if p:
             _write_credit_sidecar(p, item)
             out.append(p)
@@ -872,75 +1101,145 @@ def search_and_download_best(query: str, dest_dir: Path, n: int = 1, category: O
             break
     return out
 
+def search_and_download_best(query: str, dest_dir: Path, n: int = 1, category: Optional[str] = None) -> List[Path]:
+    """
+    Search both Unsplash & Pixabay, combine & re-rank, download top-n unique images.
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    ranked_all = _search_both_ranked(query, category)
+    if not ranked_all:
+        return []
+    return _download_best(ranked_all, query, dest_dir, n)
+
 # ------------------------------- #
 #   High-level: sentence → image  #
 # ------------------------------- #
-def get_images_for_cues(cues: List[dict]) -> List[Optional[Path]]:
+def _norm_tag(t: str) -> str:
+    """lower, keep [a-z0-9-], drop too short/long"""
+    t = str(t or "").strip().lower()
+    t = "".join(ch for ch in t if (ch.isalnum() or ch == "-"))
+    return t if 2 <= len(t) <= 24 else ""
+
+def _image_candidates(cue: dict) -> List[Tuple[str, Optional[str], str]]:
+    """Queries for one cue in priority order: explicit tags (joined, then each), then NLP fallbacks."""
+    lang = cue.get("lang", AUTO_IMAGE_LANG) or "auto"
+    try:
+        q_pairs, primary_cat = sentence_to_query_extras(cue["text"], lang=lang)
+    except Exception:
+        q_pairs, primary_cat = [], None
+    cands: List[Tuple[str, Optional[str], str]] = []
+    tags_norm = [x for x in (_norm_tag(t) for t in (cue.get("tags") or [])) if x]
+    if tags_norm:
+        # category derived from the sentence (helps Pixabay)
+        cands.append((" ".join(tags_norm), primary_cat, "tags (joined)"))
+        cands += [(t, primary_cat, "tag") for t in tags_norm]
+    cands += [(q, cat, "best-of providers") for q, cat in q_pairs]
+    seen, out = set(), []
+    for q, cat, via in cands:
+        if (q, cat) not in seen:
+            seen.add((q, cat))
+            out.append((q, cat, via))
+    return out
+
+def _resolve_cue_image(cue: dict, keys: Tuple[Optional[str], Optional[str]]) -> Optional[Path]:
+    """
+    First candidate (in priority order) with a hit wins, exactly like the serial walk.
+    The primary query runs alone; only after it misses are up to IMAGE_SPECULATIVE later candidates
+    searched ahead (cancelled once the cue is satisfied), so a first-query hit costs one search.
+    """
+    checkpoint()
+    cands = _image_candidates(cue)
+    window = max(1, IMAGE_SPECULATIVE)
+    n = max(1, IMAGES_PER_SENTENCE)
+    inflight: List[List[Future]] = []
+    try:
+        for i, (q, cat, via) in enumerate(cands):
+            ahead = window if i else 1
+            while len(inflight) < min(len(cands), i + ahead):
+                q2, cat2, _ = cands[len(inflight)]
+                inflight.append(_submit_search(q2, cat2, keys))
+            ranked = _merge_ranked(inflight[i])
+            imgs = _download_best(ranked, q, CACHE_IMG_DIR, n) if ranked else []
+            if imgs:
+                print(f"🖼️ Image matched via {via}: '{q}' -> {imgs[0].name}")
+                return imgs[0]
+            print(f"… no hit for '{q}', trying fallback.")
+        return None
+    finally:
+        for futs in inflight:
+            for f in futs:
+                f.cancel()
+
+def _cue_image_key(cue: dict) -> Tuple[str, str, Tuple[str, ...]]:
+    # everything _image_candidates() reads from a cue
+    return (str(cue.get("text", "")), str(cue.get("lang", AUTO_IMAGE_LANG) or "auto"),
+            tuple(str(t) for t in (cue.get("tags") or [])))
+
+class CueImagePrefetcher:
+    """
+    Resolves images for cues known before the timeline exists (e.g. lines streamed from the LLM);
+    get_images_for_cues(..., prefetch=p) picks up the running lookups instead of starting new ones.
+    """
+
+    def __init__(self):
+        self._keys = _provider_keys()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, IMAGE_CUE_WORKERS), thread_name_prefix="img-pre")
+        self._futs: Dict[Tuple[str, str, Tuple[str, ...]], Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, cue: dict) -> None:
+        if not any(self._keys) or not str(cue.get("text", "")).strip():
+            return
+        key = _cue_image_key(cue)
+        with self._lock:
+            if key not in self._futs:
+                CACHE_IMG_DIR.mkdir(parents=True, exist_ok=True)
+                self._futs[key] = _submit_in_context(self._pool, _resolve_cue_image, dict(cue), self._keys)
+
+    def pop(self, cue: dict) -> Optional[Future]:
+        with self._lock:
+            return self._futs.pop(_cue_image_key(cue), None)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+def get_images_for_cues(cues: List[dict], prefetch: Optional[CueImagePrefetcher] = None) -> List[Optional[Path]]:
     """
     Return one image per PRIMARY cue (SECONDARY cues reuse last image).
     Now tries:
       1) if cue contains explicit tags -> try searching tags (joined and individual)
       2) fallback to existing sentence_to_query_extras pipeline
+    Cues are resolved in parallel (IMAGE_CUE_WORKERS); results keep cue order.
+    Lookups already started by `prefetch` are awaited instead of repeated.
     """
+    keys = _provider_keys()
+    primaries = [c for c in cues if c.get("is_primary", True)]
+    resolved: List[Optional[Path]] = []
+    if primaries and any(keys):
+        CACHE_IMG_DIR.mkdir(parents=True, exist_ok=True)
+        pool = ThreadPoolExecutor(max_workers=max(1, min(IMAGE_CUE_WORKERS, len(primaries))), thread_name_prefix="img-cue")
+        try:
+            futs = [(prefetch.pop(c) if prefetch is not None else None) or _submit_in_context(pool, _resolve_cue_image, c, keys)
+                    for c in primaries]
+            for f in futs:
+                resolved.append(f.result())
+                checkpoint()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if prefetch is not None:
+                prefetch.close()
+    else:
+        resolved = [None] * len(primaries)
+        if prefetch is not None:
+            prefetch.close()
+
     result: List[Optional[Path]] = []
     last_img: Optional[Path] = None
-
+    it = iter(resolved)
     for c in cues:
         if c.get("is_primary", True):
-            lang = c.get("lang", AUTO_IMAGE_LANG)
-            # 1) Try explicit tags first
-            tags = c.get("tags") or []
-            img_path: Optional[Path] = None
-            if tags:
-                # --- normalize tags (lower, keep [a-z0-9-], drop empties)
-                def _norm_tag(t: str) -> str:
-                    t = str(t or "").strip().lower()
-                    t = "".join(ch for ch in t if (ch.isalnum() or ch == "-"))
-                    return t if 2 <= len(t) <= 24 else ""
-                tags_norm = [x for x in (_norm_tag(t) for t in tags) if x]
-
-                # derive category from the sentence (helps Pixabay)
-                primary_cat = None
-                try:
-                    q_pairs_for_cat, cat = sentence_to_query_extras(c["text"], lang=lang or "auto")
-                    primary_cat = cat
-                except Exception:
-                    primary_cat = None
-
-                # try joined tags phrase first
-                if tags_norm:
-                    joined = " ".join(tags_norm)
-                    print(f"🔎 Trying explicit tags for image (with category={primary_cat}): {joined}")
-                    imgs = search_and_download_best(joined, CACHE_IMG_DIR, n=max(1, IMAGES_PER_SENTENCE), category=primary_cat)
-                    if imgs:
-                        img_path = imgs[0]
-                        print(f"🖼️ Image matched via tags (joined): '{joined}' -> {img_path.name}")
-                    else:
-                        # try each tag alone as a fallback (with category if any)
-                        for t in tags_norm:
-                            imgs = search_and_download_best(t, CACHE_IMG_DIR, n=max(1, IMAGES_PER_SENTENCE), category=primary_cat)
-                            if imgs:
-                                img_path = imgs[0]
-                                print(f"🖼️ Image matched via tag: '{t}' -> {img_path.name}")
-                                break
-
-
-            # 2) If no explicit-tag hit, fallback to the previous NLP pipeline
-            if not img_path:
-                q_pairs, primary_cat = sentence_to_query_extras(c["text"], lang=lang or "auto")
-                for q, cat in q_pairs:
-                    imgs = search_and_download_best(q, CACHE_IMG_DIR, n=max(1, IMAGES_PER_SENTENCE), category=cat)
-                    if imgs:
-                        img_path = imgs[0]
-                        print(f"🖼️ Image matched: '{q}' (via best-of providers) -> {img_path.name}")
-                        break
-                    else:
-                        print(f"… no hit for '{q}', trying fallback.")
-
-            last_img = img_path
-            result.append(img_path)
-        else:
-            result.append(last_img)
+            last_img = next(it)
+        result.append(last_img)
     return result
 
 
@@ -959,21 +1258,73 @@ def compute_visual_spans(cues: List[dict], total_audio_ms: int) -> List[Tuple[in
         spans.append((start, end))
     return spans
 
+# Content-addressed segment cache (.cache_video/segments/<sha>.mp4)
+SEGMENT_CACHE_DIR = CACHE_VIDEO_DIR / "segments"
+SEGMENT_ENCODER   = ("-c:v", "libx264", "-pix_fmt", "yuv420p")   # part of the key; shared → stream-copy concat
+_SEGMENT_MIN_AGE_S = 600   # never evict segments touched this recently (another job may be concatenating them)
+_IMG_DIGESTS: Dict[Tuple[str, int, int], str] = {}
+
+def _image_digest(img: Path) -> str:
+    st = img.stat()
+    k = (str(img.resolve()), st.st_size, st.st_mtime_ns)
+    d = _IMG_DIGESTS.get(k)
+    if d is None:
+        h = hashlib.sha256()
+        with open(img, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        d = _IMG_DIGESTS[k] = h.hexdigest()
+    return d
+
+def _segment_key(img: Optional[Path], frames: int, w: int, h: int, fps) -> str:
+    src = _image_digest(img) if img is not None else "black"
+    return hashlib.sha256(f"{src}|{frames}|{w}x{h}|{fps}|{' '.join(SEGMENT_ENCODER)}".encode("utf-8")).hexdigest()
+
+def _evict_segments(keep: Set[str], max_mb: int = VIDEO_SEGMENT_CACHE_MB) -> None:
+    """LRU by mtime (hits are touched) until the cache fits in max_mb."""
+    try:
+        entries = [(p.stat().st_mtime, p.stat().st_size, p) for p in SEGMENT_CACHE_DIR.glob("*.mp4")]
+    except OSError:
+        return
+    total = sum(e[1] for e in entries)
+    limit = max(0, int(max_mb)) * 1024 * 1024
+    cutoff = time.time() - _SEGMENT_MIN_AGE_S
+    for mtime, size, p in sorted(entries):
+        if total <= limit:
+            break
+        if p.stem in keep or mtime > cutoff:
+            continue
+        p.unlink(missing_ok=True)
+        total -= size
+
 def build_slideshow_video_cfr(cues, per_sentence_images, total_audio_ms, size=VIDEO_SIZE, fps=VIDEO_FPS) -> Path:
     w, h = map(int, size.split("x"))
-    tmp_dir = CACHE_VIDEO_DIR
-    tmp_dir.mkdir(exist_ok=True)
+    SEGMENT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # private work dir per call for the list + slideshow; segments live in the shared content-addressed cache
+    tmp_dir = Path(tempfile.mkdtemp(prefix="run_", dir=str(CACHE_VIDEO_DIR)))
 
     spans = compute_visual_spans(cues, total_audio_ms)
     seg_paths = []
+    keys: Set[str] = set()
+    hits = 0
     r_fps = float(fps)
 
     for i, ((start_ms, end_ms), img) in enumerate(zip(spans, per_sentence_images), start=1):
+        checkpoint()
         dur_ms = max(0, end_ms - start_ms)
         frames = max(1, round(dur_ms * r_fps / 1000.0))
-        seg = tmp_dir / f"seg_{i:04}.mp4"
+        img_p = Path(img) if img and Path(img).exists() else None
+        key = _segment_key(img_p, frames, w, h, fps)
+        seg = SEGMENT_CACHE_DIR / f"{key}.mp4"
+        keys.add(key)
+        seg_paths.append(seg)
+        if seg.exists():
+            os.utime(seg)   # LRU touch
+            hits += 1
+            continue
 
-        if img and Path(img).exists():
+        part = tmp_dir / f"seg_{i:04}.mp4"
+        if img_p is not None:
             vf = (
                 "scale="
                 f"w='if(gte(a,{w}/{h}),-1,{w})':"
@@ -982,12 +1333,12 @@ def build_slideshow_video_cfr(cues, per_sentence_images, total_audio_ms, size=VI
             )
             cmd = [
                 "ffmpeg","-hide_banner","-y",
-                "-loop","1","-i", str(img),
+                "-loop","1","-i", str(img_p),
                 "-vf", vf,
                 "-r", str(fps),
                 "-frames:v", str(frames),
-                "-c:v","libx264","-pix_fmt","yuv420p",
-                str(seg)
+                *SEGMENT_ENCODER,
+                str(part)
             ]
         else:
             cmd = [
@@ -995,30 +1346,100 @@ def build_slideshow_video_cfr(cues, per_sentence_images, total_audio_ms, size=VI
                 "-f","lavfi","-i", f"color=c=black:s={w}x{h}:r={fps}",
                 "-r", str(fps),
                 "-frames:v", str(frames),
-                "-c:v","libx264","-pix_fmt","yuv420p",
-                str(seg)
+                *SEGMENT_ENCODER,
+                str(part)
             ]
         subprocess.run(cmd, check=True)
-        seg_paths.append(seg)
+        os.replace(part, seg)   # atomic publish; concurrent writers of the same key are harmless
+    print(f"[VIDEO] segments: {len(seg_paths)} total, {hits} cached, {len(seg_paths) - hits} encoded")
 
     list_file = tmp_dir / "list.txt"
     with open(list_file, "w", encoding="utf-8") as f:
         for p in seg_paths:
             f.write(f"file '{p.resolve()}'\n")
 
+    # all segments share encoder params → stream copy, no re-encode
     slideshow = tmp_dir / "slideshow.mp4"
     cmd_concat = [
         "ffmpeg","-hide_banner","-y",
         "-f","concat","-safe","0",
         "-i", str(list_file),
-        "-c:v","libx264","-pix_fmt","yuv420p",
-        "-r", str(fps),
+        "-c","copy",
         "-an",
         str(slideshow)
     ]
     subprocess.run(cmd_concat, check=True)
+    _evict_segments(keys)
     return slideshow.resolve()
 
+def _slideshow_runs(cues, per_sentence_images, total_audio_ms, fps) -> List[Tuple[Optional[Path], int]]:
+    """(image or None for black, frames) per visual span; consecutive spans on the same image are merged."""
+    runs: List[Tuple[Optional[Path], int]] = []
+    r_fps = float(fps)
+    for (start_ms, end_ms), img in zip(compute_visual_spans(cues, total_audio_ms), per_sentence_images):
+        frames = max(1, round(max(0, end_ms - start_ms) * r_fps / 1000.0))
+        img_p = Path(img).resolve() if img and Path(img).exists() else None
+        if runs and runs[-1][0] == img_p:
+            runs[-1] = (img_p, runs[-1][1] + frames)
+        else:
+            runs.append((img_p, frames))
+    return runs
+
+def render_slideshow_single_pass(cues, per_sentence_images, total_audio_ms, audio_path, ass_path, out_mp4,
+                                 size=VIDEO_SIZE, fps=VIDEO_FPS) -> Path:
+    """
+    per_sentence video in ONE libx264 encode: each span is a still (or black) trimmed to an exact frame
+    count, concatenated, subtitled and muxed with the audio in a single filter graph.
+    Same output as build_slideshow_video_cfr() + mux_subs_and_audio_on_video(), without 2 extra encodes.
+    """
+    audio_p = Path(audio_path).resolve()
+    ass_p   = Path(ass_path).resolve()
+    out_p   = Path(out_mp4).resolve()
+    w, h = map(int, size.split("x"))
+    runs = _slideshow_runs(cues, per_sentence_images, total_audio_ms, fps)
+    if not runs:
+        runs = [(None, max(1, round(total_audio_ms * float(fps) / 1000.0)))]
+
+    inputs: List[str] = []
+    chains: List[str] = []
+    n_img = 0
+    fit = (f"scale=w='if(gte(a,{w}/{h}),-1,{w})':h='if(gte(a,{w}/{h}),{h},-1)',"
+           f"crop={w}:{h},setsar=1,fps={fps},format=yuv420p")
+    for i, (img, frames) in enumerate(runs):
+        checkpoint()
+        tail = f"trim=end_frame={frames},setpts=PTS-STARTPTS[s{i}]"
+        if img is not None:
+            # bounded loop input (+1 frame of slack); trim makes the length frame-exact
+            inputs += ["-loop", "1", "-framerate", str(fps), "-t", f"{(frames + 1) / float(fps):.6f}", "-i", str(img)]
+            chains.append(f"[{n_img}:v]{fit},{tail}")
+            n_img += 1
+        else:
+            chains.append(f"color=c=black:s={w}x{h}:r={fps},setsar=1,format=yuv420p,{tail}")
+    subs = f"subtitles=filename={ass_p.name}:charenc=UTF-8:force_style='Alignment=5,BorderStyle=1,Outline=3,Shadow=2'"
+    graph = ";\n".join(chains + ["".join(f"[s{i}]" for i in range(len(runs))) + f"concat=n={len(runs)}:v=1:a=0[cat]",
+                                  f"[cat]{subs}[vout]"])
+
+    CACHE_VIDEO_DIR.mkdir(parents=True, exist_ok=True)
+    work = Path(tempfile.mkdtemp(prefix="run_", dir=str(CACHE_VIDEO_DIR)))
+    try:
+        script = work / "graph.txt"
+        script.write_text(graph, encoding="utf-8")
+        cmd = [
+            "ffmpeg","-hide_banner","-y",
+            *inputs,
+            "-i", str(audio_p),
+            "-filter_complex_script", str(script.resolve()),
+            "-map", "[vout]", "-map", f"{n_img}:a",
+            "-c:v","libx264","-pix_fmt","yuv420p","-r", str(fps),
+            "-c:a","aac","-b:a","192k","-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS),
+            "-shortest", str(out_p)
+        ]
+        print(f"[VIDEO] single-pass render: {len(runs)} span(s), {n_img} image input(s)")
+        subprocess.run(cmd, check=True, cwd=str(ass_p.parent))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return out_p
+
 def mux_subs_and_audio_on_video(base_video_path: Path, ass_path: Path, audio_path: Path, out_mp4: str):
     subs = f"subtitles=filename={Path(ass_path).name}:charenc=UTF-8:force_style='Alignment=5,BorderStyle=1,Outline=3,Shadow=2'"
     cmd = [